@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, Security, Header
+from fastapi.responses import StreamingResponse
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Literal, Optional
+import asyncio
 import json
 import logging
 
@@ -9,11 +11,21 @@ from app.core.config import get_settings
 from app.models.match import RawMatchData
 from app.services.ingestion import IngestionService
 from app.services.discovery import DiscoveryService
+from app.services.ingest_jobs import get_ingest_job_queue
 from app.core.db import get_chroma_service
+from app.core.embeddings import get_embedding_engine, truncate_embedding
+from app.core.embedding_cache import get_embedding_cache
+from app.core.query_cache import get_query_cache
+from app.core.llm import get_genai_client
+from app.core.metrics import span
 from app.core.supabase import get_supabase
+from app.core.vector_index import get_vector_index
+from app.core.round_store import get_round_store
 from app.services.processor import MatchDataProcessor
+from app.services.scraper import get_scraper_service
+from app.services.intent import get_intent_parser
+from app.services.tendencies import get_tendency_store
 
-from google import genai
 from google.genai import types
 
 router = APIRouter()
@@ -28,11 +40,15 @@ async def get_api_key(api_key_header: str = Security(api_key_header)):
     return True
 
 # Models for Request/Response
+# Opt-in streamed responses: newline-delimited JSON or server-sent events
+StreamMode = Literal["ndjson", "sse"]
+
 class QueryRequest(BaseModel):
     query_text: str
     n_results: int = 5
     filters: Optional[Dict[str, Any]] = None
     jit_index: bool = False
+    stream: Optional[StreamMode] = None
 
 class QueryResponse(BaseModel):
     results: List[Dict[str, Any]]
@@ -47,178 +63,309 @@ class EventIngestRequest(BaseModel):
 
 class UrlIngestRequest(BaseModel):
     url: str
+    stream: Optional[StreamMode] = None
 
-# Hardcoded map of common abbreviations to canonical slugs
-TEAM_MAP = {
-    "prx": "paperrex",
-    "paper rex": "paperrex",
-    "drx": "drx",
-    "fnc": "fnatic",
-    "fnatic": "fnatic",
-    "nrg": "nrg",
-    "sen": "sentinels",
-    "sentinels": "sentinels",
-    "th": "teamheretics",
-    "heretics": "teamheretics",
-    "lev": "leviatán",
-    "leviatán": "leviatán",
-    "loud": "loud",
-    "tl": "teamliquid",
-    "liquid": "teamliquid",
-}
+INTENT_PROMPT = (
+    "Given the Valorant search query: '{query}', extract: "
+    "1. 'team_slug' (return 'paperrex', 'drx', 'fnatic', 'nrg', 'sentinels', 'teamheretics', 'leviatán', 'loud', 'teamliquid'). "
+    "2. 'map' (ascent, bind, haven, lotus, sunset, abyss, split, fracture, icebox, breeze). "
+    "3. 'round_type' (thrifty, flawless, pistol, clutch, ace). "
+    "Return as JSON. Use null if not found."
+)
 
-@router.post("/query", response_model=QueryResponse, dependencies=[Depends(get_api_key)])
-async def query_matches(request: QueryRequest):
-    settings = get_settings()
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
-    supabase = get_supabase()
-    
-    # 1. Hybrid Intent Detection (Keywords + LLM)
-    detected_team_slug = None
-    query_lower = request.query_text.lower()
-    
-    for kw, slug in TEAM_MAP.items():
-        if kw in query_lower:
-            detected_team_slug = slug
-            break
-            
+async def _detect_intent(query_text: str) -> Dict[str, Any]:
+    """
+    Hybrid intent detection: the local parser resolves most queries on its own;
+    Gemini is only asked when the parser's confidence is below threshold.
+    """
+    parser = get_intent_parser()
+    resolved = parser.cached_resolution(query_text)
+    if resolved is not None:
+        return resolved
+
+    with span("intent_local"):
+        local = parser.parse(query_text)
+    intent = {"team_slug": local["team_slug"], "map": local["map"], "round_type": local["round_type"]}
+
+    client = get_genai_client()
+    if local["confidence"] >= settings.INTENT_CONFIDENCE_THRESHOLD or not client:
+        parser.remember_resolution(query_text, intent)
+        return intent
+
+    logger.info(f"Local intent confidence {local['confidence']} below threshold, asking Gemini")
     try:
-        intent_prompt = (
-            f"Given the Valorant search query: '{request.query_text}', extract: "
-            "1. 'team_slug' (return 'paperrex', 'drx', 'fnatic', 'nrg', 'sentinels', 'teamheretics', 'leviatán', 'loud', 'teamliquid'). "
-            "2. 'map' (ascent, bind, haven, lotus, sunset, abyss, split, fracture, icebox, breeze). "
-            "3. 'round_type' (thrifty, flawless, pistol, clutch, ace). "
-            "Return as JSON. Use null if not found."
-        )
-        
-        intent_response = client.models.generate_content(
-            model='gemini-3-flash-preview',
-            contents=intent_prompt,
-            config=types.GenerateContentConfig(response_mime_type='application/json')
-        )
-        
+        with span("intent_llm"):
+            intent_response = await asyncio.wait_for(
+                client.aio.models.generate_content(
+                    model='gemini-3-flash-preview',
+                    contents=INTENT_PROMPT.format(query=query_text),
+                    config=types.GenerateContentConfig(response_mime_type='application/json')
+                ),
+                timeout=settings.QUERY_INTENT_TIMEOUT,
+            )
         intent_data = json.loads(intent_response.text)
-        if not detected_team_slug:
-            detected_team_slug = intent_data.get("team_slug")
-        
-        detected_map = intent_data.get("map")
-        detected_round_type = intent_data.get("round_type")
-
+        # Exact local matches win; the LLM fills in what the parser missed
+        for field in ("team_slug", "map", "round_type"):
+            if not intent[field] and intent_data.get(field):
+                intent[field] = str(intent_data[field]).lower()
+        parser.remember_resolution(query_text, intent)
+    except asyncio.TimeoutError:
+        logger.warning(f"Intent parsing timed out after {settings.QUERY_INTENT_TIMEOUT}s")
     except Exception as e:
         logger.warning(f"Intent parsing failed: {e}")
-        detected_map = None
-        detected_round_type = None
+    return intent
 
-    # 2. Generate Vector for Query
+async def _embed_query(query_text: str) -> Optional[List[float]]:
+    embedder = get_embedding_engine()
+    if not embedder:
+        return None
     try:
-        embed_resp = client.models.embed_content(
-            model="models/gemini-embedding-001",
-            contents=request.query_text,
-            config={"task_type": "RETRIEVAL_QUERY", "output_dimensionality": 768}
-        )
-        # Convert to plain Python list to ensure proper JSON serialization
-        query_vector = [float(v) for v in embed_resp.embeddings[0].values]
-        logger.info(f"Generated embedding with {len(query_vector)} dimensions")
+        with span("embed_query"):
+            return await asyncio.wait_for(embedder.aembed_query(query_text), timeout=settings.QUERY_EMBED_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.error(f"Embedding timed out after {settings.QUERY_EMBED_TIMEOUT}s")
     except Exception as e:
         logger.error(f"Embedding failed: {e}")
-        query_vector = None
+    return None
+
+def _search_filters(intent: Dict[str, Any]) -> Dict[str, Any]:
+    """Intent -> column filters shared by the match_rounds RPC and the local index."""
+    detected_map = intent.get("map")
+    detected_round_type = intent.get("round_type")
+
+    # "pistol" isn't a ceremony in rib.gg — it's a round position (round 1/13)
+    # stored as is_pistol=true with round_type="default". Route pistol detection
+    # to filter_is_pistol only; sending filter_round_type="pistol" matches zero rows.
+    is_pistol_query = detected_round_type == "pistol"
+    return {
+        "team_slug": intent.get("team_slug"),
+        "map_name": detected_map.capitalize() if detected_map else None,
+        "round_type": None if is_pistol_query else (detected_round_type.lower() if detected_round_type else None),
+        "is_pistol": True if is_pistol_query else None,
+    }
+
+def _format_round_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["external_id"],
+        "document": row["summary"],
+        "metadata": {
+            "team_a": row.get("team_a", "Unknown"), # Need to ensure these are in function return
+            "team_b": row.get("team_b", "Unknown"),
+            "score_a": row["score_a"],
+            "score_b": row["score_b"],
+            "map_name": row["map_name"],
+            "round_num": row["round_num"],
+            "winning_team": row["winning_team"],
+            "round_type": row["round_type"],
+            "vod_url": row["vod_url"],
+            "vod_timestamp": row.get("vod_timestamp") # Handled via metadata usually
+        },
+        "distance": 1 - row["similarity"] # Convert back to distance for UI consistency
+    }
+
+def _search_local_index(index, query_vector: List[float], intent: Dict[str, Any]) -> List[Dict[str, Any]]:
+    filters = _search_filters(intent)
+    with span("local_index_search"):
+        hits = index.search(query_vector, k=20, filters=filters)
+    # Same rule as match_rounds: the similarity threshold only applies without filters
+    if not any(v is not None for v in filters.values()):
+        hits = [h for h in hits if h["similarity"] > 0.5]
+    return [_format_round_row(h) for h in hits]
+
+# Filtered two-stage searches request this many times SEARCH_COARSE_CANDIDATES
+_FILTERED_CANDIDATE_FACTOR = 4
+
+def _search_supabase(supabase, query_vector: List[float], intent: Dict[str, Any]) -> List[Dict[str, Any]]:
+    filters = _search_filters(intent)
+
+    # Prepare RPC parameters - pass all params explicitly
+    rpc_params = {
+        "query_embedding": query_vector,
+        "match_threshold": 0.5,  # Only applied when NO metadata filters
+        "match_count": 20,
+        "filter_team_slug": filters["team_slug"],
+        "filter_map_name": filters["map_name"],
+        "filter_round_type": filters["round_type"],
+        "filter_is_pistol": filters["is_pistol"]
+    }
+    rpc_name = "match_rounds"
+    if settings.SUPABASE_PREFIX_SEARCH and settings.EMBEDDING_PREFIX_DIMENSIONS:
+        # Coarse candidates on the prefix column, exact rerank on the full vector
+        rpc_name = "match_rounds_two_stage"
+        rpc_params["query_prefix"] = truncate_embedding(query_vector, settings.EMBEDDING_PREFIX_DIMENSIONS)
+        # Filters are applied after the HNSW scan, so filtered queries ask for a wider scan
+        filtered = any(v is not None for v in filters.values())
+        rpc_params["candidate_count"] = settings.SEARCH_COARSE_CANDIDATES * (_FILTERED_CANDIDATE_FACTOR if filtered else 1)
+
+    logger.debug(f"RPC params: team={rpc_params.get('filter_team_slug')}, map={rpc_params.get('filter_map_name')}, round_type={rpc_params.get('filter_round_type')}")
+    with span("supabase_rpc"):
+        rpc_res = supabase.rpc(rpc_name, rpc_params).execute()
+    logger.info(f"RPC returned {len(rpc_res.data)} results")
+
+    return [_format_round_row(row) for row in rpc_res.data]
+
+def _search_chroma(query_text: str, query_vector: Optional[List[float]], intent: Dict[str, Any]) -> List[Dict[str, Any]]:
+    chroma_service = get_chroma_service()
+    collection = chroma_service.get_collection("matches")
+    detected_team_slug = intent.get("team_slug")
+    detected_map = intent.get("map")
+
+    # (ChromaDB Filter Logic)
+    filter_list = []
+    if detected_team_slug:
+        filter_list.append({"$or": [{"winner_slug": {"$eq": detected_team_slug}},{"team_a_slug": {"$eq": detected_team_slug}},{"team_b_slug": {"$eq": detected_team_slug}}]})
+    if detected_map:
+        filter_list.append({"map_name": {"$eq": detected_map.capitalize()}})
+
+    final_filters = {"$and": filter_list} if len(filter_list) > 1 else (filter_list[0] if filter_list else None)
+
+    # Reuse the query vector when we have one instead of embedding the text again
+    with span("chroma_query"):
+        if query_vector:
+            results = collection.query(query_embeddings=[query_vector], n_results=25, where=final_filters)
+        else:
+            results = collection.query(query_texts=[query_text], n_results=25, where=final_filters)
 
-    # 3. Execute Search (Supabase Cloud Priority)
     formatted_results = []
-    
-    if supabase and query_vector:
+    seen_round_ids = set()
+    for i in range(len(results['ids'][0])):
+        meta = results['metadatas'][0][i]
+        dist = results['distances'][0][i]
+        if meta.get("round_id") in seen_round_ids: continue
+        if dist <= 0.60:
+            seen_round_ids.add(meta.get("round_id"))
+            formatted_results.append({
+                "id": results['ids'][0][i],
+                "document": results['documents'][0][i],
+                "metadata": meta,
+                "distance": float(dist)
+            })
+    return formatted_results
+
+def _stream_events(events: AsyncIterator[Dict[str, Any]], mode: str) -> StreamingResponse:
+    """NDJSON (one JSON object per line) or SSE (`event:` + `data:` frames) from an event generator."""
+    async def body():
+        try:
+            async for event in events:
+                if mode == "sse":
+                    yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+                else:
+                    yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            logger.error(f"Streaming response failed: {e}")
+            error = {"event": "error", "detail": str(e)}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n" if mode == "sse" else json.dumps(error) + "\n"
+
+    media_type = "text/event-stream" if mode == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def _query_events(request: QueryRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    The /query pipeline as events: "intent" as soon as it is known, "results"
+    from each backend as it returns (sorted, top 12), then "done" with the
+    final response.
+    """
+    settings = get_settings()
+    supabase = get_supabase()
+
+    # 0. Repeated searches are served from memory until new rounds land
+    cache = get_query_cache()
+    cache_key = cache.make_key(request.query_text, request.filters, request.n_results) if cache else None
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield {"event": "intent", "intent": cached["intent"]}
+            yield {"event": "results", "source": "cache", "results": cached["results"]}
+            yield {"event": "done", **cached}
+            return
+        generation = cache.generation
+
+    # 1 + 2. Intent detection and query embedding are independent; run them together
+    embed_task = asyncio.create_task(_embed_query(request.query_text))
+    try:
+        intent = await _detect_intent(request.query_text)
+        public_intent = {
+            "team": intent["team_slug"],
+            "map": intent["map"],
+            "round_type": intent["round_type"]
+        }
+        yield {"event": "intent", "intent": public_intent}
+        query_vector = await embed_task
+    finally:
+        if not embed_task.done():
+            embed_task.cancel()
+    if query_vector:
+        logger.info(f"Generated embedding with {len(query_vector)} dimensions")
+    else:
+        logger.error("Embedding failed: no query vector")
+
+    # 3. Execute Search (in-process index, then Supabase Cloud)
+    formatted_results = []
+
+    local_index = get_vector_index()
+    # Only once it holds every round; a partial index would silently hide older ones
+    if local_index is not None and local_index.complete and len(local_index) and query_vector:
+        try:
+            formatted_results = _search_local_index(local_index, query_vector, intent)
+            logger.info(f"Local index: Found {len(formatted_results)} results.")
+            if formatted_results:
+                yield {"event": "results", "source": "local_index", "results": _top_results(formatted_results)}
+        except Exception as e:
+            logger.error(f"Local index search failed, falling back to Supabase: {e}")
+
+    if not formatted_results and supabase and query_vector:
         try:
-            # "pistol" isn't a ceremony in rib.gg — it's a round position (round 1/13)
-            # stored as is_pistol=true with round_type="default". Route pistol detection
-            # to filter_is_pistol only; sending filter_round_type="pistol" matches zero rows.
-            is_pistol_query = detected_round_type == "pistol"
-            filter_round_type = None if is_pistol_query else (detected_round_type.lower() if detected_round_type else None)
-
-            # Prepare RPC parameters - pass all params explicitly
-            rpc_params = {
-                "query_embedding": query_vector,
-                "match_threshold": 0.5,  # Only applied when NO metadata filters
-                "match_count": 20,
-                "filter_team_slug": detected_team_slug,
-                "filter_map_name": detected_map.capitalize() if detected_map else None,
-                "filter_round_type": filter_round_type,
-                "filter_is_pistol": True if is_pistol_query else None
-            }
-
-            logger.info(f"RPC params: team={rpc_params.get('filter_team_slug')}, map={rpc_params.get('filter_map_name')}, round_type={rpc_params.get('filter_round_type')}")
-            logger.info(f"Embedding length: {len(query_vector)}, first 3 values: {query_vector[:3]}")
-            rpc_res = supabase.rpc("match_rounds", rpc_params).execute()
-            logger.info(f"RPC returned {len(rpc_res.data)} results")
-            if rpc_res.data:
-                logger.info(f"First result: {rpc_res.data[0].get('team_a')} vs {rpc_res.data[0].get('team_b')}")
-
-            for row in rpc_res.data:
-                formatted_results.append({
-                    "id": row["external_id"],
-                    "document": row["summary"],
-                    "metadata": {
-                        "team_a": row.get("team_a", "Unknown"), # Need to ensure these are in function return
-                        "team_b": row.get("team_b", "Unknown"),
-                        "score_a": row["score_a"],
-                        "score_b": row["score_b"],
-                        "map_name": row["map_name"],
-                        "round_num": row["round_num"],
-                        "winning_team": row["winning_team"],
-                        "round_type": row["round_type"],
-                        "vod_url": row["vod_url"],
-                        "vod_timestamp": row.get("vod_timestamp") # Handled via metadata usually
-                    },
-                    "distance": 1 - row["similarity"] # Convert back to distance for UI consistency
-                })
-                
+            # The Supabase client is synchronous; keep it off the event loop
+            formatted_results = await asyncio.wait_for(
+                asyncio.to_thread(_search_supabase, supabase, query_vector, intent),
+                timeout=settings.QUERY_SEARCH_TIMEOUT,
+            )
             logger.info(f"Supabase Cloud: Found {len(formatted_results)} results.")
-            
+            if formatted_results:
+                yield {"event": "results", "source": "supabase", "results": _top_results(formatted_results)}
+        except asyncio.TimeoutError:
+            logger.error(f"Supabase Search timed out after {settings.QUERY_SEARCH_TIMEOUT}s, falling back to Chroma")
         except Exception as e:
             logger.error(f"Supabase Search failed, falling back to Chroma: {e}")
 
     # 4. Fallback to ChromaDB if cloud search yielded nothing or failed
     if not formatted_results and settings.USE_CHROMA:
         try:
-            chroma_service = get_chroma_service()
-            collection = chroma_service.get_collection("matches")
-            
-            # (ChromaDB Filter Logic)
-            filter_list = []
-            if detected_team_slug:
-                filter_list.append({"$or": [{"winner_slug": {"$eq": detected_team_slug}},{"team_a_slug": {"$eq": detected_team_slug}},{"team_b_slug": {"$eq": detected_team_slug}}]})
-            if detected_map:
-                filter_list.append({"map_name": {"$eq": detected_map.capitalize()}})
-            
-            final_filters = {"$and": filter_list} if len(filter_list) > 1 else (filter_list[0] if filter_list else None)
-
-            results = collection.query(query_texts=[request.query_text], n_results=25, where=final_filters)
-            
-            seen_round_ids = set()
-            for i in range(len(results['ids'][0])):
-                meta = results['metadatas'][0][i]
-                dist = results['distances'][0][i]
-                if meta.get("round_id") in seen_round_ids: continue
-                if dist <= 0.60:
-                    seen_round_ids.add(meta.get("round_id"))
-                    formatted_results.append({
-                        "id": results['ids'][0][i],
-                        "document": results['documents'][0][i],
-                        "metadata": meta,
-                        "distance": float(dist)
-                    })
+            formatted_results = await asyncio.wait_for(
+                asyncio.to_thread(_search_chroma, request.query_text, query_vector, intent),
+                timeout=settings.QUERY_SEARCH_TIMEOUT,
+            )
+            if formatted_results:
+                yield {"event": "results", "source": "chroma", "results": _top_results(formatted_results)}
+        except asyncio.TimeoutError:
+            logger.warning(f"Local Chroma fallback timed out after {settings.QUERY_SEARCH_TIMEOUT}s")
         except Exception as e:
             logger.warning(f"Local Chroma fallback failed: {e}")
 
-    formatted_results.sort(key=lambda x: x["distance"])
-            
-    return {
-        "results": formatted_results[:12],
-        "intent": {
-            "team": detected_team_slug,
-            "map": detected_map,
-            "round_type": detected_round_type
-        }
+    response = {
+        "results": _top_results(formatted_results),
+        "intent": public_intent,
     }
+    # Empty results are usually a failed backend, not an answer worth keeping
+    if cache and formatted_results:
+        cache.put(cache_key, response, intent["team_slug"], intent["map"], generation)
+    yield {"event": "done", **response}
+
+def _top_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(results, key=lambda x: x["distance"])[:12]
+
+@router.post("/query", response_model=QueryResponse, dependencies=[Depends(get_api_key)])
+async def query_matches(request: QueryRequest):
+    """
+    Semantic round search. With `stream` set ("ndjson" or "sse") the response
+    is a stream of intent / results / done events instead of one JSON body.
+    """
+    if request.stream:
+        return _stream_events(_query_events(request), request.stream)
+    async for event in _query_events(request):
+        pass
+    return {"results": event["results"], "intent": event["intent"]}
 
 @router.post("/ingest", dependencies=[Depends(get_api_key)])
 async def ingest_match(request: IngestRequest):
@@ -239,8 +386,38 @@ async def ingest_match(request: IngestRequest):
         ids = ingestion_service.ingest_batch(rounds, metadata)
     return {"message": "Ingestion successful", "ingested_ids": ids}
 
+async def _ingest_url_events(url: str) -> AsyncIterator[Dict[str, Any]]:
+    """Scrape, then embed map by map and write, reporting progress after each step."""
+    discovery_service = DiscoveryService()
+    yield {"event": "started", "url": url}
+    rounds = await discovery_service.process_series(url)
+    if not rounds:
+        yield {"event": "error", "detail": "Failed to scrape or process the provided URL"}
+        return
+    maps = IngestionService.map_ranges(rounds)
+    yield {"event": "scraped", "rounds": len(rounds), "maps": [name for name, _, _ in maps]}
+
+    ingestion_service = IngestionService()
+    batch = await asyncio.to_thread(ingestion_service.prepare_batch, rounds)
+    for index, (map_name, start, end) in enumerate(maps):
+        embedded = await asyncio.to_thread(ingestion_service.embed_range, batch, start, end)
+        yield {
+            "event": "map", "map_name": map_name, "map_index": index, "maps": len(maps),
+            "rounds": end - start, "embedded": embedded,
+        }
+    ids = await asyncio.to_thread(ingestion_service.write_batch, batch)
+    yield {"event": "batch", "written": len(ids), "write_ok": batch.get("write_ok", True)}
+    yield {
+        "event": "done",
+        "message": f"Successfully ingested {len(ids)} rounds from URL",
+        "ingested_ids": ids,
+        "url": url,
+    }
+
 @router.post("/ingest/url", dependencies=[Depends(get_api_key)])
 async def ingest_from_url(request: UrlIngestRequest):
+    if request.stream:
+        return _stream_events(_ingest_url_events(request.url), request.stream)
     discovery_service = DiscoveryService()
     rounds = await discovery_service.process_series(request.url)
     if not rounds:
@@ -264,18 +441,102 @@ async def list_events():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/admin/ingest-event", dependencies=[Depends(get_api_key)])
+@router.post("/admin/ingest-event", status_code=202, dependencies=[Depends(get_api_key)])
 async def ingest_event(request: EventIngestRequest):
-    discovery_service = DiscoveryService()
-    try:
-        total_rounds = await discovery_service.ingest_tournament(
-            request.event_url,
-            vlr_event_url=request.vlr_event_url,
-        )
-        return {
-            "status": "success",
-            "message": f"Successfully ingested {total_rounds} rounds from the tournament.",
-            "url": request.event_url
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    """
+    Queues the tournament for background ingestion and returns immediately.
+    Poll /admin/ingest-jobs/{job_id} for progress.
+    """
+    queue = get_ingest_job_queue()
+    await queue.start()
+    job = await asyncio.to_thread(queue.submit, request.event_url, request.vlr_event_url)
+    return {
+        "status": "queued",
+        "message": f"Tournament queued for ingestion (job {job['id']}).",
+        "url": request.event_url,
+        "job_id": job["id"],
+        "job": job,
+    }
+
+@router.get("/admin/ingest-jobs", dependencies=[Depends(get_api_key)])
+async def list_ingest_jobs(limit: int = 50):
+    """
+    Recent ingestion jobs with their progress and throughput.
+    """
+    queue = get_ingest_job_queue()
+    jobs = await asyncio.to_thread(queue.store.list, limit)
+    return {"queue": queue.stats(), "jobs": jobs}
+
+@router.get("/admin/ingest-jobs/{job_id}", dependencies=[Depends(get_api_key)])
+async def get_ingest_job(job_id: str):
+    job = await asyncio.to_thread(get_ingest_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+@router.post("/admin/ingest-jobs/{job_id}/retry", dependencies=[Depends(get_api_key)])
+async def retry_ingest_job(job_id: str):
+    """
+    Re-queues a failed job; it resumes after its last completed series.
+    """
+    queue = get_ingest_job_queue()
+    await queue.start()
+    if not await asyncio.to_thread(queue.retry, job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} does not exist or has not failed")
+    return await asyncio.to_thread(queue.store.get, job_id)
+
+@router.get("/analyze/tendencies/{team_slug}", dependencies=[Depends(get_api_key)])
+async def team_tendencies(team_slug: str, map_name: Optional[str] = None, bucket: Optional[str] = None):
+    """
+    Precomputed round/win counts for a team per map ("all" = every map) and
+    bucket (all, pistol, conversion, first_half, second_half, overtime).
+    """
+    store = get_tendency_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Tendency summaries are disabled")
+    rows = await asyncio.to_thread(store.get, team_slug, map_name, bucket)
+    return {"team_slug": team_slug.lower(), "tendencies": rows}
+
+@router.get("/admin/vector-index", dependencies=[Depends(get_api_key)])
+async def vector_index_stats():
+    """
+    Size and memory footprint of the in-process vector index.
+    """
+    index = get_vector_index()
+    return {"enabled": index is not None, "index": index.memory_stats() if index is not None else None}
+
+@router.get("/admin/round-store", dependencies=[Depends(get_api_key)])
+async def round_store_stats():
+    """
+    Rows, partitions and dictionary sizes of the columnar round store.
+    """
+    store = get_round_store()
+    return {"enabled": store is not None, "store": store.stats() if store is not None else None}
+
+@router.get("/admin/query-cache", dependencies=[Depends(get_api_key)])
+async def query_cache_stats():
+    """
+    Hit/miss/invalidation counters for the /query result cache.
+    """
+    cache = get_query_cache()
+    return {"enabled": cache is not None, "cache": cache.stats() if cache else None}
+
+@router.get("/admin/scraper", dependencies=[Depends(get_api_key)])
+async def scraper_stats():
+    """
+    Per-host request rate, concurrency window, throttle counts and browser fallback state.
+    """
+    return {"hosts": get_scraper_service().rate_stats()}
+
+@router.get("/admin/embedding-cache", dependencies=[Depends(get_api_key)])
+async def embedding_cache_stats():
+    """
+    Hit/miss counters for the local embedding cache.
+    """
+    cache = get_embedding_cache()
+    engine = get_embedding_engine()
+    return {
+        "enabled": cache is not None,
+        "cache": cache.stats() if cache else None,
+        "embedding_requests": engine.request_count if engine else 0,
+    }
@@ -18,6 +18,120 @@ class Settings(BaseSettings):
     CHROMA_PERSIST_DIRECTORY: str = "chroma_db"
     SUPABASE_URL: str = ""
     SUPABASE_SERVICE_ROLE_KEY: str = ""
+
+    # Embeddings
+    EMBEDDING_MODEL: str = "models/gemini-embedding-001"
+    EMBEDDING_DIMENSIONS: int = 768
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_MAX_BATCH_CHARS: int = 100_000
+    EMBEDDING_MAX_RETRIES: int = 4
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 5_000
+
+    # Local intent parser (Gemini is only asked below this confidence)
+    INTENT_CONFIDENCE_THRESHOLD: float = 0.75
+    INTENT_CACHE_SIZE: int = 2048
+
+    # /query stage timeouts (seconds)
+    QUERY_INTENT_TIMEOUT: float = 4.0
+    QUERY_EMBED_TIMEOUT: float = 4.0
+    QUERY_SEARCH_TIMEOUT: float = 6.0
+
+    # /query result cache (invalidated by ingestion for the affected teams/maps)
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_SIZE: int = 512
+    QUERY_CACHE_TTL: float = 300.0
+
+    # In-process vector index (searched before Supabase/Chroma once bootstrapped from Supabase)
+    LOCAL_INDEX_ENABLED: bool = False
+    LOCAL_INDEX_SAVE_INTERVAL: float = 60.0
+    # Rows per request when loading existing round_embeddings into the local index
+    LOCAL_INDEX_BOOTSTRAP_PAGE_SIZE: int = 1000
+    # Snapshot codes scanned instead of float32: "none", "int8" or "pq"
+    LOCAL_INDEX_QUANTIZATION: str = "none"
+    LOCAL_INDEX_PQ_SUBSPACES: int = 96
+    # Recompute the best coarse candidates on the full vectors
+    LOCAL_INDEX_RERANK: bool = True
+
+    # Matryoshka two-stage retrieval: coarse pass on a renormalized prefix of
+    # each vector, exact rerank of the best candidates on the full vector (0 disables)
+    EMBEDDING_PREFIX_DIMENSIONS: int = 256
+    SEARCH_COARSE_CANDIDATES: int = 200
+    # Requires the embedding_prefix column + match_rounds_two_stage migration;
+    # the column is vector(256) so it must agree with EMBEDDING_PREFIX_DIMENSIONS.
+    # The prefix is written on every ingest; this only switches /query to the two-stage RPC
+    SUPABASE_PREFIX_SEARCH: bool = False
+
+    # Scraper HTTP client
+    SCRAPER_HTTP2: bool = True
+    SCRAPER_TIMEOUT: float = 10.0
+    SCRAPER_MAX_CONNECTIONS: int = 40
+    SCRAPER_MAX_KEEPALIVE: int = 20
+    SCRAPER_KEEPALIVE_EXPIRY: float = 30.0
+    SCRAPER_MAX_CONNECTIONS_PER_HOST: int = 8
+    # Adaptive per-host limiter: start rate (req/s) and concurrency, AIMD bounds
+    SCRAPER_RATE_INITIAL: float = 4.0
+    SCRAPER_RATE_MIN: float = 0.2
+    SCRAPER_RATE_MAX: float = 50.0
+    SCRAPER_CONCURRENCY_INITIAL: int = 4
+    # Responses slower than this (seconds) count as a back-off signal
+    SCRAPER_LATENCY_TARGET: float = 3.0
+    SCRAPER_THROTTLE_RETRIES: int = 3
+    # Seconds a host that answered 403 is fetched through the browser before httpx is retried
+    SCRAPER_BROWSER_COOLDOWN: float = 600.0
+
+    # Scraped page cache (seconds)
+    PAGE_CACHE_ENABLED: bool = True
+    PAGE_CACHE_OFFLINE: bool = False
+    PAGE_CACHE_LONG_TTL: int = 30 * 24 * 3600
+    PAGE_CACHE_SHORT_TTL: int = 15 * 60
+    PAGE_CACHE_DEFAULT_TTL: int = 3600
+    # Disk budget in bytes; least recently used pages are evicted past it (0 = unbounded)
+    PAGE_CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+
+    # Playwright browser pool
+    HEADLESS_BROWSER: bool = True
+    BROWSER_POOL_SIZE: int = 3
+    BROWSER_POOL_BROWSERS: int = 1
+    BROWSER_CONTEXT_MAX_USES: int = 20
+    BROWSER_READY_TIMEOUT_MS: int = 15000
+    BROWSER_POOL_PREWARM: bool = False
+
+    # Tournament crawler
+    CRAWL_CONCURRENCY: int = 4
+    CRAWL_MAX_DEPTH: int = 5
+
+    # Tournament ingestion pipeline (workers per stage)
+    PIPELINE_FETCH_CONCURRENCY: int = 4
+    PIPELINE_EXTRACT_CONCURRENCY: int = 2
+    PIPELINE_PROCESS_CONCURRENCY: int = 2
+    PIPELINE_ENRICH_CONCURRENCY: int = 4
+    PIPELINE_EMBED_CONCURRENCY: int = 2
+    PIPELINE_UPSERT_CONCURRENCY: int = 2
+    PIPELINE_QUEUE_SIZE: int = 8
+    # Seconds a series waits for its VLR match to resolve before ingesting without VODs
+    VLR_VOD_WAIT_TIMEOUT: float = 60.0
+    # Series buffered by the upsert stage and written in one bulk call
+    INGEST_BULK_SERIES: int = 8
+    INGEST_BULK_WAIT: float = 2.0
+    # Events ingested concurrently by the background job queue
+    INGEST_JOB_WORKERS: int = 2
+
+    # Bulk writes
+    SUPABASE_UPSERT_CHUNK_SIZE: int = 500
+    SUPABASE_WRITE_CONCURRENCY: int = 4
+    SUPABASE_WRITE_RETRIES: int = 3
+    CHROMA_UPSERT_BATCH_SIZE: int = 1000
+    # Skip re-embedding rounds whose content is unchanged since the last ingest
+    INGEST_MANIFEST_ENABLED: bool = True
+
+    # Local on-disk state (caches, manifests, indexes)
+    LOCAL_CACHE_DIRECTORY: str = "retake_cache"
+    # Columnar copy of every ingested round, partitioned by event, for Analyze aggregates
+    ROUND_STORE_ENABLED: bool = True
+    # Per-team/map tendency summaries maintained on ingest
+    TENDENCIES_ENABLED: bool = True
     
     model_config = SettingsConfigDict(
         env_file=("../.env", ".env"), 
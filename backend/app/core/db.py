@@ -1,8 +1,9 @@
 import chromadb
 from chromadb import Documents, EmbeddingFunction, Embeddings
 from chromadb.config import Settings as ChromaSettings
-from google import genai
 from app.core.config import get_settings
+from app.core.embedding_cache import get_embedding_cache
+from app.core.embeddings import EmbeddingEngine, get_embedding_engine
 import logging
 from typing import List, Optional
 
@@ -11,27 +12,21 @@ settings = get_settings()
 
 class GeminiEmbeddingFunction(EmbeddingFunction):
     def __init__(self, api_key: str, model_name: str = "models/gemini-embedding-001"):
-        # The new SDK uses a centralized Client object.
-        self.client = genai.Client(api_key=api_key)
+        # Share the process-wide batched engine when it matches this configuration
+        engine = get_embedding_engine()
+        if engine is None or engine.model_name != model_name:
+            engine = EmbeddingEngine(api_key=api_key, model_name=model_name, cache=get_embedding_cache())
+        self.engine = engine
         self.model_name = model_name
 
     def __call__(self, input: Documents) -> Embeddings:
         if not input:
             return []
 
-        embeddings = []
-        # TODO: Implement batching for production efficiency
-        for text in input:
-            try:
-                result = self.client.models.embed_content(
-                    model=self.model_name,
-                    contents=text,
-                    config={"task_type": "RETRIEVAL_DOCUMENT", "output_dimensionality": 768}
-                )
-                embeddings.append(result.embeddings[0].values)
-            except Exception as e:
-                logger.error(f"Error embedding content with Gemini: {e}")
-                raise e
+        embeddings = self.engine.embed_documents(list(input))
+        if any(e is None for e in embeddings):
+            logger.error("Error embedding content with Gemini: one or more batches failed")
+            raise RuntimeError("Gemini embedding failed for part of the batch")
         return embeddings
 
 class ChromaService:
@@ -45,7 +40,7 @@ class ChromaService:
             # Updating to the newer model which is standard for the new SDK
             self.embedding_fn = GeminiEmbeddingFunction(
                 api_key=settings.GEMINI_API_KEY,
-                model_name="models/gemini-embedding-001"
+                model_name=settings.EMBEDDING_MODEL
             )
         else:
             logger.warning("GEMINI_API_KEY not set. Using default ChromaDB embedding.")
@@ -0,0 +1,186 @@
+"""Content-addressed, on-disk embedding cache.
+
+Vectors are keyed by (sha256(text), model, task_type, output_dimensionality)
+and stored as float32 blobs in a local SQLite file, fronted by an in-process
+LRU. Re-ingesting unchanged rounds or repeating a coach query never reaches
+Gemini twice.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, str, int]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache: an OrderedDict LRU in front of a size-bounded SQLite table.
+    Safe to share across threads (ingestion runs in worker threads).
+    """
+
+    def __init__(self, path: str, max_entries: int = 200_000, memory_entries: int = 5_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[CacheKey, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                text_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                dims INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text_hash, model, task_type, dims)
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._db.commit()
+        self._row_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(text: str, model: str, task_type: str, dims: int) -> CacheKey:
+        return (text_hash(text), model, task_type, int(dims))
+
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, List[float]]:
+        """Look up keys, memory first then disk. Missing keys are absent from the result."""
+        found: Dict[CacheKey, List[float]] = {}
+        pending = []
+        with self._lock:
+            for key in keys:
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vec
+                else:
+                    pending.append(key)
+
+            if pending:
+                now = time.time()
+                touched = []
+                for key in pending:
+                    row = self._db.execute(
+                        "SELECT vector FROM embeddings WHERE text_hash=? AND model=? AND task_type=? AND dims=?",
+                        key,
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    vec = array("f", row[0]).tolist()
+                    found[key] = vec
+                    self._remember(key, vec)
+                    touched.append((now, *key))
+                if touched:
+                    self._db.executemany(
+                        "UPDATE embeddings SET last_used=? WHERE text_hash=? AND model=? AND task_type=? AND dims=?",
+                        touched,
+                    )
+                    self._db.commit()
+
+            self.hits += len(found)
+            self.misses += sum(1 for key in pending if key not in found)
+        return found
+
+    def get(self, key: CacheKey) -> Optional[List[float]]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[CacheKey, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        rows = [(*key, array("f", vec).tobytes(), now) for key, vec in items.items()]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (text_hash, model, task_type, dims, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._row_count += self._db.total_changes - before
+            for key, vec in items.items():
+                self._remember(key, list(vec))
+            self._evict_if_needed()
+            self._db.commit()
+
+    def put(self, key: CacheKey, vector: List[float]):
+        self.put_many({key: vector})
+
+    def _remember(self, key: CacheKey, vec: List[float]):
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_if_needed(self):
+        """Drop least-recently-used rows, leaving 10% headroom so eviction is not per-insert."""
+        if self._row_count <= self.max_entries:
+            return
+        target = int(self.max_entries * 0.9)
+        excess = self._row_count - target
+        self._db.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used ASC, rowid ASC LIMIT ?)",
+            (excess,),
+        )
+        self._row_count = target
+        self.evictions += excess
+        logger.info(f"Embedding cache: evicted {excess} least-recently-used vectors")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._row_count,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Global instance
+_embedding_cache = None
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    global _embedding_cache
+    if _embedding_cache is None:
+        settings = get_settings()
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return None
+        _embedding_cache = EmbeddingCache(
+            path=os.path.join(settings.LOCAL_CACHE_DIRECTORY, "embeddings.sqlite3"),
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+        )
+    return _embedding_cache
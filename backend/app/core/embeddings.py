@@ -0,0 +1,232 @@
+"""Shared Gemini embedding engine.
+
+Every embedding in the backend (Chroma's embedding function, Supabase round
+vectors, coach queries) goes through one `EmbeddingEngine`, which sends lists
+of documents per `embed_content` request instead of one call per round.
+"""
+import asyncio
+import logging
+import math
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+from google import genai
+from google.genai import errors as genai_errors
+from tenacity import AsyncRetrying, Retrying, stop_after_attempt, wait_exponential, retry_if_exception
+
+from app.core.config import get_settings
+from app.core.embedding_cache import EmbeddingCache, get_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_TASK = "RETRIEVAL_DOCUMENT"
+QUERY_TASK = "RETRIEVAL_QUERY"
+
+
+def truncate_embedding(vector: Sequence[float], dims: int) -> List[float]:
+    """
+    Matryoshka prefix: the first `dims` components, renormalized to unit length.
+    Gemini embeddings are trained so that short prefixes remain usable vectors.
+    """
+    prefix = [float(v) for v in vector[:dims]]
+    norm = math.sqrt(sum(v * v for v in prefix))
+    return [v / norm for v in prefix] if norm else prefix
+
+
+def _is_oversized(exc: BaseException) -> bool:
+    """A 400/413 on a multi-document request means the batch itself is too big."""
+    return isinstance(exc, genai_errors.ClientError) and exc.code in (400, 413)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Server errors, rate limits, and network failures or timeouts; anything else is a bug or a bad request."""
+    if isinstance(exc, genai_errors.ServerError):
+        return True
+    if isinstance(exc, genai_errors.ClientError):
+        return exc.code == 429
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, TimeoutError, ConnectionError))
+
+
+class EmbeddingEngine:
+    """
+    Batched wrapper around `client.models.embed_content`.
+
+    Texts are grouped into batches capped by both document count and total
+    characters. Each batch is retried with exponential backoff; a batch the
+    API rejects as too large is split in half and retried recursively.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: Optional[str] = None,
+        output_dimensionality: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_batch_chars: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        settings = get_settings()
+        self.client = genai.Client(api_key=api_key)
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.output_dimensionality = output_dimensionality or settings.EMBEDDING_DIMENSIONS
+        self.batch_size = max(1, batch_size or settings.EMBEDDING_BATCH_SIZE)
+        self.max_batch_chars = max_batch_chars or settings.EMBEDDING_MAX_BATCH_CHARS
+        self.max_retries = max_retries or settings.EMBEDDING_MAX_RETRIES
+        self.cache = cache
+        self.request_count = 0
+
+    def embed_documents(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        return self.embed(texts, task_type=DOCUMENT_TASK)
+
+    def embed_query(self, text: str) -> Optional[List[float]]:
+        return self.embed([text], task_type=QUERY_TASK)[0]
+
+    def embed(self, texts: Sequence[str], task_type: str = DOCUMENT_TASK) -> List[Optional[List[float]]]:
+        """
+        Embed `texts` in as few requests as possible.
+        Cached and duplicate texts are never sent; returns one vector per input,
+        in order, with None where a batch ultimately failed.
+        """
+        keys, resolved, missing = self._split_cached(texts, task_type)
+        if missing:
+            pending_keys = list(missing.keys())
+            pending_texts = list(missing.values())
+            fresh: Dict[tuple, List[float]] = {}
+            for start, end in self._plan_batches(pending_texts):
+                batch = pending_texts[start:end]
+                for offset, vec in enumerate(self._embed_batch(batch, task_type)):
+                    if vec is not None:
+                        fresh[pending_keys[start + offset]] = vec
+            self._remember(fresh, resolved)
+        return [resolved.get(key) for key in keys]
+
+    async def aembed(self, texts: Sequence[str], task_type: str = DOCUMENT_TASK) -> List[Optional[List[float]]]:
+        """Async counterpart of `embed` using the SDK's aio client (never blocks the event loop)."""
+        keys, resolved, missing = self._split_cached(texts, task_type)
+        if missing:
+            pending_keys = list(missing.keys())
+            pending_texts = list(missing.values())
+            fresh: Dict[tuple, List[float]] = {}
+            for start, end in self._plan_batches(pending_texts):
+                batch = pending_texts[start:end]
+                for offset, vec in enumerate(await self._aembed_batch(batch, task_type)):
+                    if vec is not None:
+                        fresh[pending_keys[start + offset]] = vec
+            self._remember(fresh, resolved)
+        return [resolved.get(key) for key in keys]
+
+    async def aembed_query(self, text: str) -> Optional[List[float]]:
+        return (await self.aembed([text], task_type=QUERY_TASK))[0]
+
+    def _split_cached(self, texts: Sequence[str], task_type: str):
+        """Cache keys per input, vectors already cached, and unique uncached texts in first-seen order."""
+        keys = [self.cache_key(text, task_type) for text in texts]
+        resolved: Dict[tuple, List[float]] = self.cache.get_many(set(keys)) if self.cache else {}
+        missing: Dict[tuple, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in resolved and key not in missing:
+                missing[key] = text
+        return keys, resolved, missing
+
+    def _remember(self, fresh: Dict[tuple, List[float]], resolved: Dict[tuple, List[float]]):
+        if self.cache and fresh:
+            self.cache.put_many(fresh)
+        resolved.update(fresh)
+
+    def cache_key(self, text: str, task_type: str) -> tuple:
+        return EmbeddingCache.make_key(text, self.model_name, task_type, self.output_dimensionality)
+
+    def _plan_batches(self, texts: Sequence[str]) -> List[tuple]:
+        """Split `texts` into [start, end) ranges within the count and character caps."""
+        ranges = []
+        start, chars = 0, 0
+        for i, text in enumerate(texts):
+            size = len(text)
+            if i > start and (i - start >= self.batch_size or chars + size > self.max_batch_chars):
+                ranges.append((start, i))
+                start, chars = i, 0
+            chars += size
+        if start < len(texts):
+            ranges.append((start, len(texts)))
+        return ranges
+
+    def _embed_batch(self, batch: List[str], task_type: str) -> List[Optional[List[float]]]:
+        try:
+            return self._request_with_retry(batch, task_type)
+        except Exception as e:
+            if _is_oversized(e) and len(batch) > 1:
+                mid = len(batch) // 2
+                logger.warning(f"Embedding batch of {len(batch)} rejected as too large, splitting.")
+                return self._embed_batch(batch[:mid], task_type) + self._embed_batch(batch[mid:], task_type)
+            logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+            return [None] * len(batch)
+
+    def _request_with_retry(self, batch: List[str], task_type: str) -> List[List[float]]:
+        retryer = Retrying(**self._retry_policy())
+        for attempt in retryer:
+            with attempt:
+                return self._request(batch, task_type)
+
+    async def _aembed_batch(self, batch: List[str], task_type: str) -> List[Optional[List[float]]]:
+        try:
+            return await self._arequest_with_retry(batch, task_type)
+        except Exception as e:
+            if _is_oversized(e) and len(batch) > 1:
+                mid = len(batch) // 2
+                logger.warning(f"Embedding batch of {len(batch)} rejected as too large, splitting.")
+                return await self._aembed_batch(batch[:mid], task_type) + await self._aembed_batch(batch[mid:], task_type)
+            logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+            return [None] * len(batch)
+
+    async def _arequest_with_retry(self, batch: List[str], task_type: str) -> List[List[float]]:
+        retryer = AsyncRetrying(**self._retry_policy())
+        async for attempt in retryer:
+            with attempt:
+                return await self._arequest(batch, task_type)
+
+    async def _arequest(self, batch: List[str], task_type: str) -> List[List[float]]:
+        self.request_count += 1
+        result = await self.client.aio.models.embed_content(
+            model=self.model_name,
+            contents=batch,
+            config={"task_type": task_type, "output_dimensionality": self.output_dimensionality},
+        )
+        return self._vectors(result, batch)
+
+    def _retry_policy(self) -> Dict:
+        return {
+            "stop": stop_after_attempt(self.max_retries),
+            "wait": wait_exponential(multiplier=1, min=1, max=20),
+            "retry": retry_if_exception(lambda e: _is_retryable(e) and not _is_oversized(e)),
+            "reraise": True,
+        }
+
+    def _request(self, batch: List[str], task_type: str) -> List[List[float]]:
+        self.request_count += 1
+        result = self.client.models.embed_content(
+            model=self.model_name,
+            contents=batch,
+            config={"task_type": task_type, "output_dimensionality": self.output_dimensionality},
+        )
+        return self._vectors(result, batch)
+
+    @staticmethod
+    def _vectors(result, batch: List[str]) -> List[List[float]]:
+        if len(result.embeddings) != len(batch):
+            raise ValueError(f"Expected {len(batch)} embeddings, got {len(result.embeddings)}")
+        # Plain Python floats so the vectors serialize cleanly for PostgREST
+        return [[float(v) for v in emb.values] for emb in result.embeddings]
+
+
+# Global instance
+_embedding_engine = None
+
+def get_embedding_engine() -> Optional[EmbeddingEngine]:
+    global _embedding_engine
+    if _embedding_engine is None:
+        settings = get_settings()
+        if not settings.GEMINI_API_KEY:
+            return None
+        _embedding_engine = EmbeddingEngine(api_key=settings.GEMINI_API_KEY, cache=get_embedding_cache())
+    return _embedding_engine
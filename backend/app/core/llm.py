@@ -0,0 +1,19 @@
+from google import genai
+from app.core.config import get_settings
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Global instance (one connection pool for all Gemini generate calls)
+_genai_client = None
+
+def get_genai_client() -> Optional[genai.Client]:
+    global _genai_client
+    if _genai_client is None:
+        settings = get_settings()
+        if not settings.GEMINI_API_KEY:
+            logger.warning("GEMINI_API_KEY not set. LLM calls are disabled.")
+            return None
+        _genai_client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    return _genai_client
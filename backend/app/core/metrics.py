@@ -0,0 +1,192 @@
+"""Latency histograms for the query and ingest paths, in Prometheus text format.
+
+Code wraps each stage in `span("stage")`. Every span is recorded twice:
+- in a per-stage histogram, with cumulative buckets plus p50/p95/p99 over a
+  window of recent samples;
+- in the current request's timing list, which the HTTP middleware turns
+  into a Server-Timing header.
+
+Spans inside `asyncio.to_thread` still reach the request's list because the
+thread runs in a copy of the caller's context. Tasks copy it too, so
+long-lived workers that may be started during a request call
+`detach_request_timings()` first.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, window: int = 1024):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        # Quantiles come from the most recent samples only, so they track regressions
+        self.recent: deque = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        if not self.recent:
+            return {q: 0.0 for q in QUANTILES}
+        ordered = sorted(self.recent)
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = {}
+        self._errors: Counter = Counter()
+        # (method, route, status) -> histogram
+        self._requests: Dict[Tuple[str, str, int], Histogram] = {}
+
+    def observe(self, stage: str, seconds: float, error: bool = False):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram()
+            histogram.observe(seconds)
+            if error:
+                self._errors[stage] += 1
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, status)
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram()
+            histogram.observe(seconds)
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """{stage: {count, p50, p95, p99, errors}} for logs and tests."""
+        with self._lock:
+            out = {}
+            for stage, histogram in self._stages.items():
+                quantiles = histogram.quantiles()
+                out[stage] = {
+                    "count": histogram.count,
+                    **{f"p{int(q * 100)}": round(v, 6) for q, v in quantiles.items()},
+                    "errors": self._errors[stage],
+                }
+            return out
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            stages = sorted(self._stages.items())
+            requests = sorted(self._requests.items())
+            errors = dict(self._errors)
+
+            self._render_histogram(
+                lines, "retake_stage_duration_seconds", "Time spent in each query/ingest stage.",
+                [(_labels(stage=stage), h) for stage, h in stages],
+            )
+            lines.append("# HELP retake_stage_latency_seconds Recent-window latency quantiles per stage.")
+            lines.append("# TYPE retake_stage_latency_seconds summary")
+            for stage, h in stages:
+                for q, value in h.quantiles().items():
+                    lines.append(f"retake_stage_latency_seconds{{{_labels(stage=stage, quantile=q)}}} {value:.6f}")
+                lines.append(f"retake_stage_latency_seconds_sum{{{_labels(stage=stage)}}} {h.sum:.6f}")
+                lines.append(f"retake_stage_latency_seconds_count{{{_labels(stage=stage)}}} {h.count}")
+            lines.append("# HELP retake_stage_errors_total Stage spans that ended in an exception.")
+            lines.append("# TYPE retake_stage_errors_total counter")
+            for stage, _ in stages:
+                lines.append(f"retake_stage_errors_total{{{_labels(stage=stage)}}} {errors.get(stage, 0)}")
+
+            self._render_histogram(
+                lines, "retake_http_request_duration_seconds", "HTTP request handling time.",
+                [(_labels(method=m, route=r, status=s), h) for (m, r, s), h in requests],
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(lines: List[str], name: str, help_text: str, series: List[Tuple[str, Histogram]]):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, h in series:
+            cumulative = 0
+            for bound, count in zip(h.buckets + (float("inf"),), h.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+
+# Global instance
+_metrics = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    return _metrics
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block as `stage`; works around awaits as well as blocking code."""
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _metrics.observe(stage, elapsed, failed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def start_request_timings() -> Tuple[List[Tuple[str, float]], contextvars.Token]:
+    timings: List[Tuple[str, float]] = []
+    return timings, _request_timings.set(timings)
+
+
+def end_request_timings(token: contextvars.Token):
+    _request_timings.reset(token)
+
+
+def detach_request_timings():
+    """Stop the current task adding spans to the request it was created in."""
+    _request_timings.set(None)
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing value: one entry per stage (durations summed, in ms) plus the total."""
+    durations: Dict[str, float] = {}
+    counts: Counter = Counter()
+    for stage, seconds in timings:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+        counts[stage] += 1
+    entries = [
+        f"{stage};dur={seconds * 1000:.1f}" + (f';desc="x{counts[stage]}"' if counts[stage] > 1 else "")
+        for stage, seconds in durations.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
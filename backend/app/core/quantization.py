@@ -0,0 +1,174 @@
+"""Compact codes for round embeddings.
+
+Two quantizers share one interface (fit / encode / scores):
+
+- ScalarQuantizer: one uint8 per dimension, with a per-dimension affine range
+  learned from the data (4x smaller than float32).
+- ProductQuantizer: the vector is cut into `subspaces` chunks and each chunk
+  is replaced by the id of its nearest of 256 k-means centroids (one byte per
+  chunk, 32x smaller for 768 dims split into 96 subspaces).
+
+scores() is asymmetric: the float32 query is compared against codes without
+decoding the corpus, and large code matrices are processed in blocks so the
+temporary float buffers stay small.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+
+_BLOCK_ROWS = 8192
+# Small enough that the decoded float block stays in cache while it is scored
+_SCORE_BLOCK_ROWS = 512
+
+
+def _blocks(n: int, size: int = _BLOCK_ROWS):
+    for start in range(0, n, size):
+        yield start, min(n, start + size)
+
+
+class ScalarQuantizer:
+    kind = "int8"
+    column_major = False
+
+    def __init__(self, dims: int):
+        self.dims = dims
+        self.low: Optional[np.ndarray] = None
+        self.step: Optional[np.ndarray] = None
+
+    @property
+    def code_size(self) -> int:
+        return self.dims
+
+    def fit(self, vectors: np.ndarray) -> "ScalarQuantizer":
+        # Clip the extreme tails so one outlier doesn't waste the whole code range
+        low = np.percentile(vectors, 0.1, axis=0).astype(np.float32)
+        high = np.percentile(vectors, 99.9, axis=0).astype(np.float32)
+        self.low = low
+        self.step = np.maximum(high - low, 1e-12) / 255.0
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(vectors), self.dims), dtype=np.uint8)
+        for start, end in _blocks(len(vectors)):
+            scaled = np.rint((np.asarray(vectors[start:end], dtype=np.float32) - self.low) / self.step)
+            codes[start:end] = np.clip(scaled, 0, 255)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.step + self.low
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # q . (low + step * c) = q . low + (q * step) . c
+        weights = (query * self.step).astype(np.float32)
+        bias = float(query @ self.low)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start, end in _blocks(len(codes), _SCORE_BLOCK_ROWS):
+            out[start:end] = codes[start:end].astype(np.float32) @ weights
+        return out + bias
+
+    def save(self, path: str):
+        np.savez(path, kind=self.kind, low=self.low, step=self.step)
+
+
+class ProductQuantizer:
+    kind = "pq"
+    column_major = True
+
+    def __init__(self, dims: int, subspaces: int = 96, centroids: int = 256, iterations: int = 10, seed: int = 0):
+        if dims % subspaces:
+            raise ValueError(f"{dims} dimensions cannot be split into {subspaces} subspaces")
+        self.dims = dims
+        self.subspaces = subspaces
+        self.sub_dims = dims // subspaces
+        self.centroids = centroids
+        self.iterations = iterations
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None  # (subspaces, centroids, sub_dims)
+
+    @property
+    def code_size(self) -> int:
+        return self.subspaces
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.subspaces, self.sub_dims)
+
+    def fit(self, vectors: np.ndarray, sample: int = 10000) -> "ProductQuantizer":
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > sample:
+            vectors = vectors[np.sort(rng.choice(len(vectors), sample, replace=False))]
+        parts = self._split(vectors)
+        k = min(self.centroids, len(vectors))
+        codebooks = np.zeros((self.subspaces, self.centroids, self.sub_dims), dtype=np.float32)
+        for s in range(self.subspaces):
+            data = np.ascontiguousarray(parts[:, s, :])
+            centers = data[rng.choice(len(data), k, replace=False)].copy()
+            for _ in range(self.iterations):
+                assign = self._nearest(data, centers)
+                counts = np.bincount(assign, minlength=k)[:, None]
+                sums = np.stack(
+                    [np.bincount(assign, weights=data[:, d], minlength=k) for d in range(self.sub_dims)], axis=1
+                )
+                # Empty clusters keep their previous center
+                centers = np.where(counts > 0, sums / np.maximum(counts, 1), centers).astype(np.float32)
+            codebooks[s, :k] = centers
+            if k < self.centroids:
+                codebooks[s, k:] = centers[0]
+        self.codebooks = codebooks
+        return self
+
+    @staticmethod
+    def _nearest(data: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        # argmin ||x - c||^2 = argmin (||c||^2 - 2 x.c)
+        return np.argmin((centers * centers).sum(1) - 2.0 * data @ centers.T, axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for start, end in _blocks(len(vectors)):
+            parts = self._split(vectors[start:end])
+            for s in range(self.subspaces):
+                codes[start:end, s] = self._nearest(np.ascontiguousarray(parts[:, s, :]), self.codebooks[s])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.codebooks[np.arange(self.subspaces), codes].reshape(len(codes), self.dims)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # Lookup table of query-chunk . centroid, then one gather per subspace.
+        # Snapshots store PQ codes column-major so each codes[:, s] is contiguous.
+        table = np.einsum("skd,sd->sk", self.codebooks, query.reshape(self.subspaces, self.sub_dims))
+        out = np.zeros(len(codes), dtype=np.float32)
+        for s in range(self.subspaces):
+            out += table[s].take(codes[:, s])
+        return out
+
+    def save(self, path: str):
+        np.savez(path, kind=self.kind, codebooks=self.codebooks)
+
+
+def make_quantizer(kind: str, dims: int, pq_subspaces: int = 96):
+    """Quantizer for a LOCAL_INDEX_QUANTIZATION value; None for "none"."""
+    if kind in (None, "", "none"):
+        return None
+    if kind == "int8":
+        return ScalarQuantizer(dims)
+    if kind == "pq":
+        return ProductQuantizer(dims, subspaces=pq_subspaces)
+    raise ValueError(f"Unknown quantization {kind!r}")
+
+
+def load_quantizer(path: str, dims: int):
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        kind = str(data["kind"])
+        if kind == "int8":
+            quantizer = ScalarQuantizer(dims)
+            quantizer.low, quantizer.step = data["low"], data["step"]
+        elif kind == "pq":
+            codebooks = data["codebooks"]
+            quantizer = ProductQuantizer(dims, subspaces=codebooks.shape[0], centroids=codebooks.shape[1])
+            quantizer.codebooks = codebooks
+        else:
+            raise ValueError(f"Unknown quantizer kind {kind!r} in {path}")
+    return quantizer
@@ -0,0 +1,116 @@
+"""In-process cache of /query responses.
+
+Entries are keyed by normalized query text + filters + n_results and bounded
+by both a TTL and an LRU size. Each entry remembers the team and map its
+search was filtered on; when new rounds are written, ingestion calls
+invalidate_rounds() and every entry those rounds could appear in is dropped
+(same team or no team filter, and same map or no map filter).
+
+A search that started before an invalidation is not stored when it finishes,
+so a result computed from pre-ingest data can never be cached afterwards.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.config import get_settings
+from app.core.text import normalize_query
+
+logger = logging.getLogger(__name__)
+
+QueryKey = Tuple[str, str, int]
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = 512, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, team, map, value)
+        self._entries: "OrderedDict[QueryKey, Tuple[float, Optional[str], Optional[str], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def make_key(query_text: str, filters: Optional[Dict[str, Any]], n_results: int) -> QueryKey:
+        return (normalize_query(query_text), json.dumps(filters or {}, sort_keys=True, default=str), int(n_results))
+
+    def get(self, key: QueryKey) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def put(self, key: QueryKey, value: Any, team: Optional[str], map_name: Optional[str], generation: int):
+        """Store a response computed while `generation` was current; dropped if rounds landed since."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, team, map_name.lower() if map_name else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_rounds(self, rounds: Iterable[Dict[str, Any]]) -> int:
+        """Drop every entry whose filters the given rounds satisfy; returns how many."""
+        pairs: Set[Tuple[Optional[str], str]] = set()
+        for r in rounds:
+            map_name = (r.get("map_name") or "").lower()
+            for team in (r.get("team_a_slug"), r.get("team_b_slug"), r.get("winner_slug")):
+                if team:
+                    pairs.add((team, map_name))
+        teams = {team for team, _ in pairs}
+        maps = {map_name for _, map_name in pairs}
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key for key, (_, team, map_name, _) in self._entries.items()
+                if (team is None or team in teams) and (map_name is None or map_name in maps)
+                and (team is None or map_name is None or (team, map_name) in pairs)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidated += len(stale)
+        if stale:
+            logger.info(f"Query cache: invalidated {len(stale)} entries")
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidated": self.invalidated,
+                "generation": self.generation,
+            }
+
+
+# Global instance
+_query_cache = None
+
+def get_query_cache() -> Optional[QueryCache]:
+    global _query_cache
+    if _query_cache is None:
+        settings = get_settings()
+        if not settings.QUERY_CACHE_ENABLED:
+            return None
+        _query_cache = QueryCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL)
+    return _query_cache
@@ -0,0 +1,411 @@
+"""Local columnar store of processed rounds, for Analyze aggregates.
+
+Every round emitted by MatchDataProcessor.process_series_data is kept as one
+row in a struct-of-arrays table, partitioned by event. Teams (by slug), maps,
+round types, win conditions and matches are dictionary-encoded into small
+ints shared by all partitions; scores, round numbers and VOD timestamps are
+plain int columns. A partition is one .npz file under `path`/events and is
+rewritten atomically whenever a series of that event is ingested, replacing
+the rows of the matches it contains.
+
+Aggregations (win rates, value distributions) filter with boolean masks over
+the code columns and group with a mixed-radix key + bincount, so a season of
+rounds is summarized in milliseconds without touching the vector stores.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# column -> (shared dictionary or None, dtype, source field in a processed round)
+COLUMNS = {
+    "match": ("match", "int32", "match_id"),
+    "round_id": (None, "int64", "round_id"),
+    "round_num": (None, "int16", "round_num"),
+    "map": ("map", "int16", "map_name"),
+    "team_a": ("team", "int32", "team_a_slug"),
+    "team_b": ("team", "int32", "team_b_slug"),
+    "winner": ("team", "int32", "winner_slug"),
+    "round_type": ("round_type", "int16", "round_type"),
+    "win_condition": ("win_condition", "int16", "win_condition"),
+    "is_pistol": (None, "bool", "is_pistol"),
+    "score_a": (None, "int16", "score_a"),
+    "score_b": (None, "int16", "score_b"),
+    "vod_timestamp": (None, "int32", "vod_timestamp"),
+}
+
+DICTIONARIES = ("match", "map", "team", "round_type", "win_condition")
+
+# Partition for rounds ingested without an event (single series, JIT discovery)
+UNASSIGNED_EVENT = "unassigned"
+
+# Largest group-key space counted with a dense bincount instead of np.unique
+_DENSE_GROUP_LIMIT = 1 << 22
+
+# Dictionaries matched case-insensitively when filtering
+_CASELESS = ("map", "round_type", "win_condition", "team")
+
+
+def _partition_name(event: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", event) or "_"
+
+
+def _as_int(value: Any, default: int = -1) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class _Dictionary:
+    """Append-only value <-> code mapping; codes never change once assigned."""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = list(values or [])
+        self._codes = {v: i for i, v in enumerate(self.values)}
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value: Any) -> int:
+        value = "" if value is None else str(value)
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: Any, caseless: bool = False) -> List[int]:
+        """Codes matching a filter value (several when caseless); empty when unseen."""
+        value = str(value)
+        if not caseless:
+            code = self._codes.get(value)
+            return [] if code is None else [code]
+        value = value.lower()
+        return [i for i, v in enumerate(self.values) if v.lower() == value]
+
+
+class RoundStore:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dicts = {name: _Dictionary() for name in DICTIONARIES}
+        self.team_names: Dict[str, str] = {}
+        self._partitions: Dict[str, Dict[str, "np.ndarray"]] = {}
+        self._merged = None
+        if path:
+            self._load()
+
+    # --- persistence -------------------------------------------------------
+
+    def _load(self):
+        dict_path = os.path.join(self.path, "dictionaries.json")
+        if os.path.exists(dict_path):
+            with open(dict_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._dicts = {name: _Dictionary(data["dictionaries"].get(name)) for name in DICTIONARIES}
+            self.team_names = data.get("team_names", {})
+        events_dir = os.path.join(self.path, "events")
+        if not os.path.isdir(events_dir):
+            return
+        for filename in os.listdir(events_dir):
+            if not filename.endswith(".npz"):
+                continue
+            try:
+                with np.load(os.path.join(events_dir, filename), allow_pickle=False) as data:
+                    event = str(data["__event__"])
+                    self._partitions[event] = {name: data[name] for name in COLUMNS}
+            except Exception as e:
+                logger.error(f"Round store: skipping unreadable partition {filename}: {e}")
+
+    def _write_atomic(self, path: str, write):
+        tmp = f"{path}.tmp-{time.time_ns()}"
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+
+    def _save(self, event: str):
+        """Persist the dictionaries, then one partition; caller holds the lock."""
+        if not self.path:
+            return
+        os.makedirs(os.path.join(self.path, "events"), exist_ok=True)
+        # Codes only ever grow, so writing dictionaries first keeps every partition decodable
+        payload = json.dumps({
+            "dictionaries": {name: d.values for name, d in self._dicts.items()},
+            "team_names": self.team_names,
+        }).encode("utf-8")
+        self._write_atomic(os.path.join(self.path, "dictionaries.json"), lambda f: f.write(payload))
+        columns = self._partitions[event]
+        self._write_atomic(
+            os.path.join(self.path, "events", f"{_partition_name(event)}.npz"),
+            lambda f: np.savez(f, __event__=np.array(event), **columns),
+        )
+
+    # --- writes ------------------------------------------------------------
+
+    def write_series(self, event: str, rounds) -> int:
+        """
+        Replace the rows of every match in `rounds` within the event's partition.
+        `rounds` is a list of processed rounds or a columnar batch
+        (process_series_data(columnar=True)).
+        """
+        count = len(rounds["match_id"]) if isinstance(rounds, dict) else len(rounds)
+        if not count:
+            return 0
+        event = str(event)
+        with self._lock:
+            new = self._encode(rounds)
+            current = self._partitions.get(event)
+            if current is not None and len(current["match"]):
+                keep = ~np.isin(current["match"], np.unique(new["match"]))
+                new = {name: np.concatenate([current[name][keep], new[name]]) for name in COLUMNS}
+            self._partitions[event] = new
+            self._merged = None
+            self._save(event)
+        return count
+
+    def _encode(self, rounds) -> Dict[str, "np.ndarray"]:
+        if isinstance(rounds, dict):
+            field_values = lambda field: rounds.get(field) or [None] * len(rounds["match_id"])
+        else:
+            field_values = lambda field: [r.get(field) for r in rounds]
+
+        columns = {}
+        for name, (dictionary, dtype, field) in COLUMNS.items():
+            raw = field_values(field)
+            if dictionary is not None:
+                encode = self._dicts[dictionary].encode
+                values = [encode(v) for v in raw]
+            elif dtype == "bool":
+                values = [bool(v) for v in raw]
+            else:
+                values = [_as_int(v) for v in raw]
+            columns[name] = np.array(values, dtype=dtype)
+        for slug_field, name_field in (("team_a_slug", "team_a"), ("team_b_slug", "team_b")):
+            for slug, name in zip(field_values(slug_field), field_values(name_field)):
+                if slug and name:
+                    self.team_names[slug] = name
+        return columns
+
+    def delete_event(self, event: str) -> bool:
+        with self._lock:
+            if self._partitions.pop(str(event), None) is None:
+                return False
+            self._merged = None
+            if self.path:
+                try:
+                    os.remove(os.path.join(self.path, "events", f"{_partition_name(str(event))}.npz"))
+                except FileNotFoundError:
+                    pass
+        return True
+
+    # --- reads -------------------------------------------------------------
+
+    def events(self) -> List[str]:
+        with self._lock:
+            return sorted(self._partitions)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            partitions = {event: int(len(cols["match"])) for event, cols in self._partitions.items()}
+            nbytes = sum(arr.nbytes for cols in self._partitions.values() for arr in cols.values())
+            dictionary_sizes = {name: len(d) for name, d in self._dicts.items()}
+        return {
+            "events": len(partitions),
+            "rounds": sum(partitions.values()),
+            "column_bytes": nbytes,
+            "dictionaries": dictionary_sizes,
+            "partitions": partitions,
+        }
+
+    def _select(self, events: Optional[Iterable[str]]):
+        """
+        Concatenated columns of the chosen partitions, plus an "event" code
+        column indexing the returned event names. The all-events table is
+        cached until the next write.
+        """
+        with self._lock:
+            if events is None and self._merged is not None:
+                return self._merged
+            names = sorted(self._partitions) if events is None else [e for e in map(str, events) if e in self._partitions]
+            parts = [self._partitions[e] for e in names]
+            if parts:
+                columns = {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+                columns["event"] = np.repeat(np.arange(len(parts), dtype=np.int32), [len(p["match"]) for p in parts])
+            else:
+                columns = {name: np.zeros(0, dtype=dtype) for name, (_, dtype, _) in COLUMNS.items()}
+                columns["event"] = np.zeros(0, dtype=np.int32)
+            if events is None:
+                self._merged = (columns, names)
+            return columns, names
+
+    def _codes(self, column: str, value: Any) -> Optional["np.ndarray"]:
+        dictionary = COLUMNS[column][0] if column in COLUMNS else "team"
+        return np.array(self._dicts[dictionary].lookup(value, caseless=dictionary in _CASELESS), dtype=np.int64)
+
+    def _mask(self, columns: Dict[str, "np.ndarray"], filters: Optional[Dict[str, Any]]) -> "np.ndarray":
+        """AND of every non-null filter; "team" matches either side."""
+        mask = np.ones(len(columns["match"]), dtype=bool)
+        for column, value in (filters or {}).items():
+            if value is None:
+                continue
+            if column == "team":
+                codes = self._codes("team", value)
+                mask &= np.isin(columns["team_a"], codes) | np.isin(columns["team_b"], codes)
+            elif column not in COLUMNS:
+                raise ValueError(f"Unknown round store filter {column!r}")
+            elif COLUMNS[column][0] is not None:
+                mask &= np.isin(columns[column], self._codes(column, value))
+            else:
+                mask &= columns[column] == value
+        return mask
+
+    @staticmethod
+    def _team_perspective(columns: Dict[str, "np.ndarray"], keep: Iterable[str]) -> Dict[str, "np.ndarray"]:
+        """Each round twice, once per side: "team", "opponent", "won" and the `keep` columns."""
+        doubled = {name: np.concatenate([columns[name], columns[name]]) for name in keep if name in columns}
+        doubled["team"] = np.concatenate([columns["team_a"], columns["team_b"]])
+        doubled["opponent"] = np.concatenate([columns["team_b"], columns["team_a"]])
+        doubled["won"] = np.concatenate([columns["winner"] == columns["team_a"], columns["winner"] == columns["team_b"]])
+        return doubled
+
+    def _group(self, columns: Dict[str, "np.ndarray"], by: Sequence[str], names: List[str]):
+        """(unique group rows as decoded dicts, inverse index) for the `by` columns."""
+        n = len(next(iter(columns.values())))
+        key = np.zeros(n, dtype=np.int64)
+        sizes = []
+        space = 1
+        for column in by:
+            values = columns[column].astype(np.int64)
+            offset = int(values.min()) if n else 0
+            size = int(values.max()) - offset + 1 if n else 1
+            sizes.append((offset, size))
+            space *= size
+            key = key * size + (values - offset)
+        if space <= _DENSE_GROUP_LIMIT:
+            # Small key space: one bincount instead of sorting the keys
+            present = np.bincount(key, minlength=space) > 0
+            unique = np.flatnonzero(present)
+            position = np.cumsum(present) - 1
+            inverse = position[key]
+        else:
+            unique, inverse = np.unique(key, return_inverse=True)
+
+        decoded = [dict() for _ in range(len(unique))]
+        remainder = unique.copy()
+        for column, (offset, size) in reversed(list(zip(by, sizes))):
+            codes = remainder % size + offset
+            remainder //= size
+            for row, code in zip(decoded, codes.tolist()):
+                row[column] = self._decode(column, code, names)
+        return decoded, inverse.reshape(-1)
+
+    def _decode(self, column: str, code: int, names: List[str]) -> Any:
+        if column == "event":
+            return names[code]
+        if column in ("team", "opponent"):
+            return self._dicts["team"].values[code]
+        dictionary, dtype, _ = COLUMNS[column]
+        if dictionary is not None:
+            return self._dicts[dictionary].values[code]
+        return bool(code) if dtype == "bool" else code
+
+    def win_rates(
+        self,
+        by: Sequence[str] = ("team",),
+        filters: Optional[Dict[str, Any]] = None,
+        events: Optional[Iterable[str]] = None,
+        min_rounds: int = 1,
+    ) -> List[Dict[str, Any]]:
+        """
+        Round win rate from each team's point of view, grouped by `by`.
+
+        `by` and `filters` may use "team" / "opponent" (the side being
+        measured) and any store column, e.g. pistol win rate per team per map:
+        win_rates(by=("team", "map"), filters={"is_pistol": True}).
+        """
+        columns, names = self._select(events)
+        filters = dict(filters or {})
+        perspective = {k: filters.pop(k) for k in ("team", "opponent") if filters.get(k) is not None}
+        # Filter on the round first, then split it into its two sides
+        mask = self._mask(columns, filters)
+        if perspective:
+            mask &= self._mask(columns, {"team": next(iter(perspective.values()))})
+        selected = {name: columns[name][mask] for name in set(by) | {"team_a", "team_b", "winner"} if name in columns}
+        rows = self._team_perspective(selected, by)
+        if perspective:
+            side = np.ones(len(rows["won"]), dtype=bool)
+            for column, value in perspective.items():
+                side &= np.isin(rows[column], self._codes("team", value))
+            rows = {name: arr[side] for name, arr in rows.items()}
+        if not len(rows["won"]):
+            return []
+
+        groups, inverse = self._group(rows, by, names)
+        rounds = np.bincount(inverse, minlength=len(groups))
+        wins = np.bincount(inverse, weights=rows["won"], minlength=len(groups))
+        out = []
+        for group, n, w in zip(groups, rounds.tolist(), wins.tolist()):
+            if n < min_rounds:
+                continue
+            group.update({"rounds": n, "wins": int(w), "win_rate": round(w / n, 4)})
+            out.append(group)
+        out.sort(key=lambda g: (-g["rounds"], -g["win_rate"]))
+        return out
+
+    def distribution(
+        self,
+        column: str,
+        by: Sequence[str] = (),
+        filters: Optional[Dict[str, Any]] = None,
+        events: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Round counts per value of `column` (e.g. win_condition), optionally per
+        `by` group, with each value's share of its group.
+        """
+        columns, names = self._select(events)
+        mask = self._mask(columns, filters)
+        rows = {name: columns[name][mask] for name in set(by) | {column}}
+        if not mask.any():
+            return []
+
+        groups, inverse = self._group(rows, tuple(by) + (column,), names)
+        counts = np.bincount(inverse, minlength=len(groups))
+        if by:
+            outer, outer_inverse = self._group(rows, tuple(by), names)
+            totals = np.bincount(outer_inverse, minlength=len(outer))
+            # Every member of a fine group shares its outer group
+            first = np.zeros(len(groups), dtype=np.int64)
+            first[inverse] = outer_inverse
+            group_totals = totals[first]
+        else:
+            group_totals = np.full(len(groups), int(mask.sum()))
+        out = []
+        for group, n, total in zip(groups, counts.tolist(), group_totals.tolist()):
+            group.update({"rounds": n, "share": round(n / total, 4)})
+            out.append(group)
+        out.sort(key=lambda g: tuple(str(g[b]) for b in by) + (-g["rounds"],))
+        return out
+
+
+# Global instance
+_round_store = None
+
+def get_round_store() -> Optional[RoundStore]:
+    global _round_store
+    if _round_store is None:
+        settings = get_settings()
+        if not settings.ROUND_STORE_ENABLED:
+            return None
+        _round_store = RoundStore(os.path.join(settings.LOCAL_CACHE_DIRECTORY, "round_store"))
+    return _round_store
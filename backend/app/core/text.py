@@ -0,0 +1,9 @@
+"""Query text normalization shared by the intent parser and the /query cache."""
+import re
+import unicodedata
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, NFC-normalize and collapse everything but letters/digits to single spaces."""
+    text = unicodedata.normalize("NFC", text.lower())
+    return " ".join(re.findall(r"\w+", text))
@@ -0,0 +1,651 @@
+"""In-process vector index over round embeddings.
+
+The whole round corpus fits in RAM, so filtered search can skip the network
+entirely: vectors are L2-normalized float32 rows and each filter column
+(team, map, round type, pistol) has a boolean bitmap per value. A filtered
+top-k intersects the bitmaps, scores the surviving rows with one matmul and
+selects with argpartition.
+
+Rows live in two segments:
+
+- the base segment comes from the last snapshot. Its full vectors are
+  memory-mapped from disk and, with quantization enabled, it is scanned
+  through compact int8 or PQ codes instead. Its filter columns are
+  dictionary-encoded arrays that become bitmaps on load. Its display
+  records are only parsed for the rows a search returns.
+- the delta segment holds rows written since then, as float32 in RAM.
+
+Saving a snapshot folds the delta into a new base.
+
+The index only starts empty. Until bootstrap_from_supabase() has loaded the
+existing round_embeddings and marked it `complete`, it holds just the rounds
+written since it was enabled, and /query keeps searching Supabase.
+
+Large candidate sets are scored in two stages. A coarse pass ranks the rows
+on their codes, or on a renormalized Matryoshka prefix of `prefix_dims`
+components. Only the best `coarse_candidates` rows are then reranked exactly
+on the full vectors.
+"""
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.quantization import load_quantizer, make_quantizer
+
+logger = logging.getLogger(__name__)
+
+# Record fields kept per row and returned with search hits
+RECORD_FIELDS = (
+    "external_id", "summary", "team_a", "team_b", "team_a_slug", "team_b_slug", "winner_slug",
+    "score_a", "score_b", "map_name", "round_num", "winning_team", "round_type", "is_pistol",
+    "vod_url", "vod_timestamp", "match_id_rib",
+)
+
+FILTER_COLUMNS = ("team_slug", "map_name", "round_type", "is_pistol")
+
+# Snapshot columns stored as dictionary codes: record field -> (dictionary, filter column).
+# The three team fields share one dictionary and all feed the team_slug bitmaps.
+_CODED_FIELDS = {
+    "team_a_slug": ("team", "team_slug"),
+    "team_b_slug": ("team", "team_slug"),
+    "winner_slug": ("team", "team_slug"),
+    "map_name": ("map_name", "map_name"),
+    "round_type": ("round_type", "round_type"),
+}
+_DICTIONARIES = ("team", "map_name", "round_type")
+
+# Rows used to fit a quantizer when a snapshot is written
+_QUANTIZER_SAMPLE = 50_000
+
+
+def _filter_values(record: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Bitmap keys a record belongs to; a round matches a team filter for either side."""
+    teams = {record.get("team_a_slug"), record.get("team_b_slug"), record.get("winner_slug")}
+    return {
+        "team_slug": [t for t in teams if t],
+        "map_name": [record.get("map_name")] if record.get("map_name") else [],
+        "round_type": [record.get("round_type")] if record.get("round_type") else [],
+        "is_pistol": [bool(record.get("is_pistol", False))],
+    }
+
+
+def _unit(vec: "np.ndarray") -> "np.ndarray":
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+def _unit_rows(matrix: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class _Segment:
+    """Read-only rows of a snapshot directory, memory-mapped."""
+
+    def __init__(self, directory: str, dims: int):
+        self.directory = directory
+        self.full = np.load(os.path.join(directory, "full.npy"), mmap_mode="r")
+        codes_path = os.path.join(directory, "codes.npy")
+        self.codes = np.load(codes_path, mmap_mode="r") if os.path.exists(codes_path) else None
+        self.quantizer = load_quantizer(os.path.join(directory, "quantizer.npz"), dims)
+        self.complete = os.path.exists(os.path.join(directory, "COMPLETE"))
+        self.ids = [str(i) for i in np.load(os.path.join(directory, "ids.npy"), allow_pickle=False)]
+        with np.load(os.path.join(directory, "filters.npz"), allow_pickle=False) as data:
+            self.filter_codes = {field: data[field] for field in _CODED_FIELDS}
+            self.is_pistol = data["is_pistol"]
+            self.dictionaries = {name: [str(v) for v in data[f"dict_{name}"]] for name in _DICTIONARIES}
+        # records.jsonl holds one JSON record per row; offsets[row]:offsets[row + 1] is its byte range
+        self.offsets = np.load(os.path.join(directory, "record_offsets.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "records.jsonl"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self.full.shape != (len(self.ids), dims):
+            raise ValueError(f"Snapshot {directory} has shape {self.full.shape}, expected ({len(self.ids)}, {dims})")
+        if len(self.offsets) != len(self.ids) + 1:
+            raise ValueError(f"Snapshot {directory} has {len(self.offsets) - 1} records for {len(self.ids)} rows")
+
+    def raw_record(self, row: int) -> bytes:
+        return self._records[int(self.offsets[row]):int(self.offsets[row + 1])]
+
+    def record(self, row: int) -> Dict[str, Any]:
+        return json.loads(self.raw_record(row))
+
+
+class VectorIndex:
+    def __init__(
+        self,
+        dims: int,
+        prefix_dims: int = 0,
+        coarse_candidates: int = 200,
+        initial_capacity: int = 1024,
+        quantization: str = "none",
+        pq_subspaces: int = 96,
+        rerank: bool = True,
+    ):
+        self.dims = dims
+        self.prefix_dims = prefix_dims if 0 < prefix_dims < dims else 0
+        self.coarse_candidates = max(1, coarse_candidates)
+        self.quantization = quantization or "none"
+        self.pq_subspaces = pq_subspaces
+        self.rerank = rerank
+        make_quantizer(self.quantization, dims, pq_subspaces)  # validate early
+        self._lock = threading.RLock()
+        # Serializes save(): one snapshot write, CURRENT swap and prune at a time
+        self._save_lock = threading.Lock()
+        self._initial_capacity = max(1, initial_capacity)
+        self._version = 0
+        self.dirty = False
+        self.last_saved = 0.0
+        # True once every existing round has been loaded (see bootstrap_from_supabase)
+        self.complete = False
+        self._install(None)
+
+    def _install(self, segment: Optional[_Segment]):
+        """Reset to `segment` as the base with an empty delta."""
+        self._segment = segment
+        self._base_rows = len(segment.ids) if segment else 0
+        self._base_prefix = None
+        self._quantizer = None
+        self._codes = None
+        if segment is not None:
+            if self.quantization != "none":
+                if segment.quantizer is not None and segment.quantizer.kind == self.quantization:
+                    self._quantizer, self._codes = segment.quantizer, segment.codes
+                elif self._base_rows:
+                    # Snapshot was written with other settings; re-encode it in memory
+                    self._quantizer = make_quantizer(self.quantization, self.dims, self.pq_subspaces)
+                    self._quantizer.fit(segment.full[:_QUANTIZER_SAMPLE])
+                    codes = self._quantizer.encode(segment.full)
+                    self._codes = np.asfortranarray(codes) if self._quantizer.column_major else codes
+            elif self.prefix_dims and self._base_rows:
+                self._base_prefix = _unit_rows(np.asarray(segment.full[:, :self.prefix_dims]))
+
+        total = self._base_rows + self._initial_capacity
+        self._delta_capacity = self._initial_capacity
+        self._size = self._base_rows
+        self._matrix = np.zeros((self._delta_capacity, self.dims), dtype=np.float32)
+        self._prefix = np.zeros((self._delta_capacity, self.prefix_dims), dtype=np.float32)
+        self._alive = np.zeros(total, dtype=bool)
+        self._bitmaps: Dict[str, Dict[Any, "np.ndarray"]] = {col: {} for col in FILTER_COLUMNS}
+        self._ids: List[str] = []
+        # Records of delta rows only; base records are read from the segment on demand
+        self._records: List[Optional[Dict[str, Any]]] = []
+        self._id_to_row: Dict[str, int] = {}
+        if segment is not None:
+            self._ids = list(segment.ids)
+            self._id_to_row = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            self._alive[:self._base_rows] = True
+            self._index_segment(segment)
+
+    def __len__(self) -> int:
+        return len(self._id_to_row)
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._id_to_row
+
+    def mark_complete(self):
+        with self._lock:
+            self.complete = True
+            self.dirty = True
+
+    # --- Writes ---------------------------------------------------------------
+
+    def _grow(self, needed: int):
+        """Make room for `needed` delta rows."""
+        if needed <= self._delta_capacity:
+            return
+        capacity = self._delta_capacity
+        while capacity < needed:
+            capacity *= 2
+        extra = capacity - self._delta_capacity
+        self._matrix = np.concatenate([self._matrix, np.zeros((extra, self.dims), dtype=np.float32)])
+        self._prefix = np.concatenate([self._prefix, np.zeros((extra, self.prefix_dims), dtype=np.float32)])
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        for column in self._bitmaps.values():
+            for value, bitmap in column.items():
+                column[value] = np.concatenate([bitmap, np.zeros(extra, dtype=bool)])
+        self._delta_capacity = capacity
+
+    def _bitmap(self, column: str, value: Any) -> "np.ndarray":
+        bitmap = self._bitmaps[column].get(value)
+        if bitmap is None:
+            bitmap = np.zeros(len(self._alive), dtype=bool)
+            self._bitmaps[column][value] = bitmap
+        return bitmap
+
+    def _index_record(self, row: int, record: Dict[str, Any]):
+        for column, values in _filter_values(record).items():
+            for value in values:
+                self._bitmap(column, value)[row] = True
+
+    def _index_segment(self, segment: _Segment):
+        """Bitmaps for the base rows, built per value from the code columns."""
+        for field, (dictionary, column) in _CODED_FIELDS.items():
+            codes = segment.filter_codes[field]
+            values = segment.dictionaries[dictionary]
+            present = np.flatnonzero(codes >= 0)
+            if not present.size:
+                continue
+            order = present[np.argsort(codes[present], kind="stable")]
+            sorted_codes = codes[order]
+            # Boundaries of each run of equal codes
+            starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+            ends = np.r_[starts[1:], order.size]
+            for start, end in zip(starts, ends):
+                self._bitmap(column, values[sorted_codes[start]])[order[start:end]] = True
+        self._bitmap("is_pistol", True)[:self._base_rows] = segment.is_pistol
+        self._bitmap("is_pistol", False)[:self._base_rows] = ~segment.is_pistol
+
+    def _record(self, row: int) -> Dict[str, Any]:
+        if row < self._base_rows:
+            return self._segment.record(row)
+        return self._records[row - self._base_rows]
+
+    def _clear_row(self, row: int):
+        self._alive[row] = False
+        if row >= self._base_rows:
+            self._records[row - self._base_rows] = None
+        for column in self._bitmaps.values():
+            for bitmap in column.values():
+                bitmap[row] = False
+
+    def upsert(self, ids: Sequence[str], vectors: Sequence[Sequence[float]], records: Sequence[Dict[str, Any]]):
+        """Insert or replace rows; rows without a vector are skipped."""
+        with self._lock:
+            for doc_id, vector, record in zip(ids, vectors, records):
+                if vector is None or len(vector) != self.dims:
+                    continue
+                row = self._id_to_row.get(doc_id)
+                if row is not None:
+                    self._clear_row(row)
+                if row is None or row < self._base_rows:
+                    # Base rows are read-only; a replacement moves to the delta
+                    self._grow(self._size - self._base_rows + 1)
+                    row = self._size
+                    self._size += 1
+                    self._ids.append(doc_id)
+                    self._records.append(None)
+                    self._id_to_row[doc_id] = row
+
+                vec = _unit(np.asarray(vector, dtype=np.float32))
+                self._matrix[row - self._base_rows] = vec
+                if self.prefix_dims:
+                    self._prefix[row - self._base_rows] = _unit(vec[:self.prefix_dims])
+                self._alive[row] = True
+                clean = {k: record.get(k) for k in RECORD_FIELDS}
+                clean["external_id"] = doc_id
+                self._records[row - self._base_rows] = clean
+                self._index_record(row, clean)
+            self._version += 1
+            self.dirty = True
+
+    def delete(self, ids: Iterable[str]):
+        """Tombstone rows; their slots are reclaimed by the next snapshot."""
+        with self._lock:
+            for doc_id in ids:
+                row = self._id_to_row.pop(doc_id, None)
+                if row is not None:
+                    self._clear_row(row)
+            self._version += 1
+            self.dirty = True
+
+    # --- Search ---------------------------------------------------------------
+
+    def candidate_mask(self, filters: Dict[str, Any]) -> "np.ndarray":
+        """Intersect the bitmaps for every non-null filter."""
+        mask = self._alive[:self._size].copy()
+        for column in FILTER_COLUMNS:
+            value = filters.get(column)
+            if value is None:
+                continue
+            bitmap = self._bitmaps[column].get(value)
+            if bitmap is None:
+                return np.zeros(self._size, dtype=bool)
+            mask &= bitmap[:self._size]
+        return mask
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int = 20,
+        filters: Optional[Dict[str, Any]] = None,
+        two_stage: Optional[bool] = None,
+        rerank: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k by cosine similarity among rows passing `filters`. Returns records with "similarity".
+
+        `two_stage` defaults to on whenever a prefix or quantizer is available and
+        the candidate set is large. With `rerank=False` the coarse scores are
+        returned as-is instead of being recomputed on the full vectors.
+        """
+        q = np.asarray(query, dtype=np.float32)
+        q_norm = float(np.linalg.norm(q))
+        if q_norm == 0 or q.shape[0] != self.dims:
+            return []
+        q = q / q_norm
+        rerank = self.rerank if rerank is None else rerank
+
+        with self._lock:
+            rows = np.flatnonzero(self.candidate_mask(filters or {}))
+            if rows.size == 0:
+                return []
+            has_coarse = bool(self.prefix_dims) or self._quantizer is not None
+            if two_stage is None:
+                two_stage = has_coarse and rows.size > max(k, self.coarse_candidates)
+            if two_stage and has_coarse:
+                keep = min(max(k, self.coarse_candidates) if rerank else k, rows.size)
+                rows, scores = self._coarse(rows, q, keep)
+                if not rerank:
+                    return self._top(rows, scores, k)
+            return self._top(rows, self._exact(rows, q), k)
+
+    @staticmethod
+    def _take(matrix: "np.ndarray", rows: "np.ndarray", offset: int, count: int) -> "np.ndarray":
+        # Scoring every row of a segment uses a view, not a fancy-indexed copy
+        if rows.size == count:
+            return matrix[:count]
+        return matrix[rows - offset]
+
+    def _split(self, rows: "np.ndarray"):
+        cut = np.searchsorted(rows, self._base_rows)
+        return rows[:cut], rows[cut:]
+
+    def _coarse(self, rows: "np.ndarray", q: "np.ndarray", keep: int):
+        """Approximate scores from codes/prefixes; returns the `keep` best rows and their scores."""
+        base, delta = self._split(rows)
+        q_prefix = _unit(q[:self.prefix_dims]) if self.prefix_dims else q
+        parts = []
+        if base.size:
+            if self._quantizer is not None:
+                parts.append(self._quantizer.scores(self._take(self._codes, base, 0, self._base_rows), q))
+            elif self._base_prefix is not None:
+                parts.append(self._take(self._base_prefix, base, 0, self._base_rows) @ q_prefix)
+            else:
+                parts.append(self._take(self._segment.full, base, 0, self._base_rows) @ q)
+        if delta.size:
+            delta_count = self._size - self._base_rows
+            if self.prefix_dims:
+                parts.append(self._take(self._prefix, delta, self._base_rows, delta_count) @ q_prefix)
+            else:
+                parts.append(self._take(self._matrix, delta, self._base_rows, delta_count) @ q)
+        scores = np.concatenate(parts)
+        best = np.argpartition(-scores, keep - 1)[:keep]
+        return rows[best], scores[best]
+
+    def _exact(self, rows: "np.ndarray", q: "np.ndarray") -> "np.ndarray":
+        """Full-dimension scores; base rows are read from the memory-mapped snapshot."""
+        order = np.argsort(rows)
+        sorted_rows = rows[order]
+        base, delta = self._split(sorted_rows)
+        parts = []
+        if base.size:
+            parts.append(self._take(self._segment.full, base, 0, self._base_rows) @ q)
+        if delta.size:
+            parts.append(self._take(self._matrix, delta, self._base_rows, self._size - self._base_rows) @ q)
+        scores = np.empty(rows.size, dtype=np.float32)
+        scores[order] = np.concatenate(parts)
+        return scores
+
+    def _top(self, rows: "np.ndarray", scores: "np.ndarray", k: int) -> List[Dict[str, Any]]:
+        k = min(k, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**self._record(rows[i]), "similarity": float(scores[i])}
+            for i in top
+        ]
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Row counts and bytes held in RAM vs. memory-mapped from the snapshot."""
+        with self._lock:
+            resident = self._matrix.nbytes + self._prefix.nbytes
+            if self._base_prefix is not None:
+                resident += self._base_prefix.nbytes
+            mapped = self._segment.full.nbytes if self._segment else 0
+            codes = self._codes.nbytes if self._codes is not None else 0
+            return {
+                "rows": len(self),
+                "complete": self.complete,
+                "base_rows": self._base_rows,
+                "delta_rows": self._size - self._base_rows,
+                "quantization": self._quantizer.kind if self._quantizer is not None else "none",
+                "code_bytes": codes,
+                "float_bytes_resident": resident,
+                "float_bytes_mapped": mapped,
+            }
+
+    # --- Snapshots ------------------------------------------------------------
+
+    def save(self, path: str):
+        """
+        Write a compacted snapshot directory under `path` and switch to it.
+
+        Each snapshot has full.npy (unit float32), ids.npy, filters.npz (the
+        dictionary-encoded filter columns), records.jsonl with
+        record_offsets.npy and, when quantized, codes.npy + quantizer.npz.
+        `path`/CURRENT names the active one.
+        """
+        with self._save_lock:
+            self._save(path)
+
+    def _save(self, path: str):
+        with self._lock:
+            version = self._version
+            live = np.flatnonzero(self._alive[:self._size])
+            base, delta = self._split(live)
+            segment = self._segment
+            delta_vectors = self._matrix[delta - self._base_rows].copy()
+            ids = [self._ids[r] for r in live]
+            delta_records = [self._records[r - self._base_rows] for r in delta]
+            complete = self.complete
+
+        name = f"snapshot-{time.time_ns()}"
+        directory = os.path.join(path, name)
+        os.makedirs(directory, exist_ok=True)
+
+        full = np.lib.format.open_memmap(
+            os.path.join(directory, "full.npy"), mode="w+", dtype=np.float32, shape=(len(ids), self.dims)
+        )
+        if base.size:
+            full[:base.size] = segment.full[base]
+        full[base.size:] = delta_vectors
+        full.flush()
+
+        quantizer = make_quantizer(self.quantization, self.dims, self.pq_subspaces)
+        if quantizer is not None and len(ids):
+            sample = full[np.linspace(0, len(ids) - 1, min(len(ids), _QUANTIZER_SAMPLE)).astype(np.intp)]
+            quantizer.fit(sample)
+            codes = np.lib.format.open_memmap(
+                os.path.join(directory, "codes.npy"), mode="w+", dtype=np.uint8,
+                shape=(len(ids), quantizer.code_size), fortran_order=quantizer.column_major,
+            )
+            codes[:] = quantizer.encode(full)
+            codes.flush()
+            del codes
+            quantizer.save(os.path.join(directory, "quantizer.npz"))
+        del full
+
+        np.save(os.path.join(directory, "ids.npy"), np.array(ids, dtype=str), allow_pickle=False)
+        self._write_filters(directory, segment, base, delta_records)
+        self._write_records(directory, segment, base, delta_records)
+        if complete:
+            open(os.path.join(directory, "COMPLETE"), "w").close()
+        current = os.path.join(path, "CURRENT")
+        with open(current + ".tmp", "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(current + ".tmp", current)
+        logger.info(f"Vector index: saved {len(ids)} rows to {directory}")
+
+        new_segment = _Segment(directory, self.dims)
+        with self._lock:
+            # Only fold the delta in (and count the index clean) if nothing was written while saving
+            if self._version == version:
+                self._install(new_segment)
+                self.dirty = False
+            self.last_saved = time.time()
+        self._prune(path, published=name)
+
+    @staticmethod
+    def _write_filters(directory: str, segment: Optional[_Segment], base: "np.ndarray", delta_records: List[Dict[str, Any]]):
+        """filters.npz: base rows keep their codes; delta values are appended to the dictionaries."""
+        dictionaries = {name: list(segment.dictionaries[name]) if segment else [] for name in _DICTIONARIES}
+        lookups = {name: {v: i for i, v in enumerate(values)} for name, values in dictionaries.items()}
+
+        def encode(dictionary: str, value: Any) -> int:
+            if not value:
+                return -1
+            value = str(value)
+            code = lookups[dictionary].get(value)
+            if code is None:
+                code = lookups[dictionary][value] = len(dictionaries[dictionary])
+                dictionaries[dictionary].append(value)
+            return code
+
+        columns = {}
+        for field, (dictionary, _) in _CODED_FIELDS.items():
+            base_codes = segment.filter_codes[field][base] if base.size else np.empty(0, dtype=np.int32)
+            delta_codes = np.array([encode(dictionary, r.get(field)) for r in delta_records], dtype=np.int32)
+            columns[field] = np.concatenate([base_codes, delta_codes]).astype(np.int32)
+        base_pistol = segment.is_pistol[base] if base.size else np.empty(0, dtype=bool)
+        delta_pistol = np.array([bool(r.get("is_pistol", False)) for r in delta_records], dtype=bool)
+        columns["is_pistol"] = np.concatenate([base_pistol, delta_pistol])
+        for name, values in dictionaries.items():
+            columns[f"dict_{name}"] = np.array(values, dtype=str)
+        np.savez(os.path.join(directory, "filters.npz"), **columns)
+
+    @staticmethod
+    def _write_records(directory: str, segment: Optional[_Segment], base: "np.ndarray", delta_records: List[Dict[str, Any]]):
+        """records.jsonl + record_offsets.npy; base records are copied as bytes without parsing."""
+        offsets = np.zeros(base.size + len(delta_records) + 1, dtype=np.int64)
+        with open(os.path.join(directory, "records.jsonl"), "wb") as f:
+            for n, row in enumerate(base):
+                f.write(segment.raw_record(row))
+                offsets[n + 1] = f.tell()
+            for n, record in enumerate(delta_records, start=base.size):
+                f.write(json.dumps(record).encode("utf-8") + b"\n")
+                offsets[n + 1] = f.tell()
+        np.save(os.path.join(directory, "record_offsets.npy"), offsets)
+
+    @staticmethod
+    def _prune(path: str, published: str):
+        # Only snapshots older than the one just published; superseded ones may
+        # still be mapped, which is safe to unlink on POSIX
+        cutoff = _snapshot_time(published)
+        for entry in os.listdir(path):
+            written = _snapshot_time(entry)
+            if written is not None and written < cutoff:
+                shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, dims: int, **options) -> "VectorIndex":
+        with open(os.path.join(path, "CURRENT"), "r", encoding="utf-8") as f:
+            directory = os.path.join(path, f.read().strip())
+        segment = _Segment(directory, dims)
+        index = cls(dims, **options)
+        with index._lock:
+            index._install(segment)
+            index.complete = segment.complete
+        index.last_saved = time.time()
+        logger.info(f"Vector index: loaded {len(index)} rows from {directory}")
+        return index
+
+    def save_if_stale(self, path: str, min_interval: float):
+        if not self._stale(min_interval):
+            return
+        with self._save_lock:
+            # Another thread may have saved while this one waited for the lock
+            if self._stale(min_interval):
+                self._save(path)
+
+    def _stale(self, min_interval: float) -> bool:
+        return self.dirty and time.time() - self.last_saved >= min_interval
+
+
+def _snapshot_time(name: str) -> Optional[int]:
+    """The time_ns() a snapshot-* directory was named with, or None for anything else."""
+    prefix, _, stamp = name.partition("-")
+    return int(stamp) if prefix == "snapshot" and stamp.isdigit() else None
+
+
+def _parse_vector(value) -> Optional[List[float]]:
+    # PostgREST returns pgvector columns as their text form, "[0.1,0.2,...]"
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def bootstrap_from_supabase(
+    index: VectorIndex, supabase, page_size: int = 1000, stop: Optional[threading.Event] = None
+) -> int:
+    """
+    Load every round_embeddings row the index doesn't already hold, in
+    external_id order, then mark the index complete. Rows written by
+    ingestion in the meantime are newer and are left alone. Returns the
+    number of rows loaded; a `stop` request leaves the index incomplete.
+    """
+    columns = ",".join(RECORD_FIELDS + ("embedding",))
+    last_id = None
+    loaded = 0
+    while True:
+        if stop is not None and stop.is_set():
+            logger.info(f"Vector index: bootstrap stopped after {loaded} rows")
+            return loaded
+        query = supabase.table("round_embeddings").select(columns).order("external_id").limit(page_size)
+        if last_id is not None:
+            query = query.gt("external_id", last_id)
+        rows = query.execute().data or []
+        fresh = [row for row in rows if row["external_id"] not in index]
+        if fresh:
+            index.upsert(
+                [row["external_id"] for row in fresh],
+                [_parse_vector(row.get("embedding")) for row in fresh],
+                fresh,
+            )
+            loaded += len(fresh)
+        if len(rows) < page_size:
+            break
+        last_id = rows[-1]["external_id"]
+    index.mark_complete()
+    logger.info(f"Vector index: bootstrapped {loaded} rows from Supabase; {len(index)} rows total")
+    return loaded
+
+
+# Global instance
+_vector_index = None
+
+def get_vector_index_path() -> str:
+    return os.path.join(get_settings().LOCAL_CACHE_DIRECTORY, "vector_index")
+
+def get_vector_index() -> Optional[VectorIndex]:
+    """The shared local index, loaded from its snapshot on first use (None when disabled)."""
+    global _vector_index
+    if _vector_index is None:
+        settings = get_settings()
+        if not settings.LOCAL_INDEX_ENABLED:
+            return None
+        path = get_vector_index_path()
+        options = {
+            "prefix_dims": settings.EMBEDDING_PREFIX_DIMENSIONS,
+            "coarse_candidates": settings.SEARCH_COARSE_CANDIDATES,
+            "quantization": settings.LOCAL_INDEX_QUANTIZATION,
+            "pq_subspaces": settings.LOCAL_INDEX_PQ_SUBSPACES,
+            "rerank": settings.LOCAL_INDEX_RERANK,
+        }
+        try:
+            _vector_index = VectorIndex.load(path, settings.EMBEDDING_DIMENSIONS, **options)
+        except FileNotFoundError:
+            _vector_index = VectorIndex(settings.EMBEDDING_DIMENSIONS, **options)
+        except Exception as e:
+            logger.error(f"Vector index snapshot unreadable, starting empty: {e}")
+            _vector_index = VectorIndex(settings.EMBEDDING_DIMENSIONS, **options)
+    return _vector_index
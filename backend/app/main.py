@@ -1,8 +1,20 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import get_settings
+from app.core.metrics import (
+    detach_request_timings, end_request_timings, get_metrics, server_timing_header, start_request_timings,
+)
 from app.api.v1.endpoints import router as api_router
+from app.services.scraper import get_scraper_service
+from app.core.supabase import get_supabase
+from app.core.vector_index import bootstrap_from_supabase, get_vector_index, get_vector_index_path
+from app.services.ingest_jobs import get_ingest_job_queue
+import asyncio
 import logging
+import threading
 
 # Configure Logging
 logging.basicConfig(
@@ -16,10 +28,52 @@ import os
 
 settings = get_settings()
 
+async def _bootstrap_vector_index(vector_index, stop: threading.Event):
+    """Fill the local index from Supabase in the background; /query uses Supabase until it completes."""
+    detach_request_timings()
+    supabase = get_supabase()
+    if supabase is None:
+        logger.warning("Local vector index enabled without Supabase; it will not be used for /query")
+        return
+    try:
+        await asyncio.to_thread(
+            bootstrap_from_supabase, vector_index, supabase, settings.LOCAL_INDEX_BOOTSTRAP_PAGE_SIZE, stop
+        )
+        if vector_index.complete:
+            await asyncio.to_thread(vector_index.save, get_vector_index_path())
+    except Exception as e:
+        logger.error(f"Vector index bootstrap failed; /query stays on Supabase: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Long-lived resources shared across requests
+    scraper = get_scraper_service()
+    await scraper.startup()
+    # Load the local vector index snapshot before the first query
+    vector_index = get_vector_index()
+    bootstrap_stop = threading.Event()
+    bootstrap = None
+    if vector_index is not None and not vector_index.complete:
+        bootstrap = asyncio.create_task(_bootstrap_vector_index(vector_index, bootstrap_stop))
+    # Background event ingestion; picks up jobs interrupted by the last shutdown
+    ingest_jobs = get_ingest_job_queue()
+    await ingest_jobs.start()
+    try:
+        yield
+    finally:
+        if bootstrap is not None:
+            bootstrap_stop.set()
+            await bootstrap
+        await ingest_jobs.stop()
+        await scraper.shutdown()
+        if vector_index is not None and vector_index.dirty:
+            vector_index.save(get_vector_index_path())
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Set all CORS enabled origins
@@ -32,8 +86,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """Per-route latency histogram plus a Server-Timing header listing the request's stage spans."""
+    timings, token = start_request_timings()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        # Streamed bodies are still running here; the header covers time to first byte
+        response.headers["Server-Timing"] = server_timing_header(timings, time.perf_counter() - start)
+        return response
+    finally:
+        end_request_timings(token)
+        route = request.scope.get("route")
+        get_metrics().observe_request(
+            request.method, route.path if route is not None else "unmatched", status, time.perf_counter() - start
+        )
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint: stage and request latency histograms with p50/p95/p99."""
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Retake AI API", "version": settings.VERSION}
@@ -0,0 +1,167 @@
+"""Warm Playwright pool for browser-mode scraping.
+
+Chromium is launched once and its contexts are handed out to fetches through
+a queue, so a browser fetch costs one navigation instead of a full browser
+start-up. Each context is recycled after a fixed number of uses to keep
+cookies/memory from accumulating.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import async_playwright
+
+logger = logging.getLogger(__name__)
+
+# Element that signals the page has the data we scrape, per site
+READY_SELECTORS: Dict[str, str] = {
+    "rib.gg": "#__NEXT_DATA__",
+    "vlr.gg": ".wf-card",
+}
+
+
+def ready_selector_for(url: str) -> Optional[str]:
+    host = (urlparse(url).hostname or "").lower()
+    for domain, selector in READY_SELECTORS.items():
+        if host == domain or host.endswith("." + domain):
+            return selector
+    return None
+
+
+class _Slot:
+    """One reusable context + page, bound to a browser in the pool."""
+
+    def __init__(self, browser_index: int):
+        self.browser_index = browser_index
+        self.context = None
+        self.page = None
+        self.uses = 0
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        user_agent: str,
+        size: int = 3,
+        browsers: int = 1,
+        max_uses_per_context: int = 20,
+        ready_timeout_ms: int = 15000,
+        headless: bool = True,
+    ):
+        self.user_agent = user_agent
+        self.size = max(1, size)
+        self.browser_count = max(1, min(browsers, self.size))
+        self.max_uses_per_context = max(1, max_uses_per_context)
+        self.ready_timeout_ms = ready_timeout_ms
+        self.headless = headless
+
+        self._playwright = None
+        self._browsers: List = []
+        self._slots: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self.pages_served = 0
+        self.contexts_created = 0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Playwright objects belong to the loop that created them
+            self._reset()
+            self._loop = loop
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if self._playwright is not None:
+                return
+            self._playwright = await async_playwright().start()
+            for _ in range(self.browser_count):
+                self._browsers.append(await self._playwright.chromium.launch(headless=self.headless))
+            self._slots = asyncio.Queue()
+            for i in range(self.size):
+                self._slots.put_nowait(_Slot(i % self.browser_count))
+            logger.info(f"Browser pool started: {self.browser_count} browser(s), {self.size} slots")
+
+    async def close(self):
+        if self._loop is not None and self._loop is not asyncio.get_running_loop():
+            self._reset()
+            return
+        for browser in self._browsers:
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.debug(f"Browser close failed: {e}")
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._reset()
+
+    def _reset(self):
+        self._playwright = None
+        self._browsers = []
+        self._slots = None
+        self._loop = None
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a warm page; the slot returns to the pool when the block exits."""
+        await self.start()
+        slot = await self._slots.get()
+        healthy = True
+        try:
+            await self._prepare(slot)
+            yield slot.page
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            slot.uses += 1
+            if not healthy or slot.uses >= self.max_uses_per_context:
+                await self._retire(slot)
+            self._slots.put_nowait(slot)
+
+    async def _prepare(self, slot: _Slot):
+        browser = self._browsers[slot.browser_index]
+        if not browser.is_connected():
+            logger.warning("Pooled browser disconnected, relaunching")
+            browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._browsers[slot.browser_index] = browser
+            slot.context = None
+        if slot.context is None:
+            slot.context = await browser.new_context(user_agent=self.user_agent)
+            slot.page = await slot.context.new_page()
+            slot.uses = 0
+            self.contexts_created += 1
+
+    async def _retire(self, slot: _Slot):
+        context, slot.context, slot.page = slot.context, None, None
+        if context is not None:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.debug(f"Context close failed: {e}")
+
+    async def fetch(self, url: str, ready_selector: Optional[str] = None) -> str:
+        """Navigate a pooled page and return its HTML once the site's ready element exists."""
+        selector = ready_selector or ready_selector_for(url)
+        async with self.page() as page:
+            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            if selector:
+                try:
+                    await page.wait_for_selector(selector, state="attached", timeout=self.ready_timeout_ms)
+                except Exception:
+                    logger.warning(f"Ready selector {selector} not found for {url}, using current DOM")
+            else:
+                await page.wait_for_load_state("load", timeout=self.ready_timeout_ms)
+            self.pages_served += 1
+            return await page.content()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": self.size,
+            "browsers": len(self._browsers),
+            "idle_slots": self._slots.qsize() if self._slots else 0,
+            "pages_served": self.pages_served,
+            "contexts_created": self.contexts_created,
+        }
@@ -5,11 +5,12 @@ from typing import List, Optional, Dict, Any
 from google import genai
 from google.genai import types
 from urllib.parse import quote
-import re
 
 from app.core.config import get_settings
 from app.services.scraper import get_scraper_service
 from app.services.processor import MatchDataProcessor
+from app.services.pipeline import Pipeline
+from app.services.html_parsing import get_parsed_documents
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -18,6 +19,7 @@ class DiscoveryService:
     def __init__(self):
         self.scraper = get_scraper_service()
         self.base_url = "https://rib.gg"
+        self.last_pipeline_stats: Optional[Dict[str, Any]] = None
         
         if settings.GEMINI_API_KEY:
             self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
@@ -100,8 +102,7 @@ class DiscoveryService:
         Fetches and processes a specific series URL.
         """
         try:
-            html = await self.scraper.fetch_page(series_url)
-            raw_data = self.scraper.extract_next_data(html)
+            raw_data = await self.scraper.fetch_next_data(series_url)
             
             if raw_data:
                 processed_rounds = MatchDataProcessor.process_series_data(raw_data)
@@ -113,63 +114,122 @@ class DiscoveryService:
             logger.error(f"Error processing series {series_url}: {e}")
             return []
 
-    async def crawl_tournament(self, event_url: str) -> List[str]:
+    async def crawl_tournament(self, event_url: str, max_depth: Optional[int] = None) -> List[str]:
         """
         Crawls a rib.gg event page to find all series links.
-        Recursively checks child events (e.g. Group Stage, Playoffs).
+        Child events (e.g. Group Stage, Playoffs) are crawled concurrently.
         Ensures only unique canonical Series URLs are returned.
         """
+        crawl = await self.crawl_event_tree(event_url, max_depth=max_depth)
+        return crawl["series_urls"]
+
+    async def crawl_event_tree(self, event_url: str, max_depth: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Frontier crawl of an event and its child events.
+
+        Every discovered child is fetched as soon as its parent is parsed, so
+        siblings run concurrently (bounded by CRAWL_CONCURRENCY) and the crawl
+        takes roughly as long as the deepest branch. Event IDs are deduped
+        across the whole crawl, so shared or cyclic children are visited once.
+
+        Returns {"series_urls", "series_ids", "events_crawled", "tree"} where
+        tree nodes are {"id", "url", "name", "depth", "series_ids", "children"}.
+        """
+        if max_depth is None:
+            max_depth = settings.CRAWL_MAX_DEPTH
         logger.info(f"Crawling tournament: {event_url}")
-        unique_series_ids = set()
-        
+
+        sem = asyncio.Semaphore(settings.CRAWL_CONCURRENCY)
+        root = self._new_event_node(self._event_id_from_url(event_url), event_url, depth=0)
+        visited = {root["id"]}
+
+        async def visit(node: Dict[str, Any]):
+            async with sem:
+                child_ids = await self._crawl_event_node(node)
+
+            if node["depth"] >= max_depth:
+                if child_ids:
+                    logger.info(f"Depth limit {max_depth} reached at event {node['id']}, not descending")
+                return
+
+            for child_id in child_ids:
+                if child_id in visited:
+                    continue
+                visited.add(child_id)
+                logger.info(f"Found child event {child_id}, crawling...")
+                node["children"].append(
+                    self._new_event_node(child_id, f"{self.base_url}/events/_/{child_id}", depth=node["depth"] + 1)
+                )
+            await asyncio.gather(*[visit(child) for child in node["children"]])
+
+        await visit(root)
+
+        series_ids = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            series_ids.update(node["series_ids"])
+            stack.extend(node["children"])
+
+        ordered_ids = sorted(series_ids)
+        return {
+            "series_urls": [f"{self.base_url}/series/{sid}" for sid in ordered_ids],
+            "series_ids": ordered_ids,
+            "events_crawled": len(visited),
+            "tree": root,
+        }
+
+    @staticmethod
+    def _event_id_from_url(event_url: str) -> str:
+        return event_url.rstrip("/").split("/")[-1]
+
+    @staticmethod
+    def _new_event_node(event_id: str, url: str, depth: int) -> Dict[str, Any]:
+        return {"id": str(event_id), "url": url, "name": None, "depth": depth, "series_ids": [], "children": []}
+
+    async def _crawl_event_node(self, node: Dict[str, Any]) -> List[str]:
+        """Fetch one event page, fill in its series IDs and return its child event IDs."""
+        series_ids = set()
+        child_ids = []
         try:
             # Force browser mode for discovery to ensure we see all dynamic links
-            html = await self.scraper._fetch_with_playwright(event_url)
+            html = await self.scraper.fetch_page(node["url"], force_browser=True)
             data = self.scraper.extract_next_data(html)
-            
+
             props = data.get("props", {}).get("pageProps", {})
-            event_data = props.get("event", {})
-            
+            event_data = props.get("event", {}) or {}
+            node["name"] = event_data.get("name")
+
             # 1. Look for direct series in this event (JSON Data)
             for key in ["series", "allSeries", "results"]:
                 items = event_data.get(key, [])
                 for item in items:
                     if isinstance(item, dict) and "id" in item:
-                        unique_series_ids.add(str(item['id']))
+                        series_ids.add(str(item['id']))
 
-            # 2. Check for child events and crawl them recursively
-            child_events = event_data.get("childEvents", [])
-            for child in child_events:
-                child_id = child.get("id")
+            # 2. Collect child events for the frontier
+            for child in event_data.get("childEvents", []) or []:
+                child_id = child.get("id") if isinstance(child, dict) else None
                 if child_id:
-                    child_url = f"{self.base_url}/events/_/{child_id}"
-                    logger.info(f"Found child event {child_id}, crawling...")
-                    child_links = await self.crawl_tournament(child_url)
-                    for link in child_links:
-                        match_id = link.split("/")[-1]
-                        unique_series_ids.add(match_id)
-            
-            # 3. Fallback: Parse DOM for any /series/ links missed in JSON
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html, "html.parser")
-            for a in soup.find_all("a", href=True):
-                href = a["href"]
-                match = re.search(r"/series/.*?(\d+)$", href)
-                if match:
-                    unique_series_ids.add(match.group(1))
-
-            canonical_urls = [f"{self.base_url}/series/{sid}" for sid in unique_series_ids]
-            return canonical_urls
-            
+                    child_ids.append(str(child_id))
+
+            # 3. Fallback: scan the page's links for any /series/ IDs missed in JSON
+            series_ids.update(get_parsed_documents().series_ids(html))
         except Exception as e:
-            logger.error(f"Failed to crawl tournament {event_url}: {e}")
-            return [f"{self.base_url}/series/{sid}" for sid in unique_series_ids]
+            logger.error(f"Failed to crawl tournament {node['url']}: {e}")
+            node["error"] = str(e)
 
-    async def ingest_tournament(self, event_url: str, vlr_event_url: str = None):
+        node["series_ids"] = sorted(series_ids)
+        return child_ids
+
+    async def ingest_tournament(self, event_url: str, vlr_event_url: str = None, checkpoint=None):
         """
         Crawls a tournament and ingests ALL matches found.
         If vlr_event_url is provided, VLR VOD data is fetched in parallel
         and used to enrich rounds with YouTube VOD URLs before ingestion.
+        With a checkpoint (see app.services.ingest_jobs.JobCheckpoint), series
+        it already records as done are skipped and each newly written series
+        is recorded.
         """
         from app.services.ingestion import IngestionService
         from app.core.supabase import get_supabase
@@ -179,7 +239,7 @@ class DiscoveryService:
         supabase = get_supabase()
         if supabase:
             try:
-                ext_id = event_url.rstrip("/").split("/")[-1]
+                ext_id = self._event_id_from_url(event_url)
                 name_slug = event_url.split("/events/")[-1].split("/")[0].replace("-", " ").title()
 
                 event_data = {
@@ -193,87 +253,187 @@ class DiscoveryService:
             except Exception as e:
                 logger.error(f"Event registration failed: {e}")
 
-        # 2. Crawl rib.gg and (optionally) fetch VLR VODs in parallel
+        # 2. Crawl rib.gg and (optionally) stream VLR VODs into a shared lookup in parallel
         vlr_task = None
+        vod_lookup = None
         if vlr_event_url:
-            vlr_task = asyncio.create_task(self._resolve_vlr_vods(vlr_event_url))
+            from app.services.vlr_scraper import VodLookup
 
-        urls = await self.crawl_tournament(event_url)
-        logger.info(f"Tournament crawler found {len(urls)} series. Starting bulk ingestion...")
+            vod_lookup = VodLookup()
+            vlr_task = asyncio.create_task(self._resolve_vlr_vods(vlr_event_url, vod_lookup))
 
-        vlr_vod_lookup = {}
-        if vlr_task:
-            try:
-                vlr_vod_lookup = await vlr_task
-                logger.info(f"VLR: resolved VODs for {len(vlr_vod_lookup)} matches")
-            except Exception as e:
-                logger.warning(f"VLR VOD resolution failed, continuing without VODs: {e}")
-
-        # 3. Process and ingest each series, enriching with VLR VODs
-        ingestion_service = IngestionService()
-        total_rounds = 0
+        try:
+            urls = await self.crawl_tournament(event_url)
+            logger.info(f"Tournament crawler found {len(urls)} series. Starting bulk ingestion...")
+            if checkpoint is not None:
+                await asyncio.to_thread(checkpoint.set_total, len(urls))
+                done = await asyncio.to_thread(checkpoint.completed)
+                if done:
+                    urls = [url for url in urls if url not in done]
+                    logger.info(f"Resuming: {len(done)} series already ingested, {len(urls)} remaining")
 
-        for url in urls:
-            rounds = await self.process_series(url)
-            if rounds and vlr_vod_lookup:
-                self._enrich_rounds_with_vods(rounds, vlr_vod_lookup)
-            if rounds:
-                ingestion_service.ingest_batch(rounds, common_metadata={"event_id": event_uuid})
-                total_rounds += len(rounds)
+            # 3. Process and ingest series through a staged pipeline, enriching with VLR VODs
+            ingestion_service = IngestionService()
+            common_metadata = {"event_id": event_uuid, "event_key": self._event_id_from_url(event_url)}
+            pipeline = self._build_ingest_pipeline(
+                ingestion_service, vod_lookup, common_metadata=common_metadata, checkpoint=checkpoint,
+            )
+            results = await pipeline.run({"url": url} for url in urls)
+        finally:
+            # The VLR stream must not outlive the ingest, whether it finished, failed or was cancelled
+            if vlr_task is not None:
+                vlr_task.cancel()
+                await asyncio.gather(vlr_task, return_exceptions=True)
+        total_rounds = sum(len(item["rounds"]) for item in results)
 
+        self.last_pipeline_stats = pipeline.stats()
+        for stage in self.last_pipeline_stats["stages"]:
+            logger.info(
+                f"Pipeline stage {stage['stage']}: {stage['items_out']}/{stage['items_in']} items, "
+                f"{stage['errors']} errors, {stage['throughput_per_sec']}/s"
+            )
         logger.info(f"Bulk ingestion complete. Ingested {total_rounds} rounds from {len(urls)} series.")
         return total_rounds
 
-    async def _resolve_vlr_vods(self, vlr_event_url: str) -> dict:
-        """Fetch all VLR match VODs and build a lookup keyed by (team_pair, map_name)."""
-        from app.services.vlr_scraper import fetch_event_matches, fetch_match_vods
+    def _build_ingest_pipeline(
+        self, ingestion_service, vod_lookup=None, common_metadata: Optional[Dict[str, Any]] = None, checkpoint=None,
+    ) -> Pipeline:
+        """
+        fetch -> extract __NEXT_DATA__ -> process -> VLR enrich -> embed -> upsert.
+        CPU-bound and blocking stages run in worker threads so the event loop
+        keeps fetching while earlier series are parsed or written. VLR
+        enrichment waits only for the series' own team pair to resolve.
+        """
+        async def fetch(item):
+            # Previously extracted JSON for an unchanged page skips fetch and parse
+            cached = await self.scraper.cached_next_data(item["url"])
+            if cached is not None:
+                item["raw_data"] = cached
+            else:
+                item["html"] = await self.scraper.fetch_page(item["url"])
+            return item
 
-        matches = await fetch_event_matches(vlr_event_url)
-        logger.info(f"VLR: found {len(matches)} matches, fetching VODs...")
+        async def no_rounds(item):
+            # Nothing to ingest is still a finished series, so the job doesn't count it as missing
+            if checkpoint is not None:
+                await asyncio.to_thread(checkpoint.series_done, item["url"], 0)
+            return None
 
-        sem = asyncio.Semaphore(3)
-        async def fetch_one(m):
-            async with sem:
-                await asyncio.sleep(0.5)
-                return await fetch_match_vods(m["vlr_match_url"])
+        async def extract(item):
+            if "raw_data" not in item:
+                item["raw_data"] = await asyncio.to_thread(self.scraper.extract_next_data, item.pop("html"))
+                await self.scraper.store_next_data(item["url"], item["raw_data"])
+            return item if item["raw_data"] else await no_rounds(item)
 
-        results = await asyncio.gather(
-            *[fetch_one(m) for m in matches],
-            return_exceptions=True,
+        async def process(item):
+            raw_data = item.pop("raw_data")
+            item["date"] = MatchDataProcessor.series_date(raw_data)
+            # Columnar from here on: enrich, plan, prepare and the round store read the columns
+            rounds = await asyncio.to_thread(MatchDataProcessor.process_series_data, raw_data, True)
+            if not rounds["round_id"]:
+                return await no_rounds(item)
+            logger.info(f"Processed {len(rounds['round_id'])} rounds from {item['url']}")
+            item["rounds"] = rounds
+            return item
+
+        async def enrich(item):
+            if vod_lookup is None:
+                return item
+            columns = item["rounds"]
+            teams = {
+                (team_a, team_b)
+                for team_a, team_b, vod_url in zip(columns["team_a"], columns["team_b"], columns["vod_url"])
+                if not vod_url
+            }
+            resolved = await asyncio.gather(
+                *[vod_lookup.resolve(a, b, item.get("date"), settings.VLR_VOD_WAIT_TIMEOUT) for a, b in teams]
+            )
+            for (team_a, team_b), pair in zip(teams, resolved):
+                if pair is None:
+                    logger.info(f"VLR: no match found for {team_a} vs {team_b}, continuing without VODs")
+            if vod_lookup.entries:
+                self._enrich_rounds_with_vods(item["rounds"], vod_lookup, item.get("date"))
+            return item
+
+        async def embed(item):
+            # Only rounds that are new or changed since the last ingest are embedded
+            plan = await asyncio.to_thread(ingestion_service.plan_series, item["url"], item["rounds"])
+            item["plan"] = plan
+            item["batch"] = None
+            if plan["rounds"]["round_id"]:
+                batch = await asyncio.to_thread(ingestion_service.prepare_batch, plan["rounds"])
+                # The round store replaces whole matches, so it gets the full series
+                batch["series_rounds"] = item["rounds"]
+                item["batch"] = await asyncio.to_thread(ingestion_service.embed_batch, batch)
+            if plan["unchanged"]:
+                logger.info(f"Skipping {plan['unchanged']} unchanged rounds from {item['url']}")
+            return item
+
+        async def upsert(items):
+            # Several series per call: one matches upsert and chunked round writes
+            batches = [item["batch"] for item in items if item["batch"]]
+            await asyncio.to_thread(ingestion_service.write_batches, batches, common_metadata)
+            for item in items:
+                batch = item.pop("batch")
+                plan = item.pop("plan")
+                item["ids"] = batch["ids"] if batch else []
+                # A series whose writes failed stays un-committed so the next run retries it
+                if batch is None or batch.get("write_ok", True):
+                    await asyncio.to_thread(ingestion_service.commit_series, plan)
+                    if checkpoint is not None:
+                        await asyncio.to_thread(checkpoint.series_done, item["url"], len(item["rounds"]["round_id"]))
+            return items
+
+        pipeline = Pipeline("tournament-ingest", queue_size=settings.PIPELINE_QUEUE_SIZE)
+        pipeline.add_stage("fetch", fetch, settings.PIPELINE_FETCH_CONCURRENCY)
+        pipeline.add_stage("extract", extract, settings.PIPELINE_EXTRACT_CONCURRENCY)
+        pipeline.add_stage("process", process, settings.PIPELINE_PROCESS_CONCURRENCY)
+        pipeline.add_stage("enrich", enrich, settings.PIPELINE_ENRICH_CONCURRENCY)
+        pipeline.add_stage("embed", embed, settings.PIPELINE_EMBED_CONCURRENCY)
+        pipeline.add_stage(
+            "upsert", upsert, settings.PIPELINE_UPSERT_CONCURRENCY,
+            batch_size=settings.INGEST_BULK_SERIES, batch_wait=settings.INGEST_BULK_WAIT,
         )
+        return pipeline
 
-        # Build lookup: (sorted_team_pair, map_name) → {video_id, start_seconds}
-        lookup = {}
-        for result in results:
-            if isinstance(result, Exception):
-                logger.warning(f"VLR fetch failed: {result}")
-                continue
-            pair = tuple(sorted([result["team_a"], result["team_b"]]))
-            for m in result["maps"]:
-                lookup[(pair, m["map_name"])] = {
-                    "youtube_video_id": m["youtube_video_id"],
-                    "start_seconds": m["start_seconds"],
-                }
+    async def _resolve_vlr_vods(self, vlr_event_url: str, lookup=None):
+        """Stream every VLR match's VODs into a lookup keyed by (team_pair, map_name) as each page resolves."""
+        from app.services.vlr_scraper import VodLookup, stream_event_vods
+
+        if lookup is None:
+            lookup = VodLookup()
+        try:
+            async for result in stream_event_vods(vlr_event_url):
+                if "schedule" in result:
+                    lookup.set_schedule(result["schedule"])
+                else:
+                    lookup.add(result)
+            logger.info(f"VLR: resolved VODs for {lookup.matches} matches")
+        except Exception as e:
+            logger.warning(f"VLR VOD resolution failed, continuing without VODs: {e}")
+        finally:
+            lookup.finish()
         return lookup
 
     @staticmethod
-    def _enrich_rounds_with_vods(rounds: list, vlr_lookup: dict):
-        """Fill in vod_url and adjust vod_timestamp for rounds using VLR VOD data."""
-        # VLR team names may differ slightly; try direct match first
-        TEAM_NORMALIZE = {"NRG": "NRG Esports"}
-
-        for r in rounds:
-            if r.get("vod_url"):
+    def _enrich_rounds_with_vods(columns: Dict[str, list], vlr_lookup, series_date=None):
+        """Fill in vod_url and adjust vod_timestamp of a columnar batch using VLR VOD data (a VodLookup)."""
+        # Team names are fuzzy-matched once per distinct pair, not per round
+        pairs = {}
+        vod_urls, vod_timestamps = columns["vod_url"], columns["vod_timestamp"]
+        for i, teams in enumerate(zip(columns["team_a"], columns["team_b"])):
+            if vod_urls[i]:
+                continue
+            if teams not in pairs:
+                pairs[teams] = vlr_lookup.resolve_pair(*teams, series_date)
+            if pairs[teams] is None:
                 continue
-            team_a = TEAM_NORMALIZE.get(r["team_a"], r["team_a"])
-            team_b = TEAM_NORMALIZE.get(r["team_b"], r["team_b"])
-            pair = tuple(sorted([team_a, team_b]))
-            vod_info = vlr_lookup.get((pair, r["map_name"]))
+            vod_info = vlr_lookup.vod(pairs[teams], columns["map_name"][i])
             if not vod_info:
                 continue
             vid = vod_info["youtube_video_id"]
             map_start = vod_info["start_seconds"]
-            rel_offset = r.get("vod_timestamp") or 0
+            rel_offset = vod_timestamps[i] or 0
             abs_t = map_start + rel_offset
-            r["vod_url"] = f"https://www.youtube.com/watch?v={vid}&t={abs_t}s"
-            r["vod_timestamp"] = abs_t
\ No newline at end of file
+            vod_urls[i] = f"https://www.youtube.com/watch?v={vid}&t={abs_t}s"
+            vod_timestamps[i] = abs_t
\ No newline at end of file
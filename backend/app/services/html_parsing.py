@@ -0,0 +1,119 @@
+"""Fast helpers for pulling data out of scraped HTML.
+
+rib.gg series pages are several MB, and building a full BeautifulSoup tree
+just to read one `<script id="__NEXT_DATA__">` tag dominated processing
+time. These helpers scan the raw string for the tag and decode its JSON
+directly, falling back to a full parse only when the fast path fails.
+Parsed results are memoized per document so each page is parsed at most
+once no matter how many callers look at it.
+"""
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+_NEXT_DATA_MARKER = "__NEXT_DATA__"
+_NEXT_DATA_TAG = re.compile(r"<script\b[^>]*\bid\s*=\s*[\"']?__NEXT_DATA__[\"']?[^>]*>", re.IGNORECASE)
+_SCRIPT_CLOSE = re.compile(r"</script\s*>", re.IGNORECASE)
+_SERIES_HREF = re.compile(r"href\s*=\s*[\"']([^\"']*/series/[^\"']*?(\d+))[\"']", re.IGNORECASE)
+
+
+def find_next_data_json(html: str) -> Optional[str]:
+    """Return the raw JSON text inside the __NEXT_DATA__ script tag, without parsing the DOM."""
+    idx = html.find(_NEXT_DATA_MARKER)
+    while idx != -1:
+        tag_start = html.rfind("<", 0, idx)
+        if tag_start != -1:
+            tag = _NEXT_DATA_TAG.match(html, tag_start)
+            if tag:
+                # Next.js escapes "<" inside the payload, so the first </script> closes it
+                close = html.find("</script>", tag.end())
+                if close == -1:
+                    found = _SCRIPT_CLOSE.search(html, tag.end())
+                    close = found.start() if found else -1
+                if close != -1:
+                    return html[tag.end():close]
+        idx = html.find(_NEXT_DATA_MARKER, idx + len(_NEXT_DATA_MARKER))
+    return None
+
+
+def parse_next_data_slow(html: str) -> Dict[str, Any]:
+    """Reference implementation: full BeautifulSoup parse."""
+    soup = BeautifulSoup(html, "html.parser")
+    script_tag = soup.find("script", id="__NEXT_DATA__")
+    if script_tag and script_tag.string:
+        try:
+            return json.loads(script_tag.string)
+        except json.JSONDecodeError:
+            logger.error("Failed to parse __NEXT_DATA__ JSON")
+    return {}
+
+
+def parse_next_data(html: str) -> Dict[str, Any]:
+    payload = find_next_data_json(html)
+    if payload is not None:
+        try:
+            return json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning("Fast __NEXT_DATA__ decode failed, falling back to full parse")
+    return parse_next_data_slow(html)
+
+
+def find_series_ids(html: str) -> List[str]:
+    """Series IDs from every /series/... link in the page, without building a DOM."""
+    return [m.group(2) for m in _SERIES_HREF.finditer(html)]
+
+
+class ParsedDocumentCache:
+    """
+    Small LRU of parse results keyed by the document itself.
+
+    Python caches a string's hash on the object, so repeated lookups for the
+    same page are cheap. Results are shared between callers and must be
+    treated as read-only.
+    """
+
+    def __init__(self, max_documents: int = 8):
+        self.max_documents = max_documents
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, html: str, kind: str, build):
+        with self._lock:
+            entry = self._entries.get(html)
+            if entry is not None and kind in entry:
+                self._entries.move_to_end(html)
+                self.hits += 1
+                return entry[kind]
+        self.misses += 1
+        value = build(html)
+        with self._lock:
+            entry = self._entries.setdefault(html, {})
+            entry[kind] = value
+            self._entries.move_to_end(html)
+            while len(self._entries) > self.max_documents:
+                self._entries.popitem(last=False)
+        return value
+
+    def next_data(self, html: str) -> Dict[str, Any]:
+        return self._get(html, "next_data", parse_next_data)
+
+    def soup(self, html: str) -> BeautifulSoup:
+        return self._get(html, "soup", lambda doc: BeautifulSoup(doc, "html.parser"))
+
+    def series_ids(self, html: str) -> List[str]:
+        return self._get(html, "series_ids", find_series_ids)
+
+
+_parsed_documents = ParsedDocumentCache()
+
+def get_parsed_documents() -> ParsedDocumentCache:
+    return _parsed_documents
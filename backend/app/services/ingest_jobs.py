@@ -0,0 +1,322 @@
+"""Background ingestion jobs for whole events.
+
+/admin/ingest-event only enqueues a job; a small pool of asyncio workers runs
+ingest_tournament for queued jobs, several events at a time. Jobs and a
+per-series checkpoint live in SQLite under LOCAL_CACHE_DIRECTORY, so after a
+crash or restart any job that was running is queued again and resumes with
+the series it had not finished yet. A run that leaves series unfinished ends
+as failed, and retrying it resumes the same way.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import get_settings
+from app.core.metrics import detach_request_timings
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+_JOB_COLUMNS = (
+    "id", "event_url", "vlr_event_url", "status", "attempts", "total_series",
+    "created_at", "started_at", "finished_at", "error", "pipeline_stats",
+)
+
+
+class IngestJobStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                event_url TEXT NOT NULL,
+                vlr_event_url TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                total_series INTEGER,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                error TEXT,
+                pipeline_stats TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS job_series (
+                job_id TEXT NOT NULL,
+                series_url TEXT NOT NULL,
+                rounds INTEGER NOT NULL,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (job_id, series_url)
+            );
+            """
+        )
+        self._db.commit()
+
+    def create(self, event_url: str, vlr_event_url: Optional[str] = None) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO jobs (id, event_url, vlr_event_url, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, event_url, vlr_event_url, QUEUED, time.time()),
+                )
+        return self.get(job_id)
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it."""
+        with self._lock:
+            with self._db:
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, finished_at = NULL, error = NULL "
+                    "WHERE id = ?",
+                    (RUNNING, time.time(), row[0]),
+                )
+        return self.get(row[0])
+
+    def requeue(self, job_id: Optional[str] = None) -> int:
+        """Put a running job (or every running job) back in the queue; returns how many."""
+        with self._lock:
+            with self._db:
+                if job_id is None:
+                    cur = self._db.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+                else:
+                    cur = self._db.execute(
+                        "UPDATE jobs SET status = ? WHERE id = ? AND status = ?", (QUEUED, job_id, RUNNING)
+                    )
+        return cur.rowcount
+
+    def retry(self, job_id: str) -> bool:
+        """Queue a failed job again; it resumes from its checkpoint."""
+        with self._lock:
+            with self._db:
+                cur = self._db.execute("UPDATE jobs SET status = ? WHERE id = ? AND status = ?", (QUEUED, job_id, FAILED))
+        return cur.rowcount > 0
+
+    def set_total(self, job_id: str, total_series: int):
+        with self._lock:
+            with self._db:
+                self._db.execute("UPDATE jobs SET total_series = ? WHERE id = ?", (total_series, job_id))
+
+    def record_series(self, job_id: str, series_url: str, rounds: int):
+        """Checkpoint one finished series."""
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO job_series (job_id, series_url, rounds, finished_at) VALUES (?, ?, ?, ?)",
+                    (job_id, series_url, rounds, time.time()),
+                )
+
+    def completed_series(self, job_id: str) -> Set[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT series_url FROM job_series WHERE job_id = ?", (job_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None, pipeline_stats: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, error = ?, pipeline_stats = ? WHERE id = ?",
+                    (status, time.time(), error, json.dumps(pipeline_stats) if pipeline_stats else None, job_id),
+                )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            return self._describe(dict(zip(_JOB_COLUMNS, row)))
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [self._describe(dict(zip(_JOB_COLUMNS, row))) for row in rows]
+
+    def _describe(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Add progress and throughput; caller holds the lock."""
+        done, rounds = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(rounds), 0) FROM job_series WHERE job_id = ?", (job["id"],)
+        ).fetchone()
+        # Throughput covers the current (or last) attempt only, so a resumed job isn't diluted
+        started = job["started_at"]
+        run_done = 0
+        if started is not None:
+            run_done = self._db.execute(
+                "SELECT COUNT(*) FROM job_series WHERE job_id = ? AND finished_at >= ?", (job["id"], started)
+            ).fetchone()[0]
+        elapsed = ((job["finished_at"] or time.time()) - started) if started is not None else 0.0
+
+        job["pipeline_stats"] = json.loads(job["pipeline_stats"]) if job["pipeline_stats"] else None
+        job["completed_series"] = done
+        job["rounds"] = rounds
+        job["progress"] = round(done / job["total_series"], 4) if job["total_series"] else 0.0
+        job["elapsed_seconds"] = round(elapsed, 3)
+        job["series_per_minute"] = round(run_done * 60.0 / elapsed, 3) if elapsed > 0 else 0.0
+        return job
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobCheckpoint:
+    """What ingest_tournament needs from a job: which series to skip and where to record progress."""
+
+    def __init__(self, store: IngestJobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+
+    def completed(self) -> Set[str]:
+        return self.store.completed_series(self.job_id)
+
+    def set_total(self, total_series: int):
+        self.store.set_total(self.job_id, total_series)
+
+    def series_done(self, series_url: str, rounds: int):
+        self.store.record_series(self.job_id, series_url, rounds)
+
+
+JobRunner = Callable[[Dict[str, Any], JobCheckpoint], Awaitable[Optional[Dict[str, Any]]]]
+
+
+async def run_event_ingest(job: Dict[str, Any], checkpoint: JobCheckpoint) -> Optional[Dict[str, Any]]:
+    """Default runner: ingest the job's event; returns the pipeline stats."""
+    from app.services.discovery import DiscoveryService
+
+    discovery_service = DiscoveryService()
+    await discovery_service.ingest_tournament(job["event_url"], vlr_event_url=job["vlr_event_url"], checkpoint=checkpoint)
+    return discovery_service.last_pipeline_stats
+
+
+class IngestJobQueue:
+    """
+    Usage:
+        queue = get_ingest_job_queue()
+        await queue.start()             # requeues jobs a previous process left running
+        job = queue.submit(event_url)
+        ...
+        await queue.stop()
+    """
+
+    def __init__(self, store: IngestJobStore, workers: int = 2, poll_interval: float = 5.0, runner: JobRunner = run_event_ingest):
+        self.store = store
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.runner = runner
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running: Dict[str, Dict[str, Any]] = {}
+        # Concurrent start() calls (lifespan, admin requests) start one set of workers
+        self._start_lock = asyncio.Lock()
+        self._requeued = False
+
+    async def start(self):
+        async with self._start_lock:
+            if self._tasks:
+                return
+            # Jobs a previous process left running; once, before any worker can claim one
+            if not self._requeued:
+                resumed = await asyncio.to_thread(self.store.requeue)
+                self._requeued = True
+                if resumed:
+                    logger.info(f"Ingest jobs: resuming {resumed} interrupted job(s)")
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._worker(n), name=f"ingest-job-{n}") for n in range(self.workers)]
+
+    async def stop(self):
+        async with self._start_lock:
+            tasks, self._tasks = self._tasks, []
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(self, event_url: str, vlr_event_url: Optional[str] = None) -> Dict[str, Any]:
+        job = self.store.create(event_url, vlr_event_url)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"Ingest jobs: queued {job['id']} for {event_url}")
+        return job
+
+    def retry(self, job_id: str) -> bool:
+        retried = self.store.retry(job_id)
+        if retried and self._wakeup is not None:
+            self._wakeup.set()
+        return retried
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": len(self._tasks), "running": sorted(self._running)}
+
+    async def _worker(self, n: int):
+        # start() may run inside an admin request; jobs outlive it
+        detach_request_timings()
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        self._running[job_id] = job
+        logger.info(f"Ingest jobs: running {job_id} ({job['event_url']}, attempt {job['attempts']})")
+        try:
+            stats = await self.runner(job, JobCheckpoint(self.store, job_id))
+        except asyncio.CancelledError:
+            # Shutting down: leave the checkpoint in place and resume on the next start
+            await asyncio.to_thread(self.store.requeue, job_id)
+            raise
+        except Exception as e:
+            logger.error(f"Ingest jobs: {job_id} failed: {e}")
+            await asyncio.to_thread(self.store.finish, job_id, FAILED, str(e))
+        else:
+            # Series dropped by a failing stage or write are missing from the checkpoint;
+            # the job fails so retry() picks up exactly those series
+            progress = await asyncio.to_thread(self.store.get, job_id)
+            missing = (progress["total_series"] or 0) - progress["completed_series"]
+            if missing > 0:
+                error = f"{missing} of {progress['total_series']} series were not ingested"
+                logger.error(f"Ingest jobs: {job_id} incomplete: {error}")
+                await asyncio.to_thread(self.store.finish, job_id, FAILED, error, stats)
+            else:
+                await asyncio.to_thread(self.store.finish, job_id, COMPLETED, None, stats)
+                logger.info(f"Ingest jobs: {job_id} completed")
+        finally:
+            self._running.pop(job_id, None)
+
+
+# Global instance
+_ingest_job_queue = None
+
+def get_ingest_job_queue() -> IngestJobQueue:
+    global _ingest_job_queue
+    if _ingest_job_queue is None:
+        settings = get_settings()
+        store = IngestJobStore(os.path.join(settings.LOCAL_CACHE_DIRECTORY, "ingest_jobs.sqlite3"))
+        _ingest_job_queue = IngestJobQueue(store, workers=settings.INGEST_JOB_WORKERS)
+    return _ingest_job_queue
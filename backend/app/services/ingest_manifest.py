@@ -0,0 +1,139 @@
+"""Local manifest of what has already been ingested, per series.
+
+For every series it records the document id of each round. Document ids are
+the MD5 of the processed round, so they double as content hashes. It also
+records the embedding model and document-format version the rounds were
+written with. Re-ingesting a series diffs the fresh rounds against it: only
+new or changed rounds are embedded and written, and rounds that disappeared
+(or were replaced by a changed version) are deleted from the stores.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def round_key(round_data: Dict[str, Any]) -> str:
+    """Stable identity of a round across re-scrapes (its content may change)."""
+    if round_data.get("round_id") is not None:
+        return str(round_data["round_id"])
+    return f"{round_data.get('match_id')}:{round_data.get('round_num')}"
+
+
+def round_keys(rounds) -> List[str]:
+    """round_key of every round in a list of round dicts or a columnar batch."""
+    if not isinstance(rounds, dict):
+        return [round_key(r) for r in rounds]
+    return [
+        str(round_id) if round_id is not None else f"{match_id}:{round_num}"
+        for round_id, match_id, round_num in zip(rounds["round_id"], rounds["match_id"], rounds["round_num"])
+    ]
+
+
+class IngestManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS series (
+                series_key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS series_rounds (
+                series_key TEXT NOT NULL,
+                round_key TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                PRIMARY KEY (series_key, round_key)
+            );
+            """
+        )
+        self._db.commit()
+
+    def load(self, series_key: str) -> Optional[Dict[str, Any]]:
+        """{"version", "rounds": {round_key: doc_id}} for a series, or None if never ingested."""
+        with self._lock:
+            row = self._db.execute("SELECT version FROM series WHERE series_key = ?", (series_key,)).fetchone()
+            if row is None:
+                return None
+            rounds = self._db.execute(
+                "SELECT round_key, doc_id FROM series_rounds WHERE series_key = ?", (series_key,)
+            ).fetchall()
+        return {"version": row[0], "rounds": dict(rounds)}
+
+    def diff(self, series_key: str, keys: List[str], doc_ids: List[str], version: str) -> Dict[str, Any]:
+        """
+        Compare fresh rounds, given as their round_keys and document ids, with the manifest.
+
+        Returns {"changed": [index into the rounds], "stale_ids": [doc ids to delete],
+        "unchanged": int, "entries": {round_key: doc_id}}. A version change
+        (new embedding model or document format) marks every round changed.
+        """
+        previous = self.load(series_key)
+        old = previous["rounds"] if previous and previous["version"] == version else {}
+        stale = set(previous["rounds"].values()) if previous else set()
+
+        entries: Dict[str, str] = {}
+        changed = []
+        for index, (key, doc_id) in enumerate(zip(keys, doc_ids)):
+            entries[key] = doc_id
+            if old.get(key) != doc_id:
+                changed.append(index)
+        # Anything previously written that is not a current document must go
+        stale -= set(entries.values())
+        return {
+            "changed": changed,
+            "stale_ids": sorted(stale),
+            "unchanged": len(doc_ids) - len(changed),
+            "entries": entries,
+        }
+
+    def commit(self, series_key: str, entries: Dict[str, str], version: str):
+        """Record the rounds now stored for a series, replacing its previous entry."""
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM series_rounds WHERE series_key = ?", (series_key,))
+                self._db.executemany(
+                    "INSERT INTO series_rounds (series_key, round_key, doc_id) VALUES (?, ?, ?)",
+                    [(series_key, key, doc_id) for key, doc_id in entries.items()],
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO series (series_key, version, updated_at) VALUES (?, ?, ?)",
+                    (series_key, version, time.time()),
+                )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            series = self._db.execute("SELECT COUNT(*) FROM series").fetchone()[0]
+            rounds = self._db.execute("SELECT COUNT(*) FROM series_rounds").fetchone()[0]
+        return {"series": series, "rounds": rounds}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Global instance
+_ingest_manifest = None
+
+def get_ingest_manifest() -> Optional[IngestManifest]:
+    global _ingest_manifest
+    if _ingest_manifest is None:
+        settings = get_settings()
+        if not settings.INGEST_MANIFEST_ENABLED:
+            return None
+        _ingest_manifest = IngestManifest(os.path.join(settings.LOCAL_CACHE_DIRECTORY, "ingest_manifest.sqlite3"))
+    return _ingest_manifest
@@ -1,14 +1,32 @@
 import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, List, Optional
 import logging
+from tenacity import Retrying, stop_after_attempt, wait_exponential
 from app.core.db import get_chroma_service
 from app.core.supabase import get_supabase
 from app.core.config import get_settings
-from google import genai
+from app.core.embeddings import get_embedding_engine, truncate_embedding
+from app.core.metrics import span
+from app.core.query_cache import get_query_cache
+from app.core.round_store import UNASSIGNED_EVENT, get_round_store
+from app.core.vector_index import get_vector_index, get_vector_index_path
+from app.services.ingest_manifest import get_ingest_manifest, round_keys
+from app.services.tendencies import get_tendency_store
 
 logger = logging.getLogger(__name__)
 
+# Bump when prepare_batch changes the documents or records it produces, so the
+# manifest re-embeds every series on the next ingest.
+DOCUMENT_VERSION = 1
+
+# round_embeddings columns copied unchanged from the processed round
+_RECORD_FIELDS = (
+    "round_num", "vod_url", "winning_team", "winner_slug", "team_a_slug", "team_b_slug",
+    "team_a", "team_b", "vod_timestamp", "score_a", "score_b", "map_name",
+)
+
 class IngestionService:
     def __init__(self):
         self.settings = get_settings()
@@ -23,127 +41,464 @@ class IngestionService:
 
         self.supabase = get_supabase()
 
-        # Initialize Gemini client for embeddings
-        self.gemini_client = None
-        if self.settings.GEMINI_API_KEY:
-            self.gemini_client = genai.Client(api_key=self.settings.GEMINI_API_KEY)
+        # Shared batched Gemini engine (None when no API key is configured)
+        self.embedder = get_embedding_engine()
+
+        # In-process search index kept in sync with every write (None when disabled)
+        self.vector_index = get_vector_index()
+
+        # What each series last wrote, for incremental re-ingestion (None when disabled)
+        self.manifest = get_ingest_manifest()
+
+        # Team/map tendency summaries, updated with deltas on every write (None when disabled)
+        self.tendencies = get_tendency_store()
+
+        # /query results that new rounds would change are dropped after every write
+        self.query_cache = get_query_cache()
+
+        # Columnar copy of every processed round for Analyze aggregates (None when disabled)
+        self.round_store = get_round_store()
 
     def _generate_embedding(self, text: str) -> List[float]:
         """Generate embedding vector using Gemini."""
-        if not self.gemini_client:
-            return None
+        return self._generate_embeddings([text])[0]
+
+    def _generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed all round documents in batched requests; None where embedding failed."""
+        if not self.embedder:
+            return [None] * len(texts)
         try:
-            result = self.gemini_client.models.embed_content(
-                model="models/gemini-embedding-001",
-                contents=text,
-                config={"task_type": "RETRIEVAL_DOCUMENT", "output_dimensionality": 768}
-            )
-            return result.embeddings[0].values
+            with span("embed_documents"):
+                return self.embedder.embed_documents(texts)
         except Exception as e:
             logger.error(f"Embedding generation failed: {e}")
-            return None
+            return [None] * len(texts)
 
     def _generate_id(self, data: Dict[str, Any]) -> str:
         """Deterministic MD5 hash for idempotency."""
         content_str = json.dumps(data, sort_keys=True, default=str)
         return hashlib.md5(content_str.encode('utf-8')).hexdigest()
 
+    @staticmethod
+    def _generate_ids(columns: Dict[str, list]) -> List[str]:
+        """_generate_id of every row of a columnar batch; each column is serialized once."""
+        fields = sorted(columns)
+        keys = [json.dumps(field) for field in fields]
+        encoded = [[json.dumps(v, sort_keys=True, default=str) for v in columns[field]] for field in fields]
+        # Same text json.dumps(row, sort_keys=True) gives for the equivalent round dict
+        return [
+            hashlib.md5(("{" + ", ".join(f"{k}: {v}" for k, v in zip(keys, values)) + "}").encode("utf-8")).hexdigest()
+            for values in zip(*encoded)
+        ]
+
+    @staticmethod
+    def _round_count(rounds) -> int:
+        return len(rounds["match_id"]) if isinstance(rounds, dict) else len(rounds)
+
+    @staticmethod
+    def _document_text(map_name, match_id, round_num, score_a, score_b, winning_team, win_cond, round_type, vod_timestamp) -> str:
+        """Semantic description of a round."""
+        round_num_text = f"round {round_num}" if round_num not in [1, 13] else "pistol round"
+        type_note = f" This was a {round_type} round." if round_type != "default" else ""
+        score_text = f"The score was {score_a}-{score_b}."
+        return (
+            f"On the map {map_name} in match {match_id}, "
+            f"{score_text} {round_num_text.capitalize()} was won by {winning_team} by {win_cond}. "
+            f"{type_note} The VOD for this round starts at approximately {vod_timestamp} seconds."
+        )
+
+    @staticmethod
+    def _supabase_record(doc_id: str, match_id_rib: str, summary: str, round_type, is_pistol, values) -> Dict[str, Any]:
+        """round_embeddings row; match_id is filled in once the match row exists."""
+        record = {
+            "external_id": doc_id,
+            "match_id": None,
+            "match_id_rib": match_id_rib,
+            "summary": summary,
+            "round_type": round_type,
+            "is_pistol": is_pistol,
+        }
+        record.update(zip(_RECORD_FIELDS, values))
+        return record
+
     def ingest_batch(self, rounds: List[Dict[str, Any]], common_metadata: Optional[Dict[str, Any]] = None) -> List[str]:
-        if not rounds:
+        if not self._round_count(rounds):
             return []
 
-        # 1. Identify Match and Event context
+        batch = self.prepare_batch(rounds)
+        self.embed_batch(batch)
+        return self.write_batch(batch, common_metadata)
+
+    def prepare_batch(self, rounds) -> Dict[str, Any]:
+        """
+        Build documents, Chroma metadata and Supabase records for a series.
+        Split from ingest_batch so the tournament pipeline can run embedding
+        and writing as separate stages.
+
+        `rounds` is a list of round dicts or a columnar batch from
+        process_series_data(columnar=True); the latter is read column by
+        column without building a dict per round.
+        """
+        if isinstance(rounds, dict):
+            return self._prepare_columns(rounds)
         # We assume the first round contains the match-level metadata
         first_round = rounds[0]
         match_id_rib = str(first_round.get('match_id'))
-        
-        # 2. Supabase: Ensure Match exists in DB
-        match_uuid = None
-        if self.supabase:
-            try:
-                # Upsert Match
-                match_data = {
-                    "external_id": match_id_rib,
-                    "event_id": common_metadata.get("event_id") if common_metadata else None,
-                    "team_a": first_round.get("team_a"),
-                    "team_b": first_round.get("team_b"),
-                    "team_a_slug": first_round.get("team_a_slug"),
-                    "team_b_slug": first_round.get("team_b_slug"),
-                    "map_name": first_round.get("map_name"),
-                }
-                match_res = self.supabase.table("matches").upsert(match_data, on_conflict="external_id").execute()
-                match_uuid = match_res.data[0]["id"]
-                logger.info(f"Supabase: Ensured match record {match_id_rib}")
-            except Exception as e:
-                logger.error(f"Supabase Match Ingestion failed: {e}")
 
-        # 3. Prepare data for Rounds
         ids, documents, metadatas = [], [], []
         supabase_rounds = []
 
         for r in rounds:
-            # Semantic description
-            round_num_text = f"round {r.get('round_num')}" if r.get('round_num') not in [1, 13] else "pistol round"
-            win_cond = r.get('win_condition', 'unknown')
             round_type = r.get('round_type', 'default')
-            type_note = f" This was a {round_type} round." if round_type != "default" else ""
-            score_text = f"The score was {r.get('score_a')}-{r.get('score_b')}."
-            
-            doc_text = (
-                f"On the map {r.get('map_name')} in match {r.get('match_id')}, "
-                f"{score_text} {round_num_text.capitalize()} was won by {r.get('winning_team')} by {win_cond}. "
-                f"{type_note} The VOD for this round starts at approximately {r.get('vod_timestamp')} seconds."
+            doc_text = self._document_text(
+                r.get('map_name'), r.get('match_id'), r.get('round_num'), r.get('score_a'), r.get('score_b'),
+                r.get('winning_team'), r.get('win_condition', 'unknown'), round_type, r.get('vod_timestamp'),
             )
-            
             doc_id = self._generate_id(r)
             ids.append(doc_id)
             documents.append(doc_text)
-            
+
             # clean metadata for Chroma
             cleaned_meta = {k: v for k, v in r.items() if isinstance(v, (str, int, float, bool))}
             metadatas.append(cleaned_meta)
 
-            # Generate embedding for Supabase
-            embedding = self._generate_embedding(doc_text)
-
-            # Supabase Record
-            supabase_record = {
-                "external_id": doc_id,
-                "match_id": match_uuid,
-                "match_id_rib": match_id_rib,
-                "round_num": r.get('round_num'),
-                "summary": doc_text,
-                "vod_url": r.get('vod_url'),
-                "winning_team": r.get('winning_team'),
-                "winner_slug": r.get('winner_slug'),
-                "team_a_slug": r.get('team_a_slug'),
-                "team_b_slug": r.get('team_b_slug'),
-                "team_a": r.get('team_a'),
-                "team_b": r.get('team_b'),
-                "vod_timestamp": r.get('vod_timestamp'),
-                "round_type": round_type,
-                "is_pistol": r.get('is_pistol', False),
-                "score_a": r.get('score_a'),
-                "score_b": r.get('score_b'),
-                "map_name": r.get('map_name')
-            }
+            supabase_rounds.append(self._supabase_record(
+                doc_id, match_id_rib, doc_text, round_type, r.get('is_pistol', False),
+                (r.get(field) for field in _RECORD_FIELDS),
+            ))
+
+        return {
+            "rounds": rounds,
+            "match_id_rib": match_id_rib,
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "supabase_rounds": supabase_rounds,
+            "embeddings": None,
+        }
+
+    def _prepare_columns(self, columns: Dict[str, list]) -> Dict[str, Any]:
+        """prepare_batch for a columnar batch."""
+        count = self._round_count(columns)
+
+        def column(field: str, default: Any = None) -> list:
+            values = columns.get(field)
+            return values if values is not None else [default] * count
+
+        match_id_rib = str(columns["match_id"][0])
+        round_types = column("round_type", "default")
+        documents = [
+            self._document_text(*values)
+            for values in zip(
+                column("map_name"), column("match_id"), column("round_num"), column("score_a"), column("score_b"),
+                column("winning_team"), column("win_condition", "unknown"), round_types, column("vod_timestamp"),
+            )
+        ]
+        ids = self._generate_ids(columns)
+        fields = list(columns)
+        metadatas = [
+            {k: v for k, v in zip(fields, values) if isinstance(v, (str, int, float, bool))}
+            for values in zip(*(columns[field] for field in fields))
+        ]
+        supabase_rounds = [
+            self._supabase_record(doc_id, match_id_rib, doc_text, round_type, is_pistol, values)
+            for doc_id, doc_text, round_type, is_pistol, values in zip(
+                ids, documents, round_types, column("is_pistol", False), zip(*(column(f) for f in _RECORD_FIELDS)),
+            )
+        ]
+        return {
+            # Stores that take one dict per round read the metadata rows; they only
+            # drop None values, which .get() gives back. The round store takes the columns.
+            "rounds": metadatas,
+            "series_rounds": columns,
+            "match_id_rib": match_id_rib,
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "supabase_rounds": supabase_rounds,
+            "embeddings": None,
+        }
+
+    def embed_batch(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        """Embed every document once; the same vectors go to both stores."""
+        return self._attach_embeddings(batch, self._generate_embeddings(batch["documents"]))
+
+    def embed_range(self, batch: Dict[str, Any], start: int, end: int) -> int:
+        """Embed documents[start:end] of a batch (streamed ingest goes map by map); returns how many got vectors."""
+        embeddings = batch["embeddings"] or [None] * len(batch["documents"])
+        embeddings[start:end] = self._generate_embeddings(batch["documents"][start:end])
+        self._attach_embeddings(batch, embeddings)
+        return sum(1 for vec in embeddings[start:end] if vec)
+
+    @staticmethod
+    def map_ranges(rounds: List[Dict[str, Any]]) -> List[tuple]:
+        """(map_name, start, end) for each run of consecutive rounds from the same map."""
+        ranges = []
+        start = 0
+        for i in range(1, len(rounds) + 1):
+            if i == len(rounds) or rounds[i].get("match_id") != rounds[start].get("match_id"):
+                ranges.append((rounds[start].get("map_name"), start, i))
+                start = i
+        return ranges
+
+    def _attach_embeddings(self, batch: Dict[str, Any], embeddings: List[Optional[List[float]]]) -> Dict[str, Any]:
+        # Written whether or not /query uses it yet, so enabling two-stage search hides no rounds
+        prefix_dims = self.settings.EMBEDDING_PREFIX_DIMENSIONS
+        for record, embedding in zip(batch["supabase_rounds"], embeddings):
             if embedding:
-                supabase_record["embedding"] = embedding
-            supabase_rounds.append(supabase_record)
+                record["embedding"] = embedding
+                if prefix_dims:
+                    record["embedding_prefix"] = truncate_embedding(embedding, prefix_dims)
+        batch["embeddings"] = embeddings
+        return batch
+
+    def manifest_version(self) -> str:
+        return (
+            f"{self.settings.EMBEDDING_MODEL}:{self.settings.EMBEDDING_DIMENSIONS}:doc{DOCUMENT_VERSION}"
+            f":prefix{self.settings.EMBEDDING_PREFIX_DIMENSIONS}"
+        )
+
+    def plan_series(self, series_key: str, rounds) -> Dict[str, Any]:
+        """
+        Diff a series' fresh rounds against the manifest.
+
+        `rounds` is a list of round dicts or a columnar batch; the planned
+        rounds come back in the same shape. Returns {"rounds": rounds that
+        need embedding and writing, "stale_ids", "unchanged", ...}; pass it
+        to commit_series once the writes landed. Without a manifest every
+        round is treated as new.
+        """
+        if not self.manifest or not self._round_count(rounds):
+            return {"series_key": series_key, "rounds": rounds, "stale_ids": [], "unchanged": 0, "entries": None}
+        columnar = isinstance(rounds, dict)
+        doc_ids = self._generate_ids(rounds) if columnar else [self._generate_id(r) for r in rounds]
+        diff = self.manifest.diff(series_key, round_keys(rounds), doc_ids, self.manifest_version())
+        changed = diff["changed"]
+        if not columnar:
+            rounds = [rounds[i] for i in changed]
+        elif len(changed) < len(doc_ids):
+            rounds = {field: [values[i] for i in changed] for field, values in rounds.items()}
+        return {
+            "series_key": series_key,
+            "rounds": rounds,
+            "stale_ids": diff["stale_ids"],
+            "unchanged": diff["unchanged"],
+            "entries": diff["entries"],
+        }
+
+    def commit_series(self, plan: Dict[str, Any]):
+        """Remove rounds the series no longer has, then record its current rounds."""
+        if not self.manifest or plan["entries"] is None:
+            return
+        if plan["stale_ids"]:
+            self.delete_rounds(plan["stale_ids"])
+        self.manifest.commit(plan["series_key"], plan["entries"], self.manifest_version())
 
-        # 4. Finalize Ingestion
+    def delete_rounds(self, doc_ids: List[str]):
+        """Delete round documents from every store they are written to."""
+        if not doc_ids:
+            return
         if self.collection:
             try:
-                self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
-                logger.info(f"Local ChromaDB: Ingested {len(ids)} rounds")
+                self.collection.delete(ids=list(doc_ids))
             except Exception as e:
-                logger.error(f"Local Ingestion failed: {e}")
+                logger.error(f"Local ChromaDB delete failed: {e}")
+        if self.supabase:
+            size = self.settings.SUPABASE_UPSERT_CHUNK_SIZE
+            for start in range(0, len(doc_ids), size):
+                chunk = list(doc_ids[start:start + size])
+                try:
+                    self._with_retry(
+                        lambda: self.supabase.table("round_embeddings").delete().in_("external_id", chunk).execute()
+                    )
+                except Exception as e:
+                    logger.error(f"Supabase Round delete failed: {e}")
+        if self.vector_index is not None:
+            self.vector_index.delete(doc_ids)
+        if self.tendencies is not None:
+            try:
+                self.tendencies.remove(doc_ids)
+            except Exception as e:
+                logger.error(f"Tendency update failed: {e}")
+        if self.query_cache is not None:
+            # Deleted rows carry no team/map here, so drop everything
+            self.query_cache.clear()
+        logger.info(f"Deleted {len(doc_ids)} stale rounds")
+
+    def write_batch(self, batch: Dict[str, Any], common_metadata: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Upsert a prepared (and ideally embedded) batch into Supabase and Chroma."""
+        return self.write_batches([batch], common_metadata)
+
+    def ingest_many(self, series: List[List[Dict[str, Any]]], common_metadata: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Bulk counterpart of ingest_batch: many series' rounds in one embed + write pass."""
+        batches = [self.prepare_batch(rounds) for rounds in series if self._round_count(rounds)]
+        if not batches:
+            return []
+        self.embed_batches(batches)
+        return self.write_batches(batches, common_metadata)
+
+    def embed_batches(self, batches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Embed several prepared batches through one engine call so requests are filled to capacity."""
+        documents = [doc for batch in batches for doc in batch["documents"]]
+        embeddings = self._generate_embeddings(documents)
+        offset = 0
+        for batch in batches:
+            count = len(batch["documents"])
+            self._attach_embeddings(batch, embeddings[offset:offset + count])
+            offset += count
+        return batches
+
+    def write_batches(self, batches: List[Dict[str, Any]], common_metadata: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Write many prepared series at once: one `matches` upsert for all of
+        them, then rounds in size-capped chunks (concurrently, with retry) to
+        Supabase and in batched upserts to Chroma.
+
+        Each batch gets "write_ok" = False if any of its rows failed to land.
+        common_metadata may carry "event_key", the round store partition the
+        series belong to.
+        """
+        with span("upsert"):
+            return self._write_batches(batches, common_metadata)
+
+    def _write_batches(self, batches: List[Dict[str, Any]], common_metadata: Optional[Dict[str, Any]]) -> List[str]:
+        batches = [b for b in batches if b["ids"]]
+        if not batches:
+            return []
+        for batch in batches:
+            batch["write_ok"] = True
+
+        # 1. Supabase: Ensure every Match exists in DB with a single request
+        match_uuids: Dict[str, str] = {}
+        if self.supabase:
+            match_rows = {}
+            for batch in batches:
+                first_round = batch["rounds"][0]
+                match_rows[batch["match_id_rib"]] = {
+                    "external_id": batch["match_id_rib"],
+                    "event_id": common_metadata.get("event_id") if common_metadata else None,
+                    "team_a": first_round.get("team_a"),
+                    "team_b": first_round.get("team_b"),
+                    "team_a_slug": first_round.get("team_a_slug"),
+                    "team_b_slug": first_round.get("team_b_slug"),
+                    "map_name": first_round.get("map_name"),
+                }
+            try:
+                match_res = self._with_retry(
+                    lambda: self.supabase.table("matches").upsert(list(match_rows.values()), on_conflict="external_id").execute()
+                )
+                match_uuids = {row["external_id"]: row["id"] for row in match_res.data}
+                logger.info(f"Supabase: Ensured {len(match_uuids)} match records")
+            except Exception as e:
+                logger.error(f"Supabase Match Ingestion failed: {e}")
+
+        ids = [doc_id for batch in batches for doc_id in batch["ids"]]
+        owners = [batch for batch in batches for _ in batch["ids"]]
+        embeddings = [emb for batch in batches for emb in (batch["embeddings"] or [None] * len(batch["ids"]))]
+
+        # 2. Local ChromaDB, in capped batches
+        if self.collection:
+            documents = [doc for batch in batches for doc in batch["documents"]]
+            metadatas = [meta for batch in batches for meta in batch["metadatas"]]
+            size = self.settings.CHROMA_UPSERT_BATCH_SIZE
+            for start in range(0, len(ids), size):
+                end = start + size
+                try:
+                    upsert_kwargs = {"ids": ids[start:end], "documents": documents[start:end], "metadatas": metadatas[start:end]}
+                    # Only skip Chroma's own embedding function when every vector came from Gemini
+                    if self.embedder and all(embeddings[start:end]):
+                        upsert_kwargs["embeddings"] = embeddings[start:end]
+                    self.collection.upsert(**upsert_kwargs)
+                    logger.info(f"Local ChromaDB: Ingested {len(upsert_kwargs['ids'])} rounds")
+                except Exception as e:
+                    logger.error(f"Local Ingestion failed: {e}")
+                    for batch in owners[start:end]:
+                        batch["write_ok"] = False
+
+        # 3. Supabase rounds, linked to their match and written in concurrent chunks
+        if self.supabase:
+            records = []
+            record_owner = {}
+            for batch in batches:
+                match_uuid = match_uuids.get(batch["match_id_rib"])
+                if not match_uuid:
+                    if match_uuids:
+                        logger.error(f"Supabase: no match id for {batch['match_id_rib']}, skipping its rounds")
+                    batch["write_ok"] = False
+                    continue
+                for record in batch["supabase_rounds"]:
+                    record["match_id"] = match_uuid
+                    records.append(record)
+                    record_owner[record["external_id"]] = batch
+            for record in self._write_round_chunks(records):
+                record_owner[record["external_id"]]["write_ok"] = False
+
+        # 4. In-process index
+        if self.vector_index is not None:
+            records = [record for batch in batches for record in batch["supabase_rounds"]]
+            try:
+                self.vector_index.upsert(ids, embeddings, records)
+                self.vector_index.save_if_stale(get_vector_index_path(), self.settings.LOCAL_INDEX_SAVE_INTERVAL)
+            except Exception as e:
+                logger.error(f"Local vector index update failed: {e}")
 
-        if self.supabase and match_uuid:
+        # 5. Tendency summaries (a re-written round replaces its previous contribution)
+        if self.tendencies is not None:
             try:
-                self.supabase.table("round_embeddings").upsert(supabase_rounds, on_conflict="external_id").execute()
-                logger.info(f"Supabase: Ingested {len(supabase_rounds)} rounds linked to match {match_uuid}")
+                rounds = [r for batch in batches for r in batch["rounds"]]
+                changed = self.tendencies.apply(rounds, ids)
+                logger.info(f"Tendencies: {changed}/{len(rounds)} rounds changed the summaries")
             except Exception as e:
-                logger.error(f"Supabase Round Ingestion failed: {e}")
-        
+                logger.error(f"Tendency update failed: {e}")
+
+        # 6. Columnar round store; a batch's "series_rounds" (the whole series, when only
+        # some rounds changed) replace the rows of its matches
+        if self.round_store is not None:
+            event = (common_metadata or {}).get("event_key") or UNASSIGNED_EVENT
+            for batch in batches:
+                try:
+                    self.round_store.write_series(event, batch.get("series_rounds") or batch["rounds"])
+                except Exception as e:
+                    logger.error(f"Round store write failed for match {batch['match_id_rib']}: {e}")
+
+        # 7. Cached /query results for the affected teams and maps
+        if self.query_cache is not None:
+            self.query_cache.invalidate_rounds(r for batch in batches for r in batch["rounds"])
+
         return ids
+
+    def _write_round_chunks(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Upsert round rows in concurrent chunks; returns the rows that could not be written."""
+        size = self.settings.SUPABASE_UPSERT_CHUNK_SIZE
+        chunks = [records[i:i + size] for i in range(0, len(records), size)]
+        if not chunks:
+            return []
+
+        def write(chunk):
+            self._with_retry(
+                lambda: self.supabase.table("round_embeddings").upsert(chunk, on_conflict="external_id").execute()
+            )
+            return len(chunk)
+
+        workers = max(1, min(self.settings.SUPABASE_WRITE_CONCURRENCY, len(chunks)))
+        written = 0
+        failed: List[Dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(write, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    written += future.result()
+                except Exception as e:
+                    logger.error(f"Supabase Round Ingestion failed: {e}")
+                    failed.extend(futures[future])
+        logger.info(f"Supabase: Ingested {written}/{len(records)} rounds in {len(chunks)} chunk(s)")
+        return failed
+
+    def _with_retry(self, fn):
+        for attempt in Retrying(
+            stop=stop_after_attempt(self.settings.SUPABASE_WRITE_RETRIES),
+            wait=wait_exponential(multiplier=0.5, min=0.5, max=8),
+            reraise=True,
+        ):
+            with attempt:
+                return fn()
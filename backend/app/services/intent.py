@@ -0,0 +1,201 @@
+"""Local intent parser for coach search queries.
+
+Most queries ("PRX pistol rounds on Lotus") only mention a known team alias,
+a map and a round type. A token trie over those vocabularies, plus fuzzy
+matching for misspellings, resolves them without a Gemini call; the parser
+reports a confidence score so the endpoint only falls back to the LLM when
+a query contains words it cannot account for.
+"""
+import difflib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.text import normalize_query
+
+# Hardcoded map of common abbreviations to canonical slugs
+TEAM_MAP = {
+    "prx": "paperrex",
+    "paper rex": "paperrex",
+    "drx": "drx",
+    "fnc": "fnatic",
+    "fnatic": "fnatic",
+    "nrg": "nrg",
+    "sen": "sentinels",
+    "sentinels": "sentinels",
+    "th": "teamheretics",
+    "heretics": "teamheretics",
+    "lev": "leviatán",
+    "leviatán": "leviatán",
+    "loud": "loud",
+    "tl": "teamliquid",
+    "liquid": "teamliquid",
+}
+
+MAPS = ["ascent", "bind", "haven", "lotus", "sunset", "abyss", "split", "fracture", "icebox", "breeze"]
+
+ROUND_TYPE_ALIASES = {
+    "thrifty": "thrifty",
+    "thrifties": "thrifty",
+    "flawless": "flawless",
+    "pistol": "pistol",
+    "pistols": "pistol",
+    "clutch": "clutch",
+    "clutches": "clutch",
+    "ace": "ace",
+    "aces": "ace",
+}
+
+# Words that carry no filter information; they never lower confidence
+FILLER_WORDS = {
+    "a", "all", "and", "against", "any", "at", "best", "by", "clip", "clips", "find", "for", "from",
+    "game", "games", "get", "in", "list", "map", "maps", "match", "matches", "me", "of", "on", "play",
+    "plays", "round", "rounds", "show", "the", "their", "to", "versus", "vs", "with", "won", "win",
+    "wins", "vod", "vods",
+}
+
+# Minimum length of a vocabulary word (and of a query token) for fuzzy matching. Shorter
+# names must match exactly or through an alias: one edit away from "bind" is already
+# "blind", and "haven" is a letter off "heaven".
+_FUZZY_MIN_LENGTH = 6
+_FUZZY_CUTOFF = 0.8
+
+
+class _TrieNode:
+    __slots__ = ("children", "value")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.value: Optional[Tuple[str, str]] = None
+
+
+class IntentParser:
+    """
+    Token trie over team aliases, maps and round types.
+
+    parse() scans the query once, taking the longest vocabulary phrase at
+    each position, and falls back to fuzzy matching for single unknown
+    tokens. Results are cached per normalized query.
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        self._root = _TrieNode()
+        self._fuzzy_vocab: Dict[str, Tuple[str, str]] = {}
+        for alias, slug in TEAM_MAP.items():
+            self._add(alias, ("team_slug", slug))
+        for name in MAPS:
+            self._add(name, ("map", name))
+        for alias, round_type in ROUND_TYPE_ALIASES.items():
+            self._add(alias, ("round_type", round_type))
+
+        self.cache_size = cache_size
+        self._parsed: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._resolved: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _add(self, phrase: str, value: Tuple[str, str]):
+        tokens = normalize_query(phrase).split()
+        node = self._root
+        for token in tokens:
+            node = node.children.setdefault(token, _TrieNode())
+        node.value = value
+        if len(tokens) == 1 and len(tokens[0]) >= _FUZZY_MIN_LENGTH:
+            self._fuzzy_vocab[tokens[0]] = value
+
+    def parse(self, query: str) -> Dict[str, Any]:
+        """Return {"team_slug", "map", "round_type", "confidence", "source": "local"}."""
+        key = normalize_query(query)
+        with self._lock:
+            cached = self._lru_get(self._parsed, key)
+        if cached is not None:
+            return dict(cached)
+        result = self._parse_tokens(key.split())
+        with self._lock:
+            self._lru_put(self._parsed, key, result)
+        return dict(result)
+
+    def _parse_tokens(self, tokens: List[str]) -> Dict[str, Any]:
+        found: Dict[str, Optional[str]] = {"team_slug": None, "map": None, "round_type": None}
+        match_quality = 1.0
+        content_tokens = 0
+        unknown_tokens = 0
+
+        i = 0
+        while i < len(tokens):
+            # Longest exact phrase starting at token i
+            node, j, best = self._root, i, None
+            while j < len(tokens) and tokens[j] in node.children:
+                node = node.children[tokens[j]]
+                j += 1
+                if node.value is not None:
+                    best = (j, node.value)
+            if best is not None:
+                end, (field, value) = best
+                content_tokens += 1
+                if found[field] is None:
+                    found[field] = value
+                i = end
+                continue
+
+            token = tokens[i]
+            i += 1
+            if token in FILLER_WORDS:
+                continue
+            content_tokens += 1
+
+            fuzzy = self._fuzzy(token)
+            if fuzzy is not None:
+                score, (field, value) = fuzzy
+                if found[field] is None:
+                    found[field] = value
+                match_quality *= score
+            else:
+                unknown_tokens += 1
+
+        if content_tokens == 0:
+            confidence = 0.0
+        else:
+            confidence = match_quality * (1 - unknown_tokens / content_tokens)
+        return {**found, "confidence": round(confidence, 3), "source": "local"}
+
+    def _fuzzy(self, token: str) -> Optional[Tuple[float, Tuple[str, str]]]:
+        if len(token) < _FUZZY_MIN_LENGTH:
+            return None
+        candidates = difflib.get_close_matches(token, self._fuzzy_vocab.keys(), n=1, cutoff=_FUZZY_CUTOFF)
+        if not candidates:
+            return None
+        score = difflib.SequenceMatcher(None, token, candidates[0]).ratio()
+        return score, self._fuzzy_vocab[candidates[0]]
+
+    def cached_resolution(self, query: str) -> Optional[Dict[str, Any]]:
+        """Final intent (local or LLM-assisted) previously resolved for this query."""
+        with self._lock:
+            cached = self._lru_get(self._resolved, normalize_query(query))
+        return dict(cached) if cached is not None else None
+
+    def remember_resolution(self, query: str, intent: Dict[str, Any]):
+        with self._lock:
+            self._lru_put(self._resolved, normalize_query(query), dict(intent))
+
+    def _lru_get(self, store: "OrderedDict", key: str):
+        value = store.get(key)
+        if value is not None:
+            store.move_to_end(key)
+        return value
+
+    def _lru_put(self, store: "OrderedDict", key: str, value: Dict[str, Any]):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.cache_size:
+            store.popitem(last=False)
+
+
+# Global instance
+_intent_parser = None
+
+def get_intent_parser() -> IntentParser:
+    global _intent_parser
+    if _intent_parser is None:
+        _intent_parser = IntentParser(cache_size=get_settings().INTENT_CACHE_SIZE)
+    return _intent_parser
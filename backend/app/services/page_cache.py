@@ -0,0 +1,270 @@
+"""On-disk content store for scraped rib.gg / VLR pages.
+
+Each URL maps to a small directory entry holding the raw HTML, its
+validators (ETag / Last-Modified) and, once extracted, the page's
+`__NEXT_DATA__` JSON. Freshness is decided by per-URL TTL policies: finished
+series and match pages never change, event pages are short-lived. In
+offline mode every lookup is served from disk regardless of age, so a
+tournament can be re-processed with zero network I/O.
+
+The cache keeps its entries in LRU order, with their sizes, and evicts the
+least recently used ones once it holds more than `max_bytes`. On startup
+that order is rebuilt from the entries' modification times.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class PageNotCachedError(Exception):
+    """Raised in offline mode when a URL has never been fetched."""
+
+
+def _series_is_live(next_data: Dict[str, Any]) -> bool:
+    series = next_data.get("props", {}).get("pageProps", {}).get("series") or {}
+    matches = series.get("matches") or []
+    return any(not m.get("completed") for m in matches if isinstance(m, dict))
+
+
+_ENTRY_SUFFIXES = (".meta.json", ".html", ".next.json")
+
+
+class PageCache:
+    def __init__(
+        self, directory: str, long_ttl: int, short_ttl: int, default_ttl: int, offline: bool = False, max_bytes: int = 0,
+    ):
+        self.directory = directory
+        self.offline = offline
+        self.max_bytes = max_bytes
+        self.long_ttl = long_ttl
+        self.short_ttl = short_ttl
+        # First matching pattern wins
+        self.policies: List[Tuple[re.Pattern, int]] = [
+            (re.compile(r"rib\.gg/series/"), long_ttl),
+            (re.compile(r"vlr\.gg/\d+/"), long_ttl),
+            (re.compile(r"rib\.gg/events?/"), short_ttl),
+            (re.compile(r"vlr\.gg/event/"), short_ttl),
+        ]
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # entry base path -> bytes on disk, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Index the entries already on disk, oldest write first."""
+        found: Dict[str, List[float]] = {}
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(_ENTRY_SUFFIXES):
+                    continue
+                stat = entry.stat()
+                size_mtime = found.setdefault(os.path.join(shard.path, entry.name.split(".", 1)[0]), [0, 0.0])
+                size_mtime[0] += stat.st_size
+                size_mtime[1] = max(size_mtime[1], stat.st_mtime)
+        for base, (size, _) in sorted(found.items(), key=lambda item: item[1][1]):
+            self._entries[base] = size
+            self._bytes += size
+
+    def ttl_for(self, url: str, next_data: Optional[Dict[str, Any]] = None) -> int:
+        # A series that is still being played changes between fetches
+        if next_data and _series_is_live(next_data):
+            return self.short_ttl
+        for pattern, ttl in self.policies:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def _paths(self, url: str) -> Dict[str, str]:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, digest[:2], digest)
+        return {"base": base, "meta": base + ".meta.json", "html": base + ".html", "json": base + ".next.json"}
+
+    def _touch(self, url: str):
+        base = self._paths(url)["base"]
+        with self._lock:
+            if base in self._entries:
+                self._entries.move_to_end(base)
+
+    def _record_write(self, url: str):
+        """Re-measure an entry after a write, mark it most recently used and enforce max_bytes."""
+        paths = self._paths(url)
+        size = 0
+        for kind in ("meta", "html", "json"):
+            try:
+                size += os.path.getsize(paths[kind])
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes += size - self._entries.pop(paths["base"], 0)
+            self._entries[paths["base"]] = size
+            self._evict_if_needed()
+
+    def _evict_if_needed(self):
+        """Drop least recently used entries down to 90% of max_bytes; caller holds the lock."""
+        if not self.max_bytes or self._bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        # The entry just written is last and is never evicted
+        while self._bytes > target and len(self._entries) > 1:
+            base, size = self._entries.popitem(last=False)
+            # Meta first: an entry without it is already a miss
+            for suffix in _ENTRY_SUFFIXES:
+                try:
+                    os.remove(base + suffix)
+                except OSError:
+                    pass
+            self._bytes -= size
+            evicted += 1
+        self.evictions += evicted
+        logger.info(f"Page cache: evicted {evicted} least recently used pages")
+
+    def _read_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._paths(url)["meta"], "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_atomic(path: str, data: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        if self.offline:
+            return True
+        return time.time() - meta.get("validated_at", 0) < meta.get("ttl", 0)
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return {"body", "etag", "last_modified", "fresh"} for a cached URL, or None."""
+        meta = self._read_meta(url)
+        if meta is None:
+            self.misses += 1
+            return None
+        try:
+            with open(self._paths(url)["html"], "r", encoding="utf-8") as f:
+                body = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        fresh = self.is_fresh(meta)
+        if fresh:
+            self.hits += 1
+        self._touch(url)
+        return {
+            "body": body,
+            "etag": meta.get("etag"),
+            "last_modified": meta.get("last_modified"),
+            "fresh": fresh,
+        }
+
+    def store(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        paths = self._paths(url)
+        now = time.time()
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": now,
+            "validated_at": now,
+            "ttl": self.ttl_for(url),
+        }
+        self._write_atomic(paths["html"], body)
+        # The extracted JSON belongs to the previous body
+        try:
+            os.remove(paths["json"])
+        except OSError:
+            pass
+        self._write_atomic(paths["meta"], json.dumps(meta))
+        self._record_write(url)
+
+    def mark_revalidated(self, url: str):
+        """A 304 confirmed the cached body is current; restart its TTL."""
+        meta = self._read_meta(url)
+        if meta is None:
+            return
+        meta["validated_at"] = time.time()
+        self.revalidated += 1
+        self._write_atomic(self._paths(url)["meta"], json.dumps(meta))
+        self._touch(url)
+
+    def load_next_data(self, url: str) -> Optional[Dict[str, Any]]:
+        """Extracted __NEXT_DATA__ for a URL whose cached page is still fresh."""
+        meta = self._read_meta(url)
+        if meta is None or not self.is_fresh(meta):
+            return None
+        try:
+            with open(self._paths(url)["json"], "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.hits += 1
+        self._touch(url)
+        return data
+
+    def store_next_data(self, url: str, data: Dict[str, Any]):
+        meta = self._read_meta(url)
+        if meta is None or not data:
+            return
+        self._write_atomic(self._paths(url)["json"], json.dumps(data))
+        # Live series pages get the short TTL even though the URL pattern is long-lived
+        ttl = self.ttl_for(url, data)
+        if ttl != meta.get("ttl"):
+            meta["ttl"] = ttl
+            self._write_atomic(self._paths(url)["meta"], json.dumps(meta))
+        self._record_write(url)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "offline": self.offline,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Global instance
+_page_cache = None
+
+def get_page_cache() -> Optional[PageCache]:
+    global _page_cache
+    if _page_cache is None:
+        settings = get_settings()
+        if not settings.PAGE_CACHE_ENABLED:
+            return None
+        _page_cache = PageCache(
+            directory=os.path.join(settings.LOCAL_CACHE_DIRECTORY, "pages"),
+            long_ttl=settings.PAGE_CACHE_LONG_TTL,
+            short_ttl=settings.PAGE_CACHE_SHORT_TTL,
+            default_ttl=settings.PAGE_CACHE_DEFAULT_TTL,
+            offline=settings.PAGE_CACHE_OFFLINE,
+            max_bytes=settings.PAGE_CACHE_MAX_BYTES,
+        )
+    return _page_cache
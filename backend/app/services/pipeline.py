@@ -0,0 +1,204 @@
+"""Bounded async producer/consumer pipeline.
+
+Each stage runs its own pool of workers and hands items to the next stage
+through a bounded queue, so a slow stage applies backpressure upstream
+instead of letting work pile up in memory. Wall time is bounded by the
+slowest stage rather than the sum of all of them.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream on a stage's input queue
+_DONE = object()
+
+_BATCH_POLL_SECONDS = 0.02
+
+StageFn = Callable[[Any], Awaitable[Any]]
+
+
+class StageStats:
+    """Per-stage counters; busy time is summed across the stage's workers."""
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.items_in = 0
+        self.items_out = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.first_start: Optional[float] = None
+        self.last_finish: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        wall = (self.last_finish - self.first_start) if self.first_start and self.last_finish else 0.0
+        processed = self.items_in - self.errors
+        return {
+            "stage": self.name,
+            "concurrency": self.concurrency,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wall_seconds": round(wall, 3),
+            "avg_item_seconds": round(self.busy_seconds / processed, 3) if processed else 0.0,
+            "throughput_per_sec": round(self.items_out / wall, 3) if wall else 0.0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class _Stage:
+    def __init__(self, name: str, fn: StageFn, concurrency: int, queue_size: int, batch_size: int = 1, batch_wait: float = 0.0):
+        self.name = name
+        self.fn = fn
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.stats = StageStats(name, self.concurrency)
+        self.active_workers = 0
+
+
+class Pipeline:
+    """
+    Usage:
+        pipeline = Pipeline("tournament")
+        pipeline.add_stage("fetch", fetch, concurrency=4)
+        pipeline.add_stage("parse", parse, concurrency=2)
+        results = await pipeline.run(urls)
+
+    A stage function receives one item and returns the item for the next
+    stage, or None to drop it. Exceptions are logged and counted, and the
+    failing item is dropped; they never abort the rest of the stream.
+
+    A stage added with batch_size > 1 receives a list of up to batch_size
+    items instead (waiting at most batch_wait seconds to fill it) and returns
+    a list of outputs.
+    """
+
+    def __init__(self, name: str, queue_size: int = 8):
+        self.name = name
+        self.default_queue_size = queue_size
+        self._stages: List[_Stage] = []
+        self.wall_seconds = 0.0
+
+    def add_stage(
+        self,
+        name: str,
+        fn: StageFn,
+        concurrency: int = 1,
+        queue_size: Optional[int] = None,
+        batch_size: int = 1,
+        batch_wait: float = 0.0,
+    ) -> "Pipeline":
+        self._stages.append(_Stage(name, fn, concurrency, queue_size or self.default_queue_size, batch_size, batch_wait))
+        return self
+
+    async def run(self, items: Iterable[Any]) -> List[Any]:
+        """Feed `items` through every stage and return what the last stage produced."""
+        if not self._stages:
+            return list(items)
+
+        results: List[Any] = []
+        started = time.perf_counter()
+        workers = []
+        for index, stage in enumerate(self._stages):
+            stage.active_workers = stage.concurrency
+            for _ in range(stage.concurrency):
+                workers.append(asyncio.create_task(self._worker(index, results)))
+
+        try:
+            first = self._stages[0]
+            for item in items:
+                await first.queue.put(item)
+                first.stats.max_queue_depth = max(first.stats.max_queue_depth, first.queue.qsize())
+            for _ in range(first.concurrency):
+                await first.queue.put(_DONE)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                if not task.done():
+                    task.cancel()
+            self.wall_seconds = time.perf_counter() - started
+
+        return results
+
+    async def _worker(self, index: int, results: List[Any]):
+        stage = self._stages[index]
+        downstream = self._stages[index + 1] if index + 1 < len(self._stages) else None
+        stats = stage.stats
+
+        while True:
+            items, done = await self._take(stage)
+            if items:
+                stats.items_in += len(items)
+                begin = time.perf_counter()
+                if stats.first_start is None:
+                    stats.first_start = begin
+                try:
+                    if stage.batch_size > 1:
+                        outputs = list(await stage.fn(items))
+                    else:
+                        outputs = [await stage.fn(items[0])]
+                except Exception as e:
+                    stats.errors += len(items)
+                    logger.error(f"Pipeline {self.name}: stage '{stage.name}' failed: {e}")
+                    outputs = []
+                finally:
+                    end = time.perf_counter()
+                    stats.busy_seconds += end - begin
+                    stats.last_finish = end
+
+                for output in outputs:
+                    if output is None:
+                        stats.dropped += 1
+                        continue
+                    stats.items_out += 1
+                    if downstream:
+                        # Blocks when the next stage is saturated (backpressure)
+                        await downstream.queue.put(output)
+                        downstream.stats.max_queue_depth = max(downstream.stats.max_queue_depth, downstream.queue.qsize())
+                    else:
+                        results.append(output)
+            if done:
+                break
+
+        stage.active_workers -= 1
+        if stage.active_workers == 0 and downstream:
+            for _ in range(downstream.concurrency):
+                await downstream.queue.put(_DONE)
+
+    @staticmethod
+    async def _take(stage: _Stage):
+        """Next item (or batch) from the stage's queue, and whether the stream ended."""
+        first = await stage.queue.get()
+        if first is _DONE:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + stage.batch_wait
+        while len(batch) < stage.batch_size:
+            if stage.queue.empty():
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                # Polling instead of wait_for(get()) so a cancelled get can never drop an item
+                await asyncio.sleep(min(_BATCH_POLL_SECONDS, remaining))
+                continue
+            item = stage.queue.get_nowait()
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pipeline": self.name,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "stages": [stage.stats.snapshot() for stage in self._stages],
+        }
@@ -1,9 +1,21 @@
 import logging
+from datetime import date, datetime
 from typing import List, Dict, Any, Optional
 from urllib.parse import urlparse, parse_qs
 
+from app.core.metrics import span
+
 logger = logging.getLogger(__name__)
 
+# Keys of a processed round, in the order they are emitted
+ROUND_FIELDS = (
+    "match_id", "round_id", "map_name", "round_num", "is_pistol",
+    "winning_team", "winner_slug", "team_a", "team_a_slug", "team_b", "team_b_slug",
+    "score_a", "score_b", "vod_url", "vod_timestamp", "win_condition", "round_type",
+)
+
+_VOD_TIME_PARAMS = ('?t=', '&t=', '?start=', '&start=')
+
 class MatchDataProcessor:
     """
     Process scraped match data into structured round data with VOD timestamps.
@@ -25,151 +37,183 @@ class MatchDataProcessor:
         except (ValueError, IndexError):
             return 0
     
+    @staticmethod
+    def to_slug(name: str) -> str:
+        """Consistent team slug used for filtering."""
+        return name.lower().replace(" ", "").replace("esports", "").replace(".", "")
+
+    @staticmethod
+    def series_date(series_data: Dict[str, Any]) -> Optional[date]:
+        """Day the series was played, from rib.gg's start date; None if absent."""
+        series_info = series_data.get('props', {}).get('pageProps', {}).get('series', {}) if 'props' in series_data else series_data
+        value = (series_info or {}).get('startDate') or (series_info or {}).get('startTime')
+        if not isinstance(value, str):
+            return None
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+        except ValueError:
+            return None
+
+    @classmethod
+    def _vod_parts(cls, vod_url: Optional[str]):
+        """(start seconds, base URL without timestamp, separator for the new t=) for a map VOD."""
+        vod_start_sec = cls.get_vod_start_time(vod_url)
+        base_vod_url = vod_url
+        if not base_vod_url:
+            return vod_start_sec, None, None
+        # Cleanup base URL (strip existing timestamps)
+        for p in _VOD_TIME_PARAMS:
+            if p in base_vod_url:
+                base_vod_url = base_vod_url.split(p)[0]
+        return vod_start_sec, base_vod_url, "&" if "?" in base_vod_url else "?"
+
     @classmethod
-    def process_series_data(cls, series_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def process_series_data(cls, series_data: Dict[str, Any], columnar: bool = False):
         """
         Convert scraped series data into a list of round dictionaries ready for ingestion.
         
         Args:
             series_data: Raw series data from rib.gg (extracted from __NEXT_DATA__)
+            columnar: Return a struct-of-arrays batch ({field: [value per round]},
+                fields in ROUND_FIELDS order) instead of one dict per round.
             
         Returns:
-            List of dictionaries, each representing a round with metadata and VOD link.
+            List of dictionaries, each representing a round with metadata and VOD link
+            (or the columnar batch when columnar=True).
         """
         try:
-            # Navigate the specific rib.gg structure
-            # Structure usually: props.pageProps.series
-            if 'props' in series_data:
-                series_info = series_data.get('props', {}).get('pageProps', {}).get('series', {})
-            else:
-                # If the data passed is already the 'series' object or flattened
-                series_info = series_data
-
-            if not series_info:
-                logger.warning("No series info found in data")
-                return []
-
-            team1 = series_info.get('team1', {})
-            team2 = series_info.get('team2', {})
-            team1_name = team1.get('name', 'Team 1')
-            team2_name = team2.get('name', 'Team 2')
-            
-            # Calculate round start times from kills data
-            # roundId -> gameTimeMillis (start of round approx)
-            round_start_gametimes = {}
-            # Stats are usually at the series level in rib.gg JSON for the whole series? 
-            # Or per match? Legacy code accessed series_info['stats']['kills'].
-            # Let's check the legacy code access pattern: series_info['stats'].get('kills', [])
-            
-            kills = series_info.get('stats', {}).get('kills', [])
-            for kill in kills:
-                round_id = kill.get('roundId')
-                if round_id not in round_start_gametimes:
-                    # roundTimeMillis is time *into* the round the kill happened
-                    # gameTimeMillis is time *into* the game the kill happened
-                    # start = game - round
-                    start_time = kill.get('gameTimeMillis', 0) - kill.get('roundTimeMillis', 0)
-                    round_start_gametimes[round_id] = start_time
-            
-            processed_rounds = []
-            
-            for match in series_info.get('matches', []):
-                if not match.get('completed'):
+            with span("process_series"):
+                return cls._process_rounds(series_data, columnar)
+        except Exception as e:
+            logger.error(f"Failed to process series data: {e}")
+            return cls.to_columns([]) if columnar else []
+
+    @staticmethod
+    def to_columns(rounds: List[Dict[str, Any]]) -> Dict[str, list]:
+        """Struct-of-arrays view of processed rounds."""
+        if not rounds:
+            return {field: [] for field in ROUND_FIELDS}
+        # Every round dict is built with its keys in ROUND_FIELDS order
+        return {field: list(values) for field, values in zip(ROUND_FIELDS, zip(*(r.values() for r in rounds)))}
+
+    @staticmethod
+    def iter_rounds(columns: Dict[str, list]):
+        """Round dicts from a columnar batch, in order."""
+        for values in zip(*(columns[field] for field in ROUND_FIELDS)):
+            yield dict(zip(ROUND_FIELDS, values))
+
+    @classmethod
+    def _process_rounds(cls, series_data: Dict[str, Any], columnar: bool = False):
+        """Single pass over the series; per-series values are computed once."""
+        # Navigate the specific rib.gg structure
+        # Structure usually: props.pageProps.series
+        if 'props' in series_data:
+            series_info = series_data.get('props', {}).get('pageProps', {}).get('series', {})
+        else:
+            # If the data passed is already the 'series' object or flattened
+            series_info = series_data
+
+        if not series_info:
+            logger.warning("No series info found in data")
+            return cls.to_columns([]) if columnar else []
+
+        matches = [m for m in series_info.get('matches', []) if m.get('completed')]
+
+        team1_name = series_info.get('team1', {}).get('name', 'Team 1')
+        team2_name = series_info.get('team2', {}).get('name', 'Team 2')
+
+        # Calculate round start times from kills data
+        # roundId -> gameTimeMillis - roundTimeMillis of its first kill (start of round approx)
+        round_start_gametimes = {}
+        last_round_id = object()
+        for kill in series_info.get('stats', {}).get('kills', []):
+            round_id = kill.get('roundId')
+            # Kills arrive grouped by round, so most lookups are skipped
+            if round_id == last_round_id or round_id in round_start_gametimes:
+                continue
+            last_round_id = round_id
+            round_start_gametimes[round_id] = kill.get('gameTimeMillis', 0) - kill.get('roundTimeMillis', 0)
+
+        # Per-series constants
+        team1_slug = None
+        team2_slug = None
+        vod_parts = {}
+        if columnar:
+            # Values go straight into their column; no dict is built per round
+            rounds = {field: [] for field in ROUND_FIELDS}
+            appends = [rounds[field].append for field in ROUND_FIELDS]
+
+            def emit(*values):
+                for append_value, value in zip(appends, values):
+                    append_value(value)
+        else:
+            rounds = []
+
+            def emit(*values):
+                rounds.append(dict(zip(ROUND_FIELDS, values)))
+        for match in matches:
+            map_name = match.get('map', {}).get('name', 'Unknown Map')
+            match_id = match.get('id')
+            map_vod_url = match.get('vodUrl')
+            parts = vod_parts.get(map_vod_url)
+            if parts is None:
+                parts = vod_parts[map_vod_url] = cls._vod_parts(map_vod_url)
+            vod_start_sec, base_vod_url, separator = parts
+
+            # Sort rounds by number to ensure order
+            sorted_rounds = sorted(match.get('rounds', []), key=lambda r: r.get('number', 0))
+            if not sorted_rounds:
+                continue
+
+            first_round_gametime = round_start_gametimes.get(sorted_rounds[0]['id'], 0)
+
+            # Tracking running score for this match; the score is the one at the START of the round
+            running_score_a = 0
+            running_score_b = 0
+            for round_info in sorted_rounds:
+                round_number = round_info.get('number')
+                round_id = round_info.get('id')
+                winner_num = round_info.get('winningTeamNumber')
+                if not (round_number and winner_num and round_id):
                     continue
-                    
-                map_name = match.get('map', {}).get('name', 'Unknown Map')
-                match_id = match.get('id')
-                map_vod_url = match.get('vodUrl')
-                
-                # Tracking running score for this match
-                running_score_a = 0
-                running_score_b = 0
-                
-                vod_start_sec = cls.get_vod_start_time(map_vod_url)
-                
-                # Cleanup base URL (strip existing timestamps)
-                base_vod_url = map_vod_url
-                if base_vod_url:
-                    for p in ['?t=', '&t=', '?start=', '&start=']:
-                        if p in base_vod_url:
-                            base_vod_url = base_vod_url.split(p)[0]
-                
-                # Sort rounds by number to ensure order
-                sorted_rounds = sorted(match.get('rounds', []), key=lambda r: r.get('number', 0))
-                
-                if not sorted_rounds:
+
+                current_round_gametime = round_start_gametimes.get(round_id, 0)
+                if current_round_gametime == 0:
                     continue
 
-                first_round_id = sorted_rounds[0]['id']
-                first_round_gametime = round_start_gametimes.get(first_round_id, 0)
-                
-                for round_info in sorted_rounds:
-                    round_number = round_info.get('number')
-                    round_id = round_info.get('id')
-                    winner_num = round_info.get('winningTeamNumber')
-                    
-                    if not all([round_number, winner_num, round_id]):
-                        continue
-                        
-                    current_round_gametime = round_start_gametimes.get(round_id, 0)
-                    if current_round_gametime == 0:
-                        continue
-
-                    offset_ms = current_round_gametime - first_round_gametime
-                    round_vod_timestamp_sec = vod_start_sec + (offset_ms / 1000)
-                    
-                    # Construct specific VOD URL
-                    # Use ? if no query params exist, otherwise use &
-                    if base_vod_url:
-                        separator = "&" if "?" in base_vod_url else "?"
-                        round_vod_url = f"{base_vod_url}{separator}t={int(round_vod_timestamp_sec)}s"
-                    else:
-                        round_vod_url = None
-                    winner_name = team1_name if winner_num == 1 else team2_name
-                    
-                    # Metadata construction
-                    # Use the score BEFORE incrementing it to show score at START of round
-                    
-                    # Unified Round Type logic (Direct from source)
-                    ceremony = round_info.get('ceremony', 'default').lower()
-                    win_condition = round_info.get('winCondition', 'unknown')
-                    round_num = int(round_number)
-                    is_pistol = round_num == 1 or round_num == 13
-
-                    # Helper to create consistent slugs for filtering
-                    def to_slug(name):
-                        return name.lower().replace(" ", "").replace("esports", "").replace(".", "")
-
-                    round_data = {
-                        "match_id": match_id,
-                        "round_id": round_id,
-                        "map_name": map_name,
-                        "round_num": round_num,
-                        "is_pistol": is_pistol,
-                        "winning_team": winner_name,
-                        "winner_slug": to_slug(winner_name),
-                        "team_a": team1_name,
-                        "team_a_slug": to_slug(team1_name),
-                        "team_b": team2_name,
-                        "team_b_slug": to_slug(team2_name),
-                        "score_a": running_score_a,
-                        "score_b": running_score_b,
-                        "vod_url": round_vod_url,
-                        "vod_timestamp": int(round_vod_timestamp_sec),
-                        "win_condition": win_condition,
-                        "round_type": ceremony,
-                    }
-                    
-                    processed_rounds.append(round_data)
-
-                    # Update running score for the NEXT round
-                    if winner_num == 1:
-                        running_score_a += 1
-                    else:
-                        running_score_b += 1
-                    
-            return processed_rounds
-            
-        except Exception as e:
-            logger.error(f"Failed to process series data: {e}")
-            return []
+                round_vod_timestamp_sec = vod_start_sec + ((current_round_gametime - first_round_gametime) / 1000)
+                vod_timestamp = int(round_vod_timestamp_sec)
+                round_num = int(round_number)
+                team1_won = winner_num == 1
+                if team1_slug is None:
+                    team1_slug = cls.to_slug(team1_name)
+                    team2_slug = cls.to_slug(team2_name)
+
+                # Positional, in ROUND_FIELDS order
+                emit(
+                    match_id,
+                    round_id,
+                    map_name,
+                    round_num,
+                    round_num == 1 or round_num == 13,  # is_pistol
+                    team1_name if team1_won else team2_name,  # winning_team
+                    team1_slug if team1_won else team2_slug,  # winner_slug
+                    team1_name,
+                    team1_slug,
+                    team2_name,
+                    team2_slug,
+                    running_score_a,
+                    running_score_b,
+                    f"{base_vod_url}{separator}t={vod_timestamp}s" if base_vod_url else None,
+                    vod_timestamp,
+                    round_info.get('winCondition', 'unknown'),
+                    round_info.get('ceremony', 'default').lower(),  # round_type
+                )
+
+                # Update running score for the NEXT round
+                if team1_won:
+                    running_score_a += 1
+                else:
+                    running_score_b += 1
+
+        return rounds
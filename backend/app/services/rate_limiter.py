@@ -0,0 +1,222 @@
+"""Adaptive per-host rate limiting for the scraper.
+
+Each host gets a token bucket (requests per second, bursting up to one
+second's worth) and a concurrency window. Both adapt AIMD-style from what
+the host tells us:
+
+- a fast successful response adds `increase` req/s to the rate, and a full
+  window of them widens the concurrency window by one;
+- 429/403/503, or a response slower than `latency_target`, halves both (at
+  most once per `decrease_interval`, so one burst of failures in flight
+  counts once). A Retry-After header pauses the host for that long.
+
+A host that answers plain HTTP with 403 is fetched through the browser for
+`browser_cooldown` seconds, then plain httpx is tried again; every repeat
+403 doubles the cool-down (up to `max_browser_cooldown`).
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Status codes that mean "slow down"
+THROTTLE_STATUSES = (403, 429, 503)
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).hostname or ""
+
+
+class HostLimiter:
+    def __init__(
+        self,
+        host: str,
+        rate: float = 4.0,
+        min_rate: float = 0.2,
+        max_rate: float = 50.0,
+        concurrency: int = 4,
+        max_concurrency: int = 8,
+        increase: float = 0.5,
+        latency_target: float = 3.0,
+        decrease_interval: float = 1.0,
+        browser_cooldown: float = 600.0,
+        max_browser_cooldown: float = 3600.0,
+    ):
+        self.host = host
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.concurrency = min(concurrency, max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.latency_target = latency_target
+        self.decrease_interval = decrease_interval
+        self.base_browser_cooldown = browser_cooldown
+        self.browser_cooldown = browser_cooldown
+        self.max_browser_cooldown = max_browser_cooldown
+
+        self.tokens = 1.0
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.browser_until = 0.0
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._window_successes = 0
+        self._cond: Optional[asyncio.Condition] = None
+        self._cond_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.requests = 0
+        self.throttled = 0
+        self.slow = 0
+        self.latency_ewma: Optional[float] = None
+
+    def _condition(self) -> asyncio.Condition:
+        # Conditions are bound to a loop; learned rates survive a loop change
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._cond_loop is not loop:
+            self._cond = asyncio.Condition()
+            self._cond_loop = loop
+            self.in_flight = 0
+        return self._cond
+
+    def _refill(self, now: float):
+        burst = max(1.0, self.rate)
+        self.tokens = min(burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self):
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+        except BaseException:
+            await self._release_slot()
+            raise
+
+    async def _release_slot(self):
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    async def release(self, status: Optional[int] = None, latency: Optional[float] = None, retry_after: Optional[float] = None):
+        """Give the slot back and adapt from the outcome (status None = no signal, e.g. a browser fetch)."""
+        self.record(status, latency, retry_after)
+        await self._release_slot()
+
+    def record(self, status: Optional[int], latency: Optional[float], retry_after: Optional[float] = None):
+        if status is None:
+            return
+        self.requests += 1
+        if latency is not None:
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        now = time.monotonic()
+        if status in THROTTLE_STATUSES:
+            self.throttled += 1
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            self._decrease(now, f"HTTP {status}")
+        elif latency is not None and latency > self.latency_target:
+            self.slow += 1
+            self._decrease(now, f"{latency:.1f}s response")
+        elif status < 400:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self._window_successes += 1
+            if self._window_successes >= self.concurrency:
+                self._window_successes = 0
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def _decrease(self, now: float, reason: str):
+        if now - self._last_decrease < self.decrease_interval:
+            return
+        self._last_decrease = now
+        self._window_successes = 0
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.concurrency = max(1, self.concurrency // 2)
+        logger.info(f"Rate limiter: {self.host} backing off after {reason} -> {self.rate:.2f} req/s, {self.concurrency} concurrent")
+
+    # --- browser fallback --------------------------------------------------
+
+    def use_browser(self) -> bool:
+        return time.monotonic() < self.browser_until
+
+    def browser_required(self):
+        """Plain HTTP was refused: use the browser for a while, longer each time."""
+        now = time.monotonic()
+        if self.browser_until:
+            # Second refusal after a cool-down: back off harder
+            self.browser_cooldown = min(self.max_browser_cooldown, self.browser_cooldown * 2)
+        self.browser_until = now + self.browser_cooldown
+        logger.warning(f"Rate limiter: {self.host} refuses plain HTTP; using the browser for {self.browser_cooldown:.0f}s")
+
+    def plain_http_ok(self):
+        if self.browser_until and not self.use_browser():
+            logger.info(f"Rate limiter: {self.host} accepts plain HTTP again")
+            self.browser_until = 0.0
+            self.browser_cooldown = self.base_browser_cooldown
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "host": self.host,
+            "rate_per_sec": round(self.rate, 3),
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "slow": self.slow,
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "paused_for": round(max(0.0, self.paused_until - now), 3),
+            "browser_mode_for": round(max(0.0, self.browser_until - now), 3),
+        }
+
+
+class HostRateLimiter:
+    """
+    Usage:
+        async with limiter.slot(url) as outcome:
+            response = await client.get(url)
+            outcome["status"] = response.status_code
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self._hosts: Dict[str, HostLimiter] = {}
+
+    def host(self, url: str) -> HostLimiter:
+        name = host_of(url)
+        limiter = self._hosts.get(name)
+        if limiter is None:
+            limiter = self._hosts[name] = HostLimiter(name, **self.options)
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Hold a rate-limited slot for one request; the yielded dict collects the outcome."""
+        limiter = self.host(url)
+        await limiter.acquire()
+        outcome: Dict[str, Any] = {"status": None, "retry_after": None}
+        start = time.monotonic()
+        try:
+            yield outcome
+        finally:
+            latency = time.monotonic() - start if outcome["status"] is not None else None
+            await limiter.release(outcome["status"], latency, outcome["retry_after"])
+
+    def snapshot(self):
+        return [limiter.snapshot() for limiter in sorted(self._hosts.values(), key=lambda h: h.host)]
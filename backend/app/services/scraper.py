@@ -1,15 +1,23 @@
 import httpx
 import logging
 import asyncio
+import importlib.util
 import time
 from typing import Optional, Dict, Any
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from bs4 import BeautifulSoup
-import json
-from playwright.async_api import async_playwright
+
+from app.core.config import get_settings
+from app.core.metrics import span
+from app.services.browser_pool import BrowserPool
+from app.services.html_parsing import get_parsed_documents
+from app.services.page_cache import PageNotCachedError, get_page_cache
+from app.services.rate_limiter import HostRateLimiter
 
 logger = logging.getLogger(__name__)
 
+# HTTP/2 needs the optional `h2` package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
 class ScraperService:
     _instance = None
 
@@ -26,38 +34,187 @@ class ScraperService:
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
         }
-        self.force_browser_mode = False
+        self.settings = get_settings()
+
+        # One pooled client per event loop, shared by every fetch
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Per-host request rate, concurrency and browser fallback, adapted from responses
+        self.limiter = self._new_limiter()
+
+        self.browser_pool = BrowserPool(
+            user_agent=self.headers["User-Agent"],
+            size=self.settings.BROWSER_POOL_SIZE,
+            browsers=self.settings.BROWSER_POOL_BROWSERS,
+            max_uses_per_context=self.settings.BROWSER_CONTEXT_MAX_USES,
+            ready_timeout_ms=self.settings.BROWSER_READY_TIMEOUT_MS,
+            headless=self.settings.HEADLESS_BROWSER,
+        )
+        self.page_cache = get_page_cache()
         self.initialized = True
 
+    async def startup(self):
+        """Open the pooled HTTP client (called from the FastAPI lifespan)."""
+        self._get_client()
+        if self.settings.BROWSER_POOL_PREWARM:
+            await self.browser_pool.start()
+
+    async def shutdown(self):
+        """Close the pooled HTTP client and browser pool."""
+        await self.browser_pool.close()
+        client, self._client = self._client, None
+        self._client_loop = None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            # A client is bound to the loop that created it; rebuild if we moved loops
+            http2 = self.settings.SCRAPER_HTTP2 and HTTP2_AVAILABLE
+            if self.settings.SCRAPER_HTTP2 and not HTTP2_AVAILABLE:
+                logger.info("h2 not installed; scraper client falling back to HTTP/1.1")
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                follow_redirects=True,
+                http2=http2,
+                timeout=self.settings.SCRAPER_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=self.settings.SCRAPER_MAX_CONNECTIONS,
+                    max_keepalive_connections=self.settings.SCRAPER_MAX_KEEPALIVE,
+                    keepalive_expiry=self.settings.SCRAPER_KEEPALIVE_EXPIRY,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _new_limiter(self) -> HostRateLimiter:
+        return HostRateLimiter(
+            rate=self.settings.SCRAPER_RATE_INITIAL,
+            min_rate=self.settings.SCRAPER_RATE_MIN,
+            max_rate=self.settings.SCRAPER_RATE_MAX,
+            concurrency=self.settings.SCRAPER_CONCURRENCY_INITIAL,
+            max_concurrency=self.settings.SCRAPER_MAX_CONNECTIONS_PER_HOST,
+            latency_target=self.settings.SCRAPER_LATENCY_TARGET,
+            browser_cooldown=self.settings.SCRAPER_BROWSER_COOLDOWN,
+        )
+
+    def rate_stats(self):
+        """Current per-host rates, concurrency windows and browser fallbacks."""
+        return self.limiter.snapshot()
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        try:
+            return min(float(value), 120.0) if value else None
+        except ValueError:
+            return None
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
         retry=retry_if_exception_type(httpx.RequestError)
     )
-    async def fetch_page(self, url: str) -> str:
+    async def fetch_page(self, url: str, force_browser: bool = False) -> str:
         """
         Fetches a page content using httpx with retries.
-        Falls back to Playwright if 403 Forbidden is detected.
+        Served from the page cache while fresh, revalidated with ETag /
+        Last-Modified once stale. Every network fetch goes through the
+        per-host rate limiter; 429/503 are retried after it backs off. A 403
+        switches that host (only) to Playwright until its cool-down expires;
+        `force_browser` skips httpx entirely.
         """
-        if self.force_browser_mode:
-            logger.info(f"Browser mode enforced. Using Playwright for {url}")
-            return await self._fetch_with_playwright(url)
-
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            try:
-                response = await client.get(url, headers=self.headers, timeout=10.0)
-                response.raise_for_status()
-                return response.text
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 403:
-                    logger.warning(f"403 Forbidden for {url}. Switching to Playwright mode.")
-                    self.force_browser_mode = True
-                    return await self._fetch_with_playwright(url)
-                raise
-            except httpx.RequestError as e:
-                # Fallback to playwright on connection errors as well for robustness
-                logger.warning(f"Request error for {url}: {e}. Trying Playwright.")
-                return await self._fetch_with_playwright(url)
+        cached = None
+        if self.page_cache:
+            cached = await asyncio.to_thread(self.page_cache.lookup, url)
+            if cached and cached["fresh"]:
+                return cached["body"]
+            if self.page_cache.offline:
+                raise PageNotCachedError(f"Offline mode: {url} is not in the page cache")
+
+        host = self.limiter.host(url)
+        if force_browser or host.use_browser():
+            if not force_browser:
+                logger.info(f"Browser mode for {host.host}. Using Playwright for {url}")
+            html = await self._fetch_with_playwright(url)
+            await self._cache_store(url, html)
+            return html
+
+        conditional_headers = {}
+        if cached:
+            if cached.get("etag"):
+                conditional_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                conditional_headers["If-Modified-Since"] = cached["last_modified"]
+
+        client = self._get_client()
+        try:
+            for attempt in range(self.settings.SCRAPER_THROTTLE_RETRIES + 1):
+                async with self.limiter.slot(url) as outcome:
+                    with span("scrape_fetch"):
+                        response = await client.get(url, headers=conditional_headers)
+                    outcome["status"] = response.status_code
+                    outcome["retry_after"] = self._retry_after(response)
+                # The limiter has slowed the host down; try again at the new pace
+                if response.status_code not in (429, 503) or attempt == self.settings.SCRAPER_THROTTLE_RETRIES:
+                    break
+                logger.info(f"HTTP {response.status_code} for {url}, retrying at {host.rate:.2f} req/s")
+            if response.status_code < 400:
+                host.plain_http_ok()
+            if response.status_code == 304 and cached:
+                await asyncio.to_thread(self.page_cache.mark_revalidated, url)
+                return cached["body"]
+            response.raise_for_status()
+            await self._cache_store(
+                url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified")
+            )
+            return response.text
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 403:
+                logger.warning(f"403 Forbidden for {url}. Switching {host.host} to Playwright mode.")
+                host.browser_required()
+                html = await self._fetch_with_playwright(url)
+                await self._cache_store(url, html)
+                return html
+            raise
+        except httpx.RequestError as e:
+            # Fallback to playwright on connection errors as well for robustness
+            logger.warning(f"Request error for {url}: {e}. Trying Playwright.")
+            html = await self._fetch_with_playwright(url)
+            await self._cache_store(url, html)
+            return html
+
+    async def _cache_store(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        if not self.page_cache:
+            return
+        try:
+            await asyncio.to_thread(self.page_cache.store, url, body, etag, last_modified)
+        except OSError as e:
+            logger.warning(f"Page cache write failed for {url}: {e}")
+
+    async def fetch_next_data(self, url: str) -> Dict[str, Any]:
+        """Fetch a page and return its __NEXT_DATA__, reusing the cached extraction when fresh."""
+        cached = await self.cached_next_data(url)
+        if cached is not None:
+            return cached
+        html = await self.fetch_page(url)
+        data = await asyncio.to_thread(self.extract_next_data, html)
+        await self.store_next_data(url, data)
+        return data
+
+    async def cached_next_data(self, url: str) -> Optional[Dict[str, Any]]:
+        if not self.page_cache:
+            return None
+        return await asyncio.to_thread(self.page_cache.load_next_data, url)
+
+    async def store_next_data(self, url: str, data: Dict[str, Any]):
+        if not self.page_cache or not data:
+            return
+        try:
+            await asyncio.to_thread(self.page_cache.store_next_data, url, data)
+        except OSError as e:
+            logger.warning(f"Page cache write failed for {url}: {e}")
 
     async def _fetch_with_playwright(self, url: str) -> str:
         """
@@ -65,38 +222,23 @@ class ScraperService:
         Handles dynamic rendering and bypasses simple bot detection.
         """
         logger.info(f"Fetching with Playwright: {url}")
-        
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(user_agent=self.headers["User-Agent"])
-            page = await context.new_page()
-            
-            try:
-                # Use domcontentloaded for speed, then a small sleep for hydration
-                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                await asyncio.sleep(3) # Wait for JS execution/hydration
-                content = await page.content()
-                return content
-            except Exception as e:
-                logger.error(f"Playwright failed for {url}: {e}")
-                raise e
-            finally:
-                await browser.close()
+        try:
+            # Still paced per host, but browser timings don't steer the limiter
+            async with self.limiter.slot(url):
+                with span("playwright_render"):
+                    return await self.browser_pool.fetch(url)
+        except Exception as e:
+            logger.error(f"Playwright failed for {url}: {e}")
+            raise e
 
     def extract_next_data(self, html_content: str) -> Dict[str, Any]:
         """
         Extracts the JSON data from the __NEXT_DATA__ script tag.
+        Scans the raw HTML for the tag instead of building a DOM; the result
+        is shared with other callers parsing the same page (read-only).
         """
-        soup = BeautifulSoup(html_content, "html.parser")
-        script_tag = soup.find("script", id="__NEXT_DATA__")
-        
-        if script_tag and script_tag.string:
-            try:
-                return json.loads(script_tag.string)
-            except json.JSONDecodeError:
-                logger.error("Failed to parse __NEXT_DATA__ JSON")
-        
-        return {}
+        with span("next_data_parse"):
+            return get_parsed_documents().next_data(html_content)
 
 # Global Accessor
 def get_scraper_service() -> ScraperService:
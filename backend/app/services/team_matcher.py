@@ -0,0 +1,146 @@
+"""Fuzzy team-name matching between VLR.gg and rib.gg.
+
+The two sites spell the same team differently ("NRG" / "NRG Esports",
+"LEVIATÁN" / "Leviatán", "Team Heretics" / "Heretics"). TeamMatcher indexes
+the VLR names of one event once:
+
+- a normalized key: accents, case, punctuation and filler words such as
+  "esports" or "team" removed, plus a table of common abbreviations;
+- the name's token set, scored with a token-set similarity;
+- a character trigram index, so only names sharing trigrams get scored.
+
+resolve() returns the key of the best VLR name scoring above the threshold.
+Results are memoized per input name, so resolving every round of an event
+costs one dict lookup per round after the first.
+"""
+import difflib
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Words that don't identify a team
+_FILLER = {"esports", "esport", "gaming", "team", "club", "the", "gg"}
+
+# Abbreviations used by one site for teams the other spells out
+TEAM_ALIASES = {
+    "PRX": "Paper Rex",
+    "SEN": "Sentinels",
+    "TH": "Team Heretics",
+    "TL": "Team Liquid",
+    "FNC": "FNATIC",
+    "LEV": "Leviatán",
+    "100T": "100 Thieves",
+    "C9": "Cloud9",
+    "EG": "Evil Geniuses",
+    "KC": "Karmine Corp",
+    "EDG": "EDward Gaming",
+    "FPX": "FunPlus Phoenix",
+    "BLG": "Bilibili Gaming",
+    "TS": "Team Secret",
+    "VIT": "Team Vitality",
+    "NAVI": "Natus Vincere",
+    "DFM": "DetonatioN FocusMe",
+}
+
+# Minimum combined score for a fuzzy (non-exact) match
+MATCH_THRESHOLD = 0.75
+# Candidates (by shared trigrams) scored per lookup
+_MAX_CANDIDATES = 8
+
+
+def team_tokens(name: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode().lower()
+    tokens = re.findall(r"[a-z0-9]+", text)
+    core = [t for t in tokens if t not in _FILLER]
+    return core or tokens
+
+
+def team_key(name: str) -> str:
+    """Normalized identity of a team name: "NRG Esports" and "NRG" both give "nrg"."""
+    return "".join(team_tokens(name))
+
+
+_ALIAS_KEYS = {team_key(alias): team_key(name) for alias, name in TEAM_ALIASES.items()}
+
+
+def _ratio(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a, b).ratio() if a and b else 0.0
+
+
+def token_set_similarity(a: List[str], b: List[str]) -> float:
+    """Similarity that ignores token order and duplicated tokens."""
+    set_a, set_b = set(a), set(b)
+    if not set_a or not set_b:
+        return 0.0
+    common = " ".join(sorted(set_a & set_b))
+    with_a = f"{common} {' '.join(sorted(set_a - set_b))}".strip()
+    with_b = f"{common} {' '.join(sorted(set_b - set_a))}".strip()
+    return max(_ratio(common, with_a), _ratio(common, with_b), _ratio(with_a, with_b))
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"${key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TeamMatcher:
+    def __init__(self, names: Optional[List[str]] = None):
+        # key -> display name, token list and trigrams of each indexed team
+        self.names: Dict[str, str] = {}
+        self._tokens: Dict[str, List[str]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._index: Dict[str, Set[str]] = defaultdict(set)
+        self._resolved: Dict[str, Optional[Tuple[str, float]]] = {}
+        for name in names or ():
+            self.add(name)
+
+    def add(self, name: str) -> str:
+        """Index a team name; returns its key."""
+        key = team_key(name)
+        if key and key not in self.names:
+            self.names[key] = name
+            self._tokens[key] = team_tokens(name)
+            self._grams[key] = trigrams(key)
+            for gram in self._grams[key]:
+                self._index[gram].add(key)
+            # A new name can change earlier answers
+            self._resolved.clear()
+        return key
+
+    def resolve(self, name: str) -> Optional[str]:
+        match = self.match(name)
+        return match[0] if match else None
+
+    def match(self, name: str) -> Optional[Tuple[str, float]]:
+        """(key, score) of the best indexed team for `name`, or None below the threshold."""
+        if name in self._resolved:
+            return self._resolved[name]
+        result = self._match(name)
+        self._resolved[name] = result
+        return result
+
+    def _match(self, name: str) -> Optional[Tuple[str, float]]:
+        key = team_key(name)
+        if not key:
+            return None
+        for candidate in (key, _ALIAS_KEYS.get(key)):
+            if candidate in self.names:
+                return candidate, 1.0
+        # Reverse alias: an indexed abbreviation of this full name
+        for alias, full in _ALIAS_KEYS.items():
+            if full == key and alias in self.names:
+                return alias, 1.0
+
+        grams = trigrams(key)
+        shared = Counter(k for gram in grams for k in self._index.get(gram, ()))
+        tokens = team_tokens(name)
+        best = None
+        for candidate, overlap in shared.most_common(_MAX_CANDIDATES):
+            dice = 2 * overlap / (len(grams) + len(self._grams[candidate]))
+            score = 0.7 * token_set_similarity(tokens, self._tokens[candidate]) + 0.3 * dice
+            if best is None or score > best[1]:
+                best = (candidate, score)
+        if best is not None and best[1] >= MATCH_THRESHOLD:
+            return best[0], round(best[1], 4)
+        return None
@@ -0,0 +1,204 @@
+"""Precomputed team tendencies, maintained incrementally on ingest.
+
+One summary row per (team_slug, map, bucket) holds how many rounds the team
+played and won there, plus how many of those wins were thrifty (eco),
+flawless, clutch or ace rounds. Map "all" aggregates every map. Buckets:
+
+- all:        every round
+- pistol:     rounds 1 and 13
+- conversion: rounds 2, 3, 14 and 15 (converting, or recovering from, a pistol)
+- first_half / second_half / overtime
+
+Every ingested round is also remembered by its round key (see
+ingest_manifest.round_key) with the facts it contributed. When the same round
+is written again its old contribution is subtracted before the new one is
+added, and deleted rounds subtract theirs, so re-ingestion never double
+counts. Reads are primary-key lookups on the small summary table.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from app.core.config import get_settings
+from app.services.ingest_manifest import round_key
+
+logger = logging.getLogger(__name__)
+
+ALL_MAPS = "all"
+CEREMONIES = ("thrifty", "flawless", "clutch", "ace")
+# Counters kept per summary row, in column order
+COUNTERS = ("rounds", "wins") + CEREMONIES
+
+
+def round_buckets(round_num: Optional[int], is_pistol: bool) -> List[str]:
+    buckets = ["all"]
+    if is_pistol:
+        buckets.append("pistol")
+    if round_num in (2, 3, 14, 15):
+        buckets.append("conversion")
+    if round_num:
+        buckets.append("first_half" if round_num <= 12 else "second_half" if round_num <= 24 else "overtime")
+    return buckets
+
+
+def _facts(round_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields a round's contribution depends on."""
+    return {
+        "team_a": round_data.get("team_a_slug"),
+        "team_b": round_data.get("team_b_slug"),
+        "winner": round_data.get("winner_slug"),
+        "map": (round_data.get("map_name") or "unknown").lower(),
+        "round_num": round_data.get("round_num"),
+        "is_pistol": bool(round_data.get("is_pistol")),
+        "round_type": (round_data.get("round_type") or "default").lower(),
+    }
+
+
+def _contribute(deltas: Dict[tuple, List[int]], facts: Dict[str, Any], sign: int):
+    buckets = round_buckets(facts["round_num"], facts["is_pistol"])
+    for team in {facts["team_a"], facts["team_b"]}:
+        if not team:
+            continue
+        won = facts["winner"] == team
+        values = [1, int(won)] + [int(won and facts["round_type"] == c) for c in CEREMONIES]
+        for map_name in (facts["map"], ALL_MAPS):
+            for bucket in buckets:
+                row = deltas[(team, map_name, bucket)]
+                for i, v in enumerate(values):
+                    row[i] += sign * v
+
+
+class TendencyStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        counters = ", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in COUNTERS)
+        self._db.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS tendencies (
+                team_slug TEXT NOT NULL,
+                map_name TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                {counters},
+                PRIMARY KEY (team_slug, map_name, bucket)
+            );
+            CREATE TABLE IF NOT EXISTS tendency_rounds (
+                round_key TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                facts TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tendency_rounds_doc ON tendency_rounds (doc_id);
+            """
+        )
+        self._db.commit()
+
+    def apply(self, rounds: Sequence[Dict[str, Any]], doc_ids: Sequence[str]) -> int:
+        """Fold a batch of written rounds into the summaries; returns how many changed them."""
+        deltas: Dict[tuple, List[int]] = defaultdict(lambda: [0] * len(COUNTERS))
+        changed = 0
+        with self._lock:
+            with self._db:
+                for round_data, doc_id in zip(rounds, doc_ids):
+                    key = round_key(round_data)
+                    facts = _facts(round_data)
+                    row = self._db.execute("SELECT facts FROM tendency_rounds WHERE round_key = ?", (key,)).fetchone()
+                    old = json.loads(row[0]) if row else None
+                    if old != facts:
+                        if old is not None:
+                            _contribute(deltas, old, -1)
+                        _contribute(deltas, facts, +1)
+                        changed += 1
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO tendency_rounds (round_key, doc_id, facts) VALUES (?, ?, ?)",
+                        (key, doc_id, json.dumps(facts, sort_keys=True)),
+                    )
+                self._apply_deltas(deltas)
+        return changed
+
+    def remove(self, doc_ids: Iterable[str]) -> int:
+        """Subtract rounds that were deleted from the stores."""
+        doc_ids = list(doc_ids)
+        deltas: Dict[tuple, List[int]] = defaultdict(lambda: [0] * len(COUNTERS))
+        removed = 0
+        with self._lock:
+            with self._db:
+                for start in range(0, len(doc_ids), 500):
+                    chunk = doc_ids[start:start + 500]
+                    marks = ", ".join("?" * len(chunk))
+                    rows = self._db.execute(
+                        f"SELECT facts FROM tendency_rounds WHERE doc_id IN ({marks})", chunk
+                    ).fetchall()
+                    for (facts,) in rows:
+                        _contribute(deltas, json.loads(facts), -1)
+                    removed += len(rows)
+                    self._db.execute(f"DELETE FROM tendency_rounds WHERE doc_id IN ({marks})", chunk)
+                self._apply_deltas(deltas)
+        return removed
+
+    def _apply_deltas(self, deltas: Dict[tuple, List[int]]):
+        """Caller holds the lock and an open transaction."""
+        rows = [key + tuple(values) for key, values in deltas.items() if any(values)]
+        if not rows:
+            return
+        columns = ", ".join(COUNTERS)
+        updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in COUNTERS)
+        self._db.executemany(
+            f"INSERT INTO tendencies (team_slug, map_name, bucket, {columns}) "
+            f"VALUES (?, ?, ?, {', '.join('?' * len(COUNTERS))}) "
+            f"ON CONFLICT (team_slug, map_name, bucket) DO UPDATE SET {updates}",
+            rows,
+        )
+        self._db.execute("DELETE FROM tendencies WHERE rounds <= 0")
+
+    def get(self, team_slug: str, map_name: Optional[str] = None, bucket: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Summary rows for a team, optionally narrowed to one map and/or bucket."""
+        query = f"SELECT map_name, bucket, {', '.join(COUNTERS)} FROM tendencies WHERE team_slug = ?"
+        params: List[Any] = [team_slug.lower()]
+        if map_name:
+            query += " AND map_name = ?"
+            params.append(map_name.lower())
+        if bucket:
+            query += " AND bucket = ?"
+            params.append(bucket)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        out = []
+        for map_name, bucket, *values in rows:
+            row = {"map_name": map_name, "bucket": bucket, **dict(zip(COUNTERS, values))}
+            row["win_rate"] = round(row["wins"] / row["rounds"], 4) if row["rounds"] else 0.0
+            out.append(row)
+        out.sort(key=lambda r: (r["map_name"] != ALL_MAPS, r["map_name"], r["bucket"]))
+        return out
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT COUNT(*) FROM tendencies").fetchone()[0]
+            rounds = self._db.execute("SELECT COUNT(*) FROM tendency_rounds").fetchone()[0]
+        return {"summary_rows": rows, "rounds": rounds}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Global instance
+_tendency_store = None
+
+def get_tendency_store() -> Optional[TendencyStore]:
+    global _tendency_store
+    if _tendency_store is None:
+        settings = get_settings()
+        if not settings.TENDENCIES_ENABLED:
+            return None
+        _tendency_store = TendencyStore(os.path.join(settings.LOCAL_CACHE_DIRECTORY, "tendencies.sqlite3"))
+    return _tendency_store
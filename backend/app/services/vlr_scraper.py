@@ -3,14 +3,22 @@
 Extracts per-map YouTube VOD URLs + start offsets from VLR.gg match pages.
 Used by the ingestion pipeline to enrich rounds with VOD links when rib.gg
 has no VOD data, and by the backfill script for already-ingested tournaments.
+
+stream_event_vods() yields match pages as they resolve, so a VodLookup can be
+filled incrementally while rib.gg series are still being ingested.
 """
+import asyncio
+import difflib
 import logging
 import re
-from typing import List, Dict, Any, Optional, Tuple
-from bs4 import BeautifulSoup
+import time
+from datetime import date, datetime
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
 
 from app.services.scraper import get_scraper_service
+from app.services.html_parsing import get_parsed_documents
+from app.services.team_matcher import TeamMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +49,31 @@ def extract_youtube_info(url: str) -> Optional[Tuple[str, int]]:
     return None
 
 
+_VLR_DATE_FORMATS = ("%a, %B %d, %Y", "%B %d, %Y", "%a, %b %d, %Y", "%Y-%m-%d", "%Y/%m/%d")
+
+
+def parse_vlr_date(text: str) -> Optional[date]:
+    """Parse a VLR.gg date label ("Fri, August 2, 2024"); None if it isn't one."""
+    text = (text or "").strip()
+    for fmt in _VLR_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _date_label(match_item) -> str:
+    """The day header above a match card on VLR.gg event match lists."""
+    card = match_item.find_parent(class_="wf-card")
+    label = card.find_previous_sibling(class_="wf-label") if card else None
+    if label is None:
+        return ""
+    # The label may carry a trailing "Today" / "Yesterday" tag
+    text = label.find(string=True, recursive=False)
+    return text.strip() if text else label.get_text(strip=True)
+
+
 async def fetch_event_matches(event_url: str) -> List[Dict[str, Any]]:
     """Fetch all match entries from a VLR.gg event page.
 
@@ -48,7 +81,7 @@ async def fetch_event_matches(event_url: str) -> List[Dict[str, Any]]:
     """
     scraper = get_scraper_service()
     html = await scraper.fetch_page(event_url)
-    soup = BeautifulSoup(html, "html.parser")
+    soup = get_parsed_documents().soup(html)
     matches = []
 
     for a in soup.select("a.match-item, a.wf-module-item"):
@@ -65,7 +98,7 @@ async def fetch_event_matches(event_url: str) -> List[Dict[str, Any]]:
         scores = [s.get_text(strip=True) for s in score_el]
 
         date_el = a.select_one(".match-item-date")
-        date_str = date_el.get_text(strip=True) if date_el else ""
+        date_str = date_el.get_text(strip=True) if date_el else _date_label(a)
 
         matches.append({
             "vlr_match_id": vlr_id,
@@ -87,7 +120,7 @@ async def fetch_match_vods(match_url: str) -> Dict[str, Any]:
     """
     scraper = get_scraper_service()
     html = await scraper.fetch_page(match_url)
-    soup = BeautifulSoup(html, "html.parser")
+    soup = get_parsed_documents().soup(html)
 
     team_els = soup.select(".match-header-link-name .wf-title-med")
     team_a = team_els[0].get_text(strip=True) if len(team_els) > 0 else ""
@@ -125,3 +158,152 @@ async def fetch_match_vods(match_url: str) -> Dict[str, Any]:
 
     logger.info(f"VLR: {team_a} vs {team_b} — {len(maps)} map VODs found")
     return {"team_a": team_a, "team_b": team_b, "maps": maps}
+
+
+async def stream_event_vods(event_url: str) -> AsyncIterator[Dict[str, Any]]:
+    """Yield the event's match list as {"schedule": [...]}, then fetch_match_vods()
+    results for every match in completion order.
+
+    Failed match pages are logged and skipped.
+    """
+    matches = await fetch_event_matches(event_url)
+    logger.info(f"VLR: found {len(matches)} matches, fetching VODs...")
+    # Pacing comes from the scraper's per-host limiter
+    yield {"schedule": matches}
+    tasks = [asyncio.ensure_future(fetch_match_vods(m["vlr_match_url"])) for m in matches]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                yield await next_done
+            except Exception as e:
+                logger.warning(f"VLR fetch failed: {e}")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+TeamPair = Tuple[str, ...]
+
+
+def map_key(map_name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", (map_name or "").lower())
+
+
+class VodLookup:
+    """(team_pair, map) -> {youtube_video_id, start_seconds}, filled as match pages resolve.
+
+    Team pairs are sorted TeamMatcher keys of the VLR names, so rib.gg names
+    are matched fuzzily; a pair that can't be named falls back to the VLR
+    match closest in date that involves a known team. Readers wait only for
+    the pair they need (resolve / wait_for), not the whole event.
+    """
+
+    def __init__(self, date_tolerance_days: int = 2):
+        self.matcher = TeamMatcher()
+        self.date_tolerance_days = date_tolerance_days
+        self.matches = 0
+        # (pair, map key) -> VOD info; pair -> its map keys
+        self.entries: Dict[Tuple[TeamPair, str], Dict[str, Any]] = {}
+        self._pair_maps: Dict[TeamPair, List[str]] = {}
+        self.schedule: List[Tuple[TeamPair, Optional[date]]] = []
+        self._pairs: Dict[TeamPair, asyncio.Event] = {}
+        self._scheduled = asyncio.Event()
+        self._finished = asyncio.Event()
+
+    def pair(self, team_a: str, team_b: str) -> TeamPair:
+        """Pair key for two VLR names, indexing them if new."""
+        return tuple(sorted([self.matcher.add(team_a), self.matcher.add(team_b)]))
+
+    def _pair_event(self, pair: TeamPair) -> asyncio.Event:
+        event = self._pairs.get(pair)
+        if event is None:
+            event = self._pairs[pair] = asyncio.Event()
+        return event
+
+    def set_schedule(self, matches: List[Dict[str, Any]]):
+        """Index the team names and dates from fetch_event_matches()."""
+        for m in matches:
+            if m.get("team_a") and m.get("team_b"):
+                self.schedule.append((self.pair(m["team_a"], m["team_b"]), parse_vlr_date(m.get("date", ""))))
+        self._scheduled.set()
+
+    def add(self, result: Dict[str, Any]):
+        """Merge one fetch_match_vods() result and wake anyone waiting on its teams."""
+        pair = self.pair(result["team_a"], result["team_b"])
+        maps = self._pair_maps.setdefault(pair, [])
+        for m in result["maps"]:
+            key = map_key(m["map_name"])
+            self.entries[(pair, key)] = {
+                "youtube_video_id": m["youtube_video_id"],
+                "start_seconds": m["start_seconds"],
+            }
+            if key not in maps:
+                maps.append(key)
+        self.matches += 1
+        self._pair_event(pair).set()
+
+    def finish(self):
+        """No more results are coming; release every waiter."""
+        self._scheduled.set()
+        self._finished.set()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    def resolve_pair(self, team_a: str, team_b: str, when: Optional[date] = None) -> Optional[TeamPair]:
+        """The VLR pair for two rib.gg team names, or None."""
+        a, b = self.matcher.resolve(team_a), self.matcher.resolve(team_b)
+        if a and b and a != b:
+            return tuple(sorted([a, b]))
+        known = a or b
+        if when is None or known is None:
+            # A date alone would pick whichever match happened that day
+            return None
+        # Date proximity: the nearest scheduled match involving whichever team did resolve
+        nearby = sorted(
+            (abs((day - when).days), pair) for pair, day in self.schedule
+            if day and known in pair and abs((day - when).days) <= self.date_tolerance_days
+        )
+        if not nearby or (len(nearby) > 1 and nearby[0][0] == nearby[1][0] and nearby[0][1] != nearby[1][1]):
+            return None
+        return nearby[0][1]
+
+    def vod(self, pair: TeamPair, map_name: str) -> Optional[Dict[str, Any]]:
+        key = map_key(map_name)
+        info = self.entries.get((pair, key))
+        if info is None:
+            close = difflib.get_close_matches(key, self._pair_maps.get(pair, ()), n=1, cutoff=0.8)
+            info = self.entries.get((pair, close[0])) if close else None
+        return info
+
+    async def resolve(self, team_a: str, team_b: str, when: Optional[date], timeout: float) -> Optional[TeamPair]:
+        """resolve_pair() once the schedule is known, then wait (up to timeout overall) for that pair's VODs."""
+        deadline = time.monotonic() + timeout
+        await self._wait([self._scheduled], timeout)
+        pair = self.resolve_pair(team_a, team_b, when)
+        if pair is None:
+            # Match pages can introduce names the schedule didn't have
+            await self._wait([self._finished], deadline - time.monotonic())
+            pair = self.resolve_pair(team_a, team_b, when)
+            if pair is None:
+                return None
+        await self.wait_for(pair, deadline - time.monotonic())
+        return pair
+
+    async def wait_for(self, pair: TeamPair, timeout: float) -> bool:
+        """Wait until the pair's match has resolved, the event is exhausted, or timeout. True if it resolved."""
+        event = self._pair_event(pair)
+        if not event.is_set():
+            await self._wait([event, self._finished], timeout)
+        return event.is_set()
+
+    async def _wait(self, events: List[asyncio.Event], timeout: float):
+        if any(event.is_set() for event in events) or timeout <= 0:
+            return
+        waiters = [asyncio.ensure_future(event.wait()) for event in events]
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
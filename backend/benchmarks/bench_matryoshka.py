@@ -0,0 +1,73 @@
+"""Micro-benchmark: single-stage vs Matryoshka two-stage search on the local index.
+
+Gemini embeddings front-load information into their leading dimensions, so
+the synthetic corpus uses clustered vectors whose per-dimension variance
+decays with the index. For each prefix length the script reports recall@k
+against exact full-dimension search and the mean query latency.
+
+    uv run python -m benchmarks.bench_matryoshka
+"""
+import time
+
+import numpy as np
+
+from app.core.vector_index import VectorIndex
+
+DIMS = 768
+ROUNDS = 50_000
+QUERIES = 200
+K = 10
+
+
+def build_corpus(n: int, dims: int, clusters: int = 400, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    scale = 1.0 / np.sqrt(1.0 + np.arange(dims) / 32.0)
+    centers = rng.normal(size=(clusters, dims)) * scale
+    assignment = rng.integers(0, clusters, size=n)
+    vectors = centers[assignment] + 1.0 * rng.normal(size=(n, dims)) * scale
+    queries = vectors[rng.integers(0, n, size=QUERIES)] + 0.8 * rng.normal(size=(QUERIES, dims)) * scale
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def build_index(vectors, prefix_dims: int, coarse_candidates: int) -> VectorIndex:
+    index = VectorIndex(DIMS, prefix_dims=prefix_dims, coarse_candidates=coarse_candidates,
+                        initial_capacity=len(vectors))
+    ids = [str(i) for i in range(len(vectors))]
+    records = [{"map_name": "Ascent"} for _ in ids]
+    index.upsert(ids, vectors, records)
+    return index
+
+
+def run(index: VectorIndex, queries, two_stage: bool):
+    results = []
+    start = time.perf_counter()
+    for q in queries:
+        results.append([h["external_id"] for h in index.search(q, k=K, two_stage=two_stage)])
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def recall(results, truth) -> float:
+    return float(np.mean([len(set(r) & set(t)) / K for r, t in zip(results, truth)]))
+
+
+def main():
+    vectors, queries = build_corpus(ROUNDS, DIMS)
+    print(f"corpus: {ROUNDS} x {DIMS}, {QUERIES} queries, k={K}")
+
+    baseline = build_index(vectors, prefix_dims=0, coarse_candidates=0)
+    truth, exact_latency = run(baseline, queries, two_stage=False)
+    print(f"single-stage {DIMS:>4}d:                  recall@{K} 1.000  {exact_latency * 1000:7.2f} ms/query")
+
+    for prefix_dims in (64, 128, 256):
+        for candidates in (100, 200, 500):
+            index = build_index(vectors, prefix_dims, candidates)
+            results, latency = run(index, queries, two_stage=True)
+            print(
+                f"two-stage {prefix_dims:>4}d -> {DIMS}d, {candidates:>3} cand: "
+                f"recall@{K} {recall(results, truth):.3f}  {latency * 1000:7.2f} ms/query  "
+                f"({exact_latency / latency:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Micro-benchmark: __NEXT_DATA__ extraction, full BeautifulSoup parse vs raw scan.
+
+Builds a synthetic rib.gg-sized series page (large JSON payload plus a
+realistically noisy DOM) and times both extractors.
+
+    uv run python -m benchmarks.bench_next_data
+"""
+import json
+import random
+import time
+
+from app.services.html_parsing import find_series_ids, parse_next_data, parse_next_data_slow
+
+
+def build_page(maps: int = 5, rounds_per_map: int = 24, kills_per_round: int = 15, dom_rows: int = 15000) -> str:
+    rng = random.Random(7)
+    kills, matches = [], []
+    for m in range(maps):
+        rounds = []
+        for r in range(1, rounds_per_map + 1):
+            round_id = m * 100 + r
+            rounds.append({"id": round_id, "number": r, "winningTeamNumber": rng.choice([1, 2]),
+                           "winCondition": "kill", "ceremony": "default"})
+            for k in range(kills_per_round):
+                kills.append({"roundId": round_id, "gameTimeMillis": r * 100000 + k * 1000,
+                              "roundTimeMillis": k * 1000, "killerId": rng.randint(1, 10),
+                              "victimId": rng.randint(1, 10), "weapon": "Vandal",
+                              "position": {"x": rng.random(), "y": rng.random()}})
+        matches.append({"id": m, "completed": True, "map": {"name": "Ascent"}, "rounds": rounds})
+    payload = {"props": {"pageProps": {"series": {
+        "team1": {"name": "Paper Rex"}, "team2": {"name": "Sentinels"},
+        "stats": {"kills": kills}, "matches": matches}}}}
+
+    rows = "".join(
+        f'<div class="row"><a href="/series/team-a-vs-team-b-{90000 + i}">Match {i}</a>'
+        f'<span class="score">{i % 13}</span></div>'
+        for i in range(dom_rows)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Series</title></head><body>"
+        f"<div id=\"__next\">{rows}</div>"
+        f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(payload)}</script>'
+        "</body></html>"
+    )
+
+
+def bench(fn, html: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    html = build_page()
+    assert parse_next_data(html) == parse_next_data_slow(html)
+    print(f"page size: {len(html) / 1e6:.2f} MB")
+
+    slow = bench(parse_next_data_slow, html, repeat=3)
+    fast = bench(parse_next_data, html, repeat=10)
+    links = bench(find_series_ids, html, repeat=10)
+    print(f"BeautifulSoup parse + json.loads: {slow * 1000:8.1f} ms")
+    print(f"raw scan + json.loads:           {fast * 1000:8.1f} ms  ({slow / fast:.1f}x faster)")
+    print(f"series link scan (no DOM):       {links * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Micro-benchmark: float32 vs int8 vs PQ snapshot storage for the local index.
+
+Builds the same synthetic corpus as bench_matryoshka, writes a snapshot for
+each quantization mode, reloads it (memory-mapped) and reports recall@k
+against exact search, query latency, load time and bytes held for scanning.
+
+    uv run python -m benchmarks.bench_quantization
+"""
+import tempfile
+import time
+
+from app.core.vector_index import VectorIndex
+from benchmarks.bench_matryoshka import DIMS, K, ROUNDS, build_corpus, recall
+
+
+def run(index: VectorIndex, queries, rerank: bool):
+    results = []
+    start = time.perf_counter()
+    for q in queries:
+        results.append([h["external_id"] for h in index.search(q, k=K, rerank=rerank)])
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    vectors, queries = build_corpus(ROUNDS, DIMS)
+    ids = [str(i) for i in range(ROUNDS)]
+    records = [{"map_name": "Ascent"} for _ in ids]
+    print(f"corpus: {ROUNDS} x {DIMS}, {len(queries)} queries, k={K}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        truth = None
+        for mode in ("none", "int8", "pq"):
+            index = VectorIndex(DIMS, quantization=mode, coarse_candidates=200, initial_capacity=ROUNDS)
+            index.upsert(ids, vectors, records)
+            start = time.perf_counter()
+            index.save(f"{tmp}/{mode}")
+            save_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            index = VectorIndex.load(f"{tmp}/{mode}", DIMS, quantization=mode, coarse_candidates=200)
+            load_time = time.perf_counter() - start
+            stats = index.memory_stats()
+            scan_bytes = stats["code_bytes"] or stats["float_bytes_mapped"]
+
+            for rerank in ((True, False) if mode != "none" else (True,)):
+                results, latency = run(index, queries, rerank)
+                if truth is None:
+                    truth = results
+                label = f"{mode:>4}{' + rerank' if rerank and mode != 'none' else '':<9}"
+                print(
+                    f"{label} recall@{K} {recall(results, truth):.3f}  {latency * 1000:6.2f} ms/query  "
+                    f"scan {scan_bytes / 1e6:7.1f} MB  save {save_time:5.2f} s  load {load_time * 1000:6.1f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Micro-benchmark: Analyze aggregates over a season in the columnar round store.
+
+Fills a store with a synthetic season (events x series x maps of processed
+rounds), then times typical tendency queries against a plain Python pass
+over the same round dicts.
+
+    uv run python -m benchmarks.bench_round_store
+"""
+import random
+import tempfile
+import time
+from collections import Counter
+
+from app.core.round_store import RoundStore
+
+EVENTS = 30
+SERIES_PER_EVENT = 40
+MAPS = ("Ascent", "Bind", "Haven", "Lotus", "Sunset", "Split", "Icebox")
+TEAMS = [f"team{i}" for i in range(48)]
+CONDITIONS = ("kills", "bomb", "defuse", "time")
+TYPES = ("default", "thrifty", "flawless", "clutch", "ace")
+
+
+def build_season(seed: int = 3):
+    rng = random.Random(seed)
+    season, match_id = {}, 0
+    for e in range(EVENTS):
+        series = []
+        for _ in range(SERIES_PER_EVENT):
+            a, b = rng.sample(TEAMS, 2)
+            rounds = []
+            for _ in range(rng.choice((2, 3, 3, 5))):
+                match_id += 1
+                map_name = rng.choice(MAPS)
+                for n in range(1, rng.randint(19, 26)):
+                    winner = a if rng.random() < 0.55 else b
+                    rounds.append({
+                        "match_id": match_id, "round_id": match_id * 100 + n, "map_name": map_name,
+                        "round_num": n, "is_pistol": n in (1, 13), "winning_team": winner, "winner_slug": winner,
+                        "team_a": a, "team_a_slug": a, "team_b": b, "team_b_slug": b, "score_a": 0, "score_b": 0,
+                        "vod_url": None, "vod_timestamp": n * 110, "win_condition": rng.choice(CONDITIONS),
+                        "round_type": rng.choice(TYPES),
+                    })
+            series.append(rounds)
+        season[f"event-{e}"] = series
+    return season
+
+
+def python_pistol_win_rates(rounds):
+    played, won = Counter(), Counter()
+    for r in rounds:
+        if not r["is_pistol"]:
+            continue
+        for side in (r["team_a_slug"], r["team_b_slug"]):
+            played[(side, r["map_name"])] += 1
+            won[(side, r["map_name"])] += r["winner_slug"] == side
+    return {key: won[key] / played[key] for key in played}
+
+
+def best(fn, repeat: int = 20) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    season = build_season()
+    rounds = [r for series in season.values() for s in series for r in s]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RoundStore(tmp)
+        start = time.perf_counter()
+        for event, series in season.items():
+            for s in series:
+                store.write_series(event, s)
+        write = time.perf_counter() - start
+        start = time.perf_counter()
+        store = RoundStore(tmp)
+        load = time.perf_counter() - start
+        stats = store.stats()
+        print(f"season: {stats['rounds']} rounds in {stats['events']} events, "
+              f"{stats['column_bytes'] / 1e6:.1f} MB of columns (write {write:.2f} s, load {load * 1000:.1f} ms)")
+
+        expected = python_pistol_win_rates(rounds)
+        got = {(r["team"], r["map"]): r["win_rate"] for r in store.win_rates(by=("team", "map"), filters={"is_pistol": True})}
+        assert all(abs(got[key] - rate) < 1e-3 for key, rate in expected.items())
+
+        python = best(lambda: python_pistol_win_rates(rounds), repeat=5)
+        queries = {
+            "pistol win rate by team x map": lambda: store.win_rates(by=("team", "map"), filters={"is_pistol": True}),
+            "one team, win rate by map": lambda: store.win_rates(by=("map",), filters={"team": "team7"}),
+            "win_condition distribution": lambda: store.distribution("win_condition"),
+            "round_type by winner, one map": lambda: store.distribution("round_type", by=("winner",), filters={"map": "Bind"}),
+        }
+        print(f"{'python loop, pistol by team x map':<36} {python * 1000:8.2f} ms")
+        for label, query in queries.items():
+            print(f"{label:<36} {best(query) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
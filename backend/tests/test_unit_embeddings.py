@@ -0,0 +1,103 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+from google.genai import errors as genai_errors
+
+from app.core.embedding_cache import EmbeddingCache
+from app.core.embeddings import EmbeddingEngine, _is_retryable
+
+
+def _fake_embed_content(model, contents, config):
+    result = MagicMock()
+    result.embeddings = [MagicMock(values=[float(len(text)), 0.0]) for text in contents]
+    return result
+
+
+@patch("app.core.embeddings.genai.Client")
+def test_engine_batches_documents(mock_client_cls):
+    mock_client = MagicMock()
+    mock_client.models.embed_content.side_effect = _fake_embed_content
+    mock_client_cls.return_value = mock_client
+
+    engine = EmbeddingEngine(api_key="test", batch_size=10)
+    texts = [f"round {i}" for i in range(24)]
+    vectors = engine.embed_documents(texts)
+
+    assert len(vectors) == 24
+    assert vectors[0] == [float(len("round 0")), 0.0]
+    # 24 rounds -> 3 requests of at most 10 documents
+    assert mock_client.models.embed_content.call_count == 3
+    assert engine.request_count == 3
+
+
+@patch("app.core.embeddings.genai.Client")
+def test_engine_respects_char_budget(mock_client_cls):
+    mock_client = MagicMock()
+    mock_client.models.embed_content.side_effect = _fake_embed_content
+    mock_client_cls.return_value = mock_client
+
+    engine = EmbeddingEngine(api_key="test", batch_size=100, max_batch_chars=25)
+    assert engine._plan_batches(["a" * 10] * 5) == [(0, 2), (2, 4), (4, 5)]
+
+
+@patch("app.core.embeddings.genai.Client")
+def test_engine_splits_oversized_batch(mock_client_cls):
+    def embed(model, contents, config):
+        if len(contents) > 2:
+            raise genai_errors.ClientError(400, {"error": {"message": "request too large"}})
+        return _fake_embed_content(model, contents, config)
+
+    mock_client = MagicMock()
+    mock_client.models.embed_content.side_effect = embed
+    mock_client_cls.return_value = mock_client
+
+    engine = EmbeddingEngine(api_key="test", batch_size=8)
+    vectors = engine.embed_documents(["x"] * 8)
+
+    assert all(v == [1.0, 0.0] for v in vectors)
+
+
+def test_only_transient_failures_are_retried():
+    assert _is_retryable(genai_errors.ServerError(503, {"error": {"message": "unavailable"}}))
+    assert _is_retryable(genai_errors.ClientError(429, {"error": {"message": "quota"}}))
+    assert _is_retryable(httpx.ConnectError("connection refused"))
+    assert _is_retryable(httpx.ReadTimeout("timed out"))
+    assert _is_retryable(asyncio.TimeoutError())
+    assert not _is_retryable(genai_errors.ClientError(403, {"error": {"message": "bad key"}}))
+    for bug in (ValueError("Expected 2 embeddings, got 1"), TypeError(), KeyError("values")):
+        assert not _is_retryable(bug)
+
+
+@patch("app.core.embeddings.genai.Client")
+def test_engine_serves_repeats_from_cache(mock_client_cls, tmp_path):
+    mock_client = MagicMock()
+    mock_client.models.embed_content.side_effect = _fake_embed_content
+    mock_client_cls.return_value = mock_client
+
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=100, memory_entries=2)
+    engine = EmbeddingEngine(api_key="test", cache=cache)
+
+    engine.embed_documents(["pistol round", "eco round", "pistol round"])
+    assert mock_client.models.embed_content.call_count == 1
+    assert mock_client.models.embed_content.call_args.kwargs["contents"] == ["pistol round", "eco round"]
+
+    # Same text with a different task type is a different key
+    engine.embed_query("pistol round")
+    assert mock_client.models.embed_content.call_count == 2
+
+    vectors = engine.embed_documents(["eco round", "pistol round"])
+    assert mock_client.models.embed_content.call_count == 2
+    assert vectors == [[9.0, 0.0], [12.0, 0.0]]
+    assert cache.stats()["hits"] == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=10, memory_entries=1)
+    keys = [EmbeddingCache.make_key(f"round {i}", "m", "RETRIEVAL_DOCUMENT", 2) for i in range(12)]
+    for key in keys:
+        cache.put(key, [1.0, 2.0])
+
+    assert cache.stats()["disk_entries"] == 10
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[-1]) == [1.0, 2.0]
@@ -3,6 +3,7 @@ import pytest_asyncio
 from unittest.mock import MagicMock, AsyncMock, patch
 from app.services.discovery import DiscoveryService
 from app.services.ingestion import IngestionService
+from app.services.ingest_manifest import IngestManifest
 from app.services.processor import MatchDataProcessor
 
 # --- MatchDataProcessor Tests ---
@@ -19,6 +20,7 @@ def test_processor_get_vod_start_time():
 
 def test_processor_process_series_data_empty():
     assert MatchDataProcessor.process_series_data({}) == []
+    assert MatchDataProcessor.process_series_data({}, columnar=True)["round_id"] == []
     assert MatchDataProcessor.process_series_data({"props": {"pageProps": {"series": None}}}) == []
 
 def test_processor_process_series_data_valid():
@@ -84,6 +86,22 @@ def test_processor_process_series_data_valid():
     # VOD Start = 100s
     # Expected = 195s
     assert r2["vod_timestamp"] == 195 
+    assert r2["vod_url"] == "https://youtu.be/video?t=195s"
+    assert r2["team_b_slug"] == "teamb" and r2["score_a"] == 1
+
+    # The columnar batch carries the same rounds, field by field
+    columns = MatchDataProcessor.process_series_data(mock_series_data, columnar=True)
+    assert columns["round_num"] == [1, 2]
+    assert columns["winner_slug"] == ["teama", "teamb"]
+    assert list(MatchDataProcessor.iter_rounds(columns)) == rounds
+
+    # Ingestion reads the columns directly and builds the same batch
+    with patch("app.services.ingestion.get_chroma_service"):
+        service = IngestionService()
+    from_rows, from_columns = service.prepare_batch(rounds), service.prepare_batch(columns)
+    for key in ("ids", "documents", "metadatas", "supabase_rounds", "match_id_rib"):
+        assert from_columns[key] == from_rows[key]
+    assert from_columns["series_rounds"] is columns
 
 
 # --- IngestionService Tests ---
@@ -116,6 +134,95 @@ def test_ingest_batch(mock_get_chroma):
     assert len(call_args.kwargs["documents"]) == 2
 
 
+@patch("app.services.ingestion.get_supabase")
+@patch("app.services.ingestion.get_chroma_service")
+def test_write_batches_bulk_upserts_matches_and_chunks_rounds(mock_get_chroma, mock_get_supabase):
+    mock_collection = MagicMock()
+    mock_get_chroma.return_value.get_collection.return_value = mock_collection
+
+    supabase = MagicMock()
+    matches_table, rounds_table = MagicMock(), MagicMock()
+    supabase.table.side_effect = lambda name: matches_table if name == "matches" else rounds_table
+    # Returned in a different order than requested; mapping must go by external_id
+    matches_table.upsert.return_value.execute.return_value.data = [
+        {"external_id": str(mid), "id": f"uuid-{mid}"} for mid in (3, 2, 1)
+    ]
+    mock_get_supabase.return_value = supabase
+
+    service = IngestionService()
+    service.settings = service.settings.model_copy(update={"SUPABASE_UPSERT_CHUNK_SIZE": 4, "CHROMA_UPSERT_BATCH_SIZE": 5})
+    series = [
+        [{"round_num": r, "map_name": "Ascent", "winning_team": "A", "match_id": mid} for r in range(1, 4)]
+        for mid in (1, 2, 3)
+    ]
+
+    ids = service.ingest_many(series, {"event_id": "evt"})
+
+    assert len(ids) == 9
+    matches_table.upsert.assert_called_once()
+    assert len(matches_table.upsert.call_args.args[0]) == 3
+    # 9 rounds in chunks of 4 -> 3 round writes; 9 Chroma docs in batches of 5 -> 2 upserts
+    assert rounds_table.upsert.call_count == 3
+    assert mock_collection.upsert.call_count == 2
+    written = [rec for call in rounds_table.upsert.call_args_list for rec in call.args[0]]
+    assert {(rec["match_id_rib"], rec["match_id"]) for rec in written} == {("1", "uuid-1"), ("2", "uuid-2"), ("3", "uuid-3")}
+
+
+
+@patch("app.services.ingestion.get_chroma_service")
+def test_embedding_prefix_is_written_even_when_two_stage_search_is_off(mock_get_chroma):
+    service = IngestionService()
+    service.settings = service.settings.model_copy(update={"SUPABASE_PREFIX_SEARCH": False, "EMBEDDING_PREFIX_DIMENSIONS": 2})
+    batch = service.prepare_batch([{"round_num": 1, "map_name": "Ascent", "winning_team": "A", "match_id": 1}])
+    service._attach_embeddings(batch, [[3.0, 4.0, 12.0]])
+
+    assert batch["supabase_rounds"][0]["embedding_prefix"] == [0.6, 0.8]
+    # Changing the prefix width re-embeds (and rewrites) every round
+    version = service.manifest_version()
+    service.settings = service.settings.model_copy(update={"EMBEDDING_PREFIX_DIMENSIONS": 4})
+    assert service.manifest_version() != version
+
+
+@patch("app.services.ingestion.get_ingest_manifest")
+@patch("app.services.ingestion.get_supabase", return_value=None)
+@patch("app.services.ingestion.get_chroma_service")
+def test_plan_series_skips_unchanged_and_deletes_stale(mock_get_chroma, _supabase, mock_get_manifest, tmp_path):
+    mock_collection = MagicMock()
+    mock_get_chroma.return_value.get_collection.return_value = mock_collection
+    mock_get_manifest.return_value = IngestManifest(str(tmp_path / "manifest.sqlite3"))
+    service = IngestionService()
+    service.vector_index = None
+
+    rounds = [{"round_id": r, "round_num": r, "map_name": "Ascent", "winning_team": "A", "match_id": 1} for r in (1, 2, 3)]
+    plan = service.plan_series("series-1", rounds)
+    assert len(plan["rounds"]) == 3 and plan["unchanged"] == 0
+    service.commit_series(plan)
+
+    # Same rounds again: nothing to embed
+    plan = service.plan_series("series-1", rounds)
+    assert plan["rounds"] == [] and plan["unchanged"] == 3 and plan["stale_ids"] == []
+
+    # Round 2 corrected, round 3 gone: only round 2 is rewritten, old 2 and 3 are deleted
+    old_ids = [service._generate_id(r) for r in rounds]
+    fresh = [rounds[0], dict(rounds[1], winning_team="B")]
+    plan = service.plan_series("series-1", fresh)
+    assert plan["rounds"] == [fresh[1]] and plan["unchanged"] == 1
+    assert sorted(plan["stale_ids"]) == sorted(old_ids[1:])
+    # A columnar batch plans the same rounds and stays columnar
+    columns = {field: [r[field] for r in fresh] for field in fresh[0]}
+    columnar_plan = service.plan_series("series-1", columns)
+    assert columnar_plan["rounds"] == {field: [fresh[1][field]] for field in fresh[0]}
+    assert columnar_plan["stale_ids"] == plan["stale_ids"] and columnar_plan["entries"] == plan["entries"]
+    service.commit_series(plan)
+    mock_collection.delete.assert_called_once()
+    assert sorted(mock_collection.delete.call_args.kwargs["ids"]) == sorted(old_ids[1:])
+
+    # A new embedding model invalidates every round
+    service.settings = service.settings.model_copy(update={"EMBEDDING_MODEL": "models/other"})
+    plan = service.plan_series("series-1", fresh)
+    assert len(plan["rounds"]) == 2 and plan["stale_ids"] == []
+
+
 # --- DiscoveryService Tests ---
 
 @pytest.mark.asyncio
@@ -190,3 +297,106 @@ async def test_discover_matches_jit():
         series_call = mock_scraper.fetch_page.call_args_list[1]
         assert "/series/999" in series_call[0][0]
 
+
+
+@pytest.mark.asyncio
+async def test_crawl_event_tree_dedupes_and_limits_depth():
+    events = {
+        "1": {"id": 1, "series": [{"id": 10}], "childEvents": [{"id": 2}, {"id": 3}]},
+        "2": {"id": 2, "series": [{"id": 20}, {"id": 10}], "childEvents": [{"id": 3}, {"id": 1}]},
+        "3": {"id": 3, "series": [{"id": 30}], "childEvents": [{"id": 4}]},
+        "4": {"id": 4, "series": [{"id": 40}], "childEvents": []},
+    }
+
+    with patch("app.services.discovery.get_scraper_service") as mock_get_scraper:
+        mock_scraper = MagicMock()
+        mock_get_scraper.return_value = mock_scraper
+        mock_scraper.fetch_page = AsyncMock(side_effect=lambda url, force_browser=False: f"<html>{url}</html>")
+        mock_scraper.extract_next_data.side_effect = lambda html: {
+            "props": {"pageProps": {"event": events[html[6:-7].split("/")[-1]]}}
+        }
+
+        service = DiscoveryService()
+        crawl = await service.crawl_event_tree("https://rib.gg/events/vct/1", max_depth=1)
+
+    # Event 3 is shared by 1 and 2, event 1 is a cycle, event 4 is past the depth limit
+    assert mock_scraper.fetch_page.call_count == 3
+    assert crawl["series_ids"] == ["10", "20", "30"]
+    assert crawl["series_urls"][0] == "https://rib.gg/series/10"
+    assert [child["id"] for child in crawl["tree"]["children"]] == ["2", "3"]
+    assert crawl["tree"]["children"][0]["children"] == []
+
+
+@pytest.mark.asyncio
+async def test_vod_enrichment_waits_only_for_its_team_pair():
+    import asyncio
+    from app.services import vlr_scraper
+
+    never = asyncio.Event()
+    pages = {
+        "https://www.vlr.gg/1/a": {"team_a": "Sentinels", "team_b": "LOUD",
+                                   "maps": [{"map_name": "Bind", "youtube_video_id": "abc", "start_seconds": 600}]},
+    }
+
+    async def fake_match_vods(url):
+        if url not in pages:
+            await never.wait()  # a slow page the series below doesn't need
+        return pages[url]
+
+    async def fake_event_matches(url):
+        return [
+            {"vlr_match_url": "https://www.vlr.gg/2/slow", "team_a": "FNATIC", "team_b": "DRX", "date": ""},
+            {"vlr_match_url": "https://www.vlr.gg/1/a", "team_a": "Sentinels", "team_b": "LOUD", "date": ""},
+        ]
+
+    with patch("app.services.discovery.get_scraper_service"), \
+         patch.object(vlr_scraper, "fetch_event_matches", fake_event_matches), \
+         patch.object(vlr_scraper, "fetch_match_vods", fake_match_vods):
+        service = DiscoveryService()
+        lookup = vlr_scraper.VodLookup()
+        task = asyncio.create_task(service._resolve_vlr_vods("https://www.vlr.gg/event/1", lookup))
+        pipeline = service._build_ingest_pipeline(MagicMock(), lookup)
+        enrich = next(stage for stage in pipeline._stages if stage.name == "enrich").fn
+
+        rounds = {"team_a": ["LOUD"], "team_b": ["Sentinels"], "map_name": ["Bind"], "vod_url": [None], "vod_timestamp": [30]}
+        item = await asyncio.wait_for(enrich({"rounds": rounds}), timeout=2)
+
+        assert item["rounds"]["vod_url"] == ["https://www.youtube.com/watch?v=abc&t=630s"]
+        assert not task.done() and not lookup.finished
+        # Unknown pairs stop waiting once the event is exhausted
+        assert await lookup.wait_for(("A", "B"), timeout=0.01) is False
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert lookup.finished
+
+
+@pytest.mark.asyncio
+async def test_failed_ingest_cancels_vlr_stream():
+    import asyncio
+    from app.services import vlr_scraper
+
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def fake_stream(url):
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield {}
+
+    async def failing_crawl(url):
+        await started.wait()
+        raise RuntimeError("rib.gg is down")
+
+    with patch("app.services.discovery.get_scraper_service"), \
+         patch("app.core.supabase.get_supabase", return_value=None), \
+         patch.object(vlr_scraper, "stream_event_vods", fake_stream):
+        service = DiscoveryService()
+        service.crawl_tournament = failing_crawl
+        with pytest.raises(RuntimeError):
+            await service.ingest_tournament("https://www.rib.gg/events/test/1", vlr_event_url="https://www.vlr.gg/event/1")
+
+    # The stream was cancelled and had finished unwinding by the time the ingest raised
+    assert cancelled.is_set()
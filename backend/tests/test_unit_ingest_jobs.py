@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from app.services.ingest_jobs import COMPLETED, FAILED, QUEUED, IngestJobQueue, IngestJobStore
+
+SERIES = [f"https://www.rib.gg/series/{n}" for n in range(5)]
+
+
+async def wait_for_status(store, job_id, status, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        job = store.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {store.get(job_id)['status']}")
+
+
+@pytest.mark.asyncio
+async def test_job_checkpoints_and_resumes_after_failure(tmp_path):
+    store = IngestJobStore(str(tmp_path / "jobs.sqlite3"))
+    attempts = []
+
+    async def runner(job, checkpoint):
+        checkpoint.set_total(len(SERIES))
+        todo = [url for url in SERIES if url not in checkpoint.completed()]
+        attempts.append(todo)
+        for n, url in enumerate(todo):
+            if len(attempts) == 1 and n == 2:
+                raise RuntimeError("scraper blew up")
+            checkpoint.series_done(url, 10)
+        return {"stages": []}
+
+    queue = IngestJobQueue(store, workers=2, poll_interval=0.05, runner=runner)
+    await queue.start()
+    try:
+        job = queue.submit("https://www.rib.gg/events/test")
+        failed = await wait_for_status(store, job["id"], FAILED)
+        assert failed["completed_series"] == 2 and failed["progress"] == 0.4
+        assert "blew up" in failed["error"]
+
+        assert queue.retry(job["id"])
+        done = await wait_for_status(store, job["id"], COMPLETED)
+    finally:
+        await queue.stop()
+
+    # The second attempt only saw the series the first one had not finished
+    assert attempts[1] == SERIES[2:]
+    assert done["completed_series"] == 5 and done["rounds"] == 50 and done["attempts"] == 2
+    assert done["pipeline_stats"] == {"stages": []}
+
+
+@pytest.mark.asyncio
+async def test_run_with_dropped_series_fails_and_retries_them(tmp_path):
+    store = IngestJobStore(str(tmp_path / "jobs.sqlite3"))
+    attempts = []
+
+    async def runner(job, checkpoint):
+        # Like a pipeline stage error: the run returns normally but two series never finish
+        checkpoint.set_total(len(SERIES))
+        todo = [url for url in SERIES if url not in checkpoint.completed()]
+        attempts.append(todo)
+        for url in todo:
+            if len(attempts) == 1 and url in SERIES[1:3]:
+                continue
+            checkpoint.series_done(url, 10)
+        return {"stages": [{"stage": "process", "errors": 2 if len(attempts) == 1 else 0}]}
+
+    queue = IngestJobQueue(store, workers=1, poll_interval=0.05, runner=runner)
+    await queue.start()
+    try:
+        job = queue.submit("https://www.rib.gg/events/test")
+        failed = await wait_for_status(store, job["id"], FAILED)
+        assert failed["completed_series"] == 3
+        assert failed["error"] == "2 of 5 series were not ingested"
+        assert failed["pipeline_stats"]["stages"][0]["errors"] == 2
+
+        assert queue.retry(job["id"])
+        done = await wait_for_status(store, job["id"], COMPLETED)
+    finally:
+        await queue.stop()
+
+    assert attempts[1] == SERIES[1:3]
+    assert done["completed_series"] == 5 and done["error"] is None
+
+
+@pytest.mark.asyncio
+async def test_running_jobs_are_requeued_on_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = IngestJobStore(path)
+    job = store.create("https://www.rib.gg/events/test")
+    store.claim_next()
+    store.record_series(job["id"], SERIES[0], 12)
+    store.close()
+
+    # A new process opens the same store
+    store = IngestJobStore(path)
+    seen = []
+
+    async def runner(job, checkpoint):
+        seen.append(checkpoint.completed())
+
+    queue = IngestJobQueue(store, workers=1, poll_interval=0.05, runner=runner)
+    assert store.get(job["id"])["status"] != QUEUED
+    await queue.start()
+    try:
+        await wait_for_status(store, job["id"], COMPLETED)
+    finally:
+        await queue.stop()
+    assert seen == [{SERIES[0]}]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_starts_requeue_once_and_start_one_set_of_workers(tmp_path):
+    store = IngestJobStore(str(tmp_path / "jobs.sqlite3"))
+    requeue = store.requeue
+    requeues = []
+
+    def counting_requeue(job_id=None):
+        requeues.append(job_id)
+        return requeue(job_id)
+
+    store.requeue = counting_requeue
+
+    async def runner(job, checkpoint):
+        return {"stages": []}
+
+    queue = IngestJobQueue(store, workers=2, poll_interval=0.05, runner=runner)
+    await asyncio.gather(queue.start(), queue.start(), queue.start())
+    try:
+        assert queue.stats()["workers"] == 2
+        assert requeues == [None]
+        # A restart within the same process doesn't requeue jobs its own workers claimed
+        await queue.stop()
+        await queue.start()
+        assert requeues == [None]
+    finally:
+        await queue.stop()
@@ -0,0 +1,57 @@
+from app.services.intent import IntentParser, normalize_query
+
+
+def test_parser_resolves_aliases_maps_and_round_types():
+    parser = IntentParser()
+
+    intent = parser.parse("PRX pistol rounds on Lotus")
+    assert (intent["team_slug"], intent["map"], intent["round_type"]) == ("paperrex", "lotus", "pistol")
+    assert intent["confidence"] == 1.0
+
+    intent = parser.parse("Paper Rex thrifties, Haven")
+    assert (intent["team_slug"], intent["map"], intent["round_type"]) == ("paperrex", "haven", "thrifty")
+
+
+def test_parser_matches_whole_tokens_only():
+    parser = IntentParser()
+
+    # "th" (Team Heretics) and "sen" must not fire inside other words
+    intent = parser.parse("the present clutch")
+    assert intent["team_slug"] is None
+    assert intent["round_type"] == "clutch"
+
+
+def test_parser_fuzzy_matches_and_lowers_confidence():
+    parser = IntentParser()
+
+    intent = parser.parse("sentinals flawless on brezee")
+    assert intent["team_slug"] == "sentinels"
+    assert intent["map"] == "breeze"
+    assert 0.5 < intent["confidence"] < 1.0
+
+    unknown = parser.parse("aspas operator retakes")
+    assert unknown["confidence"] == 0.0
+
+
+def test_parser_does_not_fuzzy_match_short_names():
+    parser = IntentParser()
+
+    # Ordinary words a letter away from short map and team names
+    for query, field in (("blind spots", "map"), ("heaven sent", "map"), ("cloud peeks", "team_slug")):
+        intent = parser.parse(query)
+        assert intent[field] is None, query
+        assert intent["confidence"] < 1.0
+
+    # Short names still resolve exactly
+    assert parser.parse("loud on bind")["team_slug"] == "loud"
+
+
+def test_parser_caches_per_normalized_query():
+    parser = IntentParser(cache_size=2)
+    assert normalize_query("  PRX,   Lotus!! ") == "prx lotus"
+
+    first = parser.parse("PRX Lotus")
+    assert parser.parse("prx   lotus") == first
+
+    parser.remember_resolution("drx ascent", {"team_slug": "drx", "map": "ascent", "round_type": None})
+    assert parser.cached_resolution("DRX Ascent")["team_slug"] == "drx"
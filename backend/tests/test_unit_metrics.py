@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.metrics import (
+    MetricsRegistry, end_request_timings, get_metrics, server_timing_header, span, start_request_timings,
+)
+from app.services.ingest_jobs import COMPLETED, IngestJobQueue, IngestJobStore
+
+
+def test_histogram_quantiles_and_prometheus_text():
+    registry = MetricsRegistry()
+    for ms in range(1, 101):
+        registry.observe("embed_query", ms / 1000)
+    registry.observe("supabase_rpc", 0.2, error=True)
+
+    summary = registry.stage_summary()["embed_query"]
+    assert summary["count"] == 100
+    assert (summary["p50"], summary["p95"], summary["p99"]) == (0.051, 0.096, 0.1)
+
+    text = registry.render()
+    assert '# TYPE retake_stage_duration_seconds histogram' in text
+    assert 'retake_stage_duration_seconds_bucket{stage="embed_query",le="0.05"} 50' in text
+    assert 'retake_stage_duration_seconds_bucket{stage="embed_query",le="+Inf"} 100' in text
+    assert 'retake_stage_latency_seconds{stage="embed_query",quantile="0.95"} 0.096000' in text
+    assert 'retake_stage_errors_total{stage="supabase_rpc"} 1' in text
+
+
+def test_span_records_failures_and_server_timing_header():
+    before = get_metrics().stage_summary().get("test_stage", {"count": 0, "errors": 0})
+    with pytest.raises(ValueError):
+        with span("test_stage"):
+            raise ValueError("boom")
+    after = get_metrics().stage_summary()["test_stage"]
+    assert (after["count"], after["errors"]) == (before["count"] + 1, before["errors"] + 1)
+
+    header = server_timing_header([("embed", 0.01), ("embed", 0.02), ("rpc", 0.005)], 0.05)
+    assert header == 'embed;dur=30.0;desc="x2", rpc;dur=5.0, total;dur=50.0'
+
+
+def test_requests_get_timing_headers_and_show_up_in_metrics():
+    from app.main import app
+
+    client = TestClient(app)
+    response = client.get("/health")
+    assert response.headers["Server-Timing"].startswith("total;dur=")
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'retake_http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in metrics.text
+
+
+@pytest.mark.asyncio
+async def test_workers_started_during_a_request_do_not_record_into_it(tmp_path):
+    store = IngestJobStore(str(tmp_path / "jobs.sqlite3"))
+
+    async def runner(job, checkpoint):
+        with span("job_stage"):
+            await asyncio.sleep(0)
+
+    timings, token = start_request_timings()
+    try:
+        # Like /admin/ingest-event starting the queue on first use
+        with span("request_stage"):
+            queue = IngestJobQueue(store, workers=1, poll_interval=0.05, runner=runner)
+            await queue.start()
+            job = queue.submit("https://www.rib.gg/events/test")
+        for _ in range(200):
+            if store.get(job["id"])["status"] == COMPLETED:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+    finally:
+        end_request_timings(token)
+
+    assert store.get(job["id"])["status"] == COMPLETED
+    assert [stage for stage, _ in timings] == ["request_stage"]
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.services.pipeline import Pipeline
+
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_all_stages_and_counts():
+    async def double(x):
+        return x * 2
+
+    async def drop_odd_source(x):
+        if x == 6:
+            raise ValueError("boom")
+        return None if x % 4 else x
+
+    pipeline = Pipeline("test", queue_size=2)
+    pipeline.add_stage("double", double, concurrency=3)
+    pipeline.add_stage("filter", drop_odd_source, concurrency=2)
+
+    results = await pipeline.run(range(6))
+
+    assert sorted(results) == [0, 4, 8]
+    stats = {s["stage"]: s for s in pipeline.stats()["stages"]}
+    assert stats["double"]["items_out"] == 6
+    assert stats["filter"]["items_in"] == 6
+    assert stats["filter"]["errors"] == 1
+    assert stats["filter"]["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_overlaps_stages():
+    active = {"fetch": 0, "write": 0}
+    overlap = {"seen": False}
+
+    async def fetch(x):
+        active["fetch"] += 1
+        await asyncio.sleep(0.01)
+        active["fetch"] -= 1
+        return x
+
+    async def write(x):
+        active["write"] += 1
+        if active["fetch"]:
+            overlap["seen"] = True
+        await asyncio.sleep(0.01)
+        active["write"] -= 1
+        return x
+
+    pipeline = Pipeline("overlap")
+    pipeline.add_stage("fetch", fetch, concurrency=2)
+    pipeline.add_stage("write", write, concurrency=1)
+
+    results = await pipeline.run(range(8))
+
+    assert sorted(results) == list(range(8))
+    assert overlap["seen"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batched_stage_groups_items():
+    seen_batches = []
+
+    async def passthrough(x):
+        return x
+
+    async def write_many(items):
+        seen_batches.append(list(items))
+        return [None if x == 3 else x for x in items]
+
+    pipeline = Pipeline("batched")
+    pipeline.add_stage("produce", passthrough, concurrency=2)
+    pipeline.add_stage("write", write_many, concurrency=1, batch_size=4, batch_wait=0.5)
+
+    results = await pipeline.run(range(10))
+
+    assert sorted(results) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert all(len(batch) <= 4 for batch in seen_batches)
+    assert len(seen_batches) < 10
+    stats = {s["stage"]: s for s in pipeline.stats()["stages"]}
+    assert stats["write"]["items_in"] == 10
+    assert stats["write"]["dropped"] == 1
@@ -0,0 +1,249 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.api.v1 import endpoints
+from app.api.v1.endpoints import QueryRequest, query_matches
+from app.core.query_cache import QueryCache
+
+
+def _rpc_row(external_id, similarity):
+    return {
+        "external_id": external_id, "summary": "doc", "team_a": "Paper Rex", "team_b": "DRX",
+        "score_a": 0, "score_b": 0, "map_name": "Lotus", "round_num": 1, "winning_team": "Paper Rex",
+        "round_type": "default", "vod_url": None, "vod_timestamp": 0, "similarity": similarity,
+    }
+
+
+@pytest.mark.asyncio
+async def test_query_runs_intent_and_embedding_concurrently():
+    events = []
+
+    async def generate_content(**kwargs):
+        events.append("intent-start")
+        await asyncio.sleep(0.05)
+        events.append("intent-end")
+        return MagicMock(text=json.dumps({"team_slug": "paperrex", "map": "lotus", "round_type": "pistol"}))
+
+    async def aembed_query(text):
+        events.append("embed-start")
+        await asyncio.sleep(0.05)
+        events.append("embed-end")
+        return [0.1, 0.2, 0.3]
+
+    client = MagicMock()
+    client.aio.models.generate_content = generate_content
+    engine = MagicMock()
+    engine.aembed_query = aembed_query
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value = MagicMock(data=[_rpc_row("b", 0.7), _rpc_row("a", 0.9)])
+
+    with patch.object(endpoints, "get_genai_client", return_value=client), \
+         patch.object(endpoints, "get_embedding_engine", return_value=engine), \
+         patch.object(endpoints, "get_supabase", return_value=supabase):
+        # Unknown words lower local confidence, so Gemini is consulted
+        response = await query_matches(QueryRequest(query_text="Paper Rex something odd pistol rounds on Lotus"))
+
+    assert events[:2] in (["intent-start", "embed-start"], ["embed-start", "intent-start"])
+    assert response["intent"] == {"team": "paperrex", "map": "lotus", "round_type": "pistol"}
+    assert [r["id"] for r in response["results"]] == ["a", "b"]
+
+    rpc_params = supabase.rpc.call_args[0][1]
+    assert rpc_params["filter_map_name"] == "Lotus"
+    assert rpc_params["filter_is_pistol"] is True
+    assert rpc_params["filter_round_type"] is None
+
+
+@pytest.mark.asyncio
+async def test_query_intent_timeout_does_not_block_search():
+    async def slow_generate(**kwargs):
+        await asyncio.sleep(5)
+
+    client = MagicMock()
+    client.aio.models.generate_content = slow_generate
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value = MagicMock(data=[_rpc_row("a", 0.8)])
+
+    async def aembed_query(text):
+        return [0.1]
+
+    engine = MagicMock()
+    engine.aembed_query = aembed_query
+
+    with patch.object(endpoints, "get_genai_client", return_value=client), \
+         patch.object(endpoints, "get_embedding_engine", return_value=engine), \
+         patch.object(endpoints, "get_supabase", return_value=supabase), \
+         patch.object(endpoints.settings, "QUERY_INTENT_TIMEOUT", 0.05):
+        response = await query_matches(QueryRequest(query_text="sen jett operator ascent"))
+
+    # The local parse survives the LLM timeout
+    assert response["intent"]["team"] == "sentinels"
+    assert response["intent"]["map"] == "ascent"
+    assert len(response["results"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_confident_local_intent_skips_llm():
+    client = MagicMock()
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value = MagicMock(data=[])
+
+    async def aembed_query(text):
+        return [0.1]
+
+    engine = MagicMock()
+    engine.aembed_query = aembed_query
+
+    with patch.object(endpoints, "get_genai_client", return_value=client), \
+         patch.object(endpoints, "get_embedding_engine", return_value=engine), \
+         patch.object(endpoints, "get_supabase", return_value=supabase), \
+         patch.object(endpoints.settings, "USE_CHROMA", False):
+        response = await query_matches(QueryRequest(query_text="PRX pistol rounds on Lotus"))
+
+    assert response["intent"] == {"team": "paperrex", "map": "lotus", "round_type": "pistol"}
+    client.aio.models.generate_content.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_is_cached_until_matching_rounds_land():
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value = MagicMock(data=[_rpc_row("a", 0.8)])
+    calls = {"embed": 0}
+
+    async def aembed_query(text):
+        calls["embed"] += 1
+        return [0.1]
+
+    engine = MagicMock()
+    engine.aembed_query = aembed_query
+    cache = QueryCache(max_entries=8, ttl=60)
+
+    with patch.object(endpoints, "get_genai_client", return_value=MagicMock()), \
+         patch.object(endpoints, "get_embedding_engine", return_value=engine), \
+         patch.object(endpoints, "get_supabase", return_value=supabase), \
+         patch.object(endpoints, "get_query_cache", return_value=cache):
+        first = await query_matches(QueryRequest(query_text="PRX pistol rounds on Lotus"))
+        # Normalized the way the intent parser reads it: case, whitespace and punctuation
+        second = await query_matches(QueryRequest(query_text="  prx PISTOL rounds, on lotus? "))
+        assert second == first and calls["embed"] == 1
+
+        # Rounds for another team, or the same team on another map, leave it cached
+        cache.invalidate_rounds([{"team_a_slug": "drx", "team_b_slug": "loud", "map_name": "Lotus"}])
+        cache.invalidate_rounds([{"team_a_slug": "paperrex", "team_b_slug": "drx", "map_name": "Bind"}])
+        await query_matches(QueryRequest(query_text="PRX pistol rounds on Lotus"))
+        assert calls["embed"] == 1
+
+        cache.invalidate_rounds([{"team_a_slug": "drx", "team_b_slug": "paperrex", "map_name": "Lotus"}])
+        await query_matches(QueryRequest(query_text="PRX pistol rounds on Lotus"))
+        assert calls["embed"] == 2
+        # A different n_results is a different entry
+        await query_matches(QueryRequest(query_text="PRX pistol rounds on Lotus", n_results=10))
+        assert calls["embed"] == 3
+
+    assert cache.stats()["hits"] == 2
+
+
+async def _read_stream(response):
+    return b"".join([chunk.encode() if isinstance(chunk, str) else chunk async for chunk in response.body_iterator]).decode()
+
+
+@pytest.mark.asyncio
+async def test_streamed_query_emits_intent_before_results():
+    released = asyncio.Event()
+
+    async def aembed_query(text):
+        await released.wait()
+        return [0.1]
+
+    engine = MagicMock()
+    engine.aembed_query = aembed_query
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value = MagicMock(data=[_rpc_row("b", 0.7), _rpc_row("a", 0.9)])
+
+    with patch.object(endpoints, "get_genai_client", return_value=None), \
+         patch.object(endpoints, "get_embedding_engine", return_value=engine), \
+         patch.object(endpoints, "get_supabase", return_value=supabase), \
+         patch.object(endpoints, "get_query_cache", return_value=None):
+        response = await query_matches(QueryRequest(query_text="PRX pistol rounds on Lotus", stream="ndjson"))
+        assert response.media_type == "application/x-ndjson"
+        body = response.body_iterator
+        # The intent is flushed while the embedding is still pending
+        first = json.loads(await asyncio.wait_for(body.__anext__(), timeout=1))
+        assert first == {"event": "intent", "intent": {"team": "paperrex", "map": "lotus", "round_type": "pistol"}}
+        released.set()
+        events = [json.loads(line) for line in (await _read_stream(response)).splitlines()]
+
+    assert [e["event"] for e in events] == ["results", "done"]
+    assert events[0]["source"] == "supabase"
+    assert [r["id"] for r in events[1]["results"]] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_streamed_url_ingest_reports_each_map_as_sse():
+    from app.api.v1.endpoints import UrlIngestRequest, ingest_from_url
+    from app.services.ingestion import IngestionService
+
+    rounds = [{"match_id": m, "map_name": name, "round_num": n} for m, name in ((1, "Bind"), (2, "Lotus")) for n in (1, 2)]
+    service = MagicMock()
+    service.prepare_batch.return_value = {"documents": ["d"] * 4}
+    service.embed_range.side_effect = lambda batch, start, end: end - start
+    service.write_batch.return_value = ["id"] * 4
+
+    with patch.object(endpoints, "DiscoveryService") as discovery, \
+         patch.object(endpoints, "IngestionService") as ingestion:
+        ingestion.return_value = service
+        ingestion.map_ranges = IngestionService.map_ranges
+        discovery.return_value.process_series = MagicMock(return_value=asyncio.sleep(0, rounds))
+        response = await ingest_from_url(UrlIngestRequest(url="https://rib.gg/series/1", stream="sse"))
+        body = await _read_stream(response)
+
+    frames = [frame.split("\n") for frame in body.strip().split("\n\n")]
+    names = [lines[0].removeprefix("event: ") for lines in frames]
+    assert names == ["started", "scraped", "map", "map", "batch", "done"]
+    maps = [json.loads(lines[1].removeprefix("data: ")) for lines in frames if lines[0] == "event: map"]
+    assert [(m["map_name"], m["rounds"]) for m in maps] == [("Bind", 2), ("Lotus", 2)]
+    assert json.loads(frames[-1][1].removeprefix("data: "))["ingested_ids"] == ["id"] * 4
+
+
+@pytest.mark.asyncio
+async def test_incomplete_local_index_is_not_searched():
+    index = MagicMock(complete=False)
+    index.__len__.return_value = 3
+    engine = MagicMock()
+    engine.aembed_query = MagicMock(return_value=asyncio.sleep(0, [0.1]))
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value = MagicMock(data=[_rpc_row("a", 0.8)])
+
+    with patch.object(endpoints, "get_genai_client", return_value=None), \
+         patch.object(endpoints, "get_embedding_engine", return_value=engine), \
+         patch.object(endpoints, "get_supabase", return_value=supabase), \
+         patch.object(endpoints, "get_query_cache", return_value=None), \
+         patch.object(endpoints, "get_vector_index", return_value=index):
+        response = await query_matches(QueryRequest(query_text="PRX pistol rounds on Lotus"))
+
+    index.search.assert_not_called()
+    assert [r["id"] for r in response["results"]] == ["a"]
+
+
+def test_filtered_two_stage_search_widens_the_candidate_scan():
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value = MagicMock(data=[_rpc_row("a", 0.8)])
+    settings = endpoints.settings.model_copy(update={
+        "SUPABASE_PREFIX_SEARCH": True, "EMBEDDING_PREFIX_DIMENSIONS": 4, "SEARCH_COARSE_CANDIDATES": 100,
+    })
+    query_vector = [0.1] * 8
+
+    with patch.object(endpoints, "settings", settings):
+        filtered = endpoints._search_supabase(supabase, query_vector, {"team_slug": "paperrex", "map": "lotus"})
+        name, params = supabase.rpc.call_args.args
+        endpoints._search_supabase(supabase, query_vector, {})
+        _, unfiltered_params = supabase.rpc.call_args.args
+
+    assert name == "match_rounds_two_stage"
+    assert (params["filter_team_slug"], params["filter_map_name"]) == ("paperrex", "Lotus")
+    assert len(params["query_prefix"]) == 4
+    # The RPC sizes hnsw.ef_search from candidate_count; filtered rows are dropped after the scan
+    assert params["candidate_count"] == 4 * unfiltered_params["candidate_count"] == 400
+    assert [r["id"] for r in filtered] == ["a"]
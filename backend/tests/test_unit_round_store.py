@@ -0,0 +1,91 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.core.round_store import UNASSIGNED_EVENT, RoundStore
+from app.services.ingestion import IngestionService
+from app.services.processor import MatchDataProcessor
+
+
+def make_round(match_id, round_num, winner, map_name="Ascent", win_condition="kills", round_type="default"):
+    teams = {"prx": "Paper Rex", "sen": "Sentinels"}
+    return {
+        "match_id": match_id, "round_id": match_id * 100 + round_num, "map_name": map_name,
+        "round_num": round_num, "is_pistol": round_num in (1, 13),
+        "winning_team": teams[winner], "winner_slug": winner,
+        "team_a": "Paper Rex", "team_a_slug": "prx", "team_b": "Sentinels", "team_b_slug": "sen",
+        "score_a": 0, "score_b": 0, "vod_url": None, "vod_timestamp": round_num * 100,
+        "win_condition": win_condition, "round_type": round_type,
+    }
+
+
+def brute_win_rate(rounds, team, **filters):
+    rows = [r for r in rounds if team in (r["team_a_slug"], r["team_b_slug"])
+            and all(r[k] == v for k, v in filters.items())]
+    return sum(r["winner_slug"] == team for r in rows), len(rows)
+
+
+def test_win_rates_and_distribution_match_brute_force(tmp_path):
+    store = RoundStore(str(tmp_path / "rounds"))
+    rounds_a = [make_round(1, n, "prx" if n % 3 else "sen", win_condition="bomb" if n % 4 == 0 else "kills")
+                for n in range(1, 25)]
+    rounds_b = [make_round(2, n, "sen" if n % 2 else "prx", map_name="Bind") for n in range(1, 20)]
+    store.write_series("champions", rounds_a)
+    store.write_series("masters", MatchDataProcessor.to_columns(rounds_b))
+
+    pistol = {(r["team"], r["map"]): r for r in store.win_rates(by=("team", "map"), filters={"is_pistol": True})}
+    everything = rounds_a + rounds_b
+    for team in ("prx", "sen"):
+        for map_name in ("Ascent", "Bind"):
+            wins, total = brute_win_rate(everything, team, map_name=map_name, is_pistol=True)
+            row = pistol[(team, map_name)]
+            assert (row["wins"], row["rounds"]) == (wins, total)
+
+    # Filters are case-insensitive on maps and restrict to the measured team
+    sen = store.win_rates(by=("event",), filters={"team": "sen", "map": "ascent"})
+    assert [(r["event"], r["wins"], r["rounds"]) for r in sen] == [("champions", 8, 24)]
+
+    dist = {r["win_condition"]: r for r in store.distribution("win_condition", events=["champions"])}
+    assert dist["bomb"]["rounds"] == 6 and dist["kills"]["rounds"] == 18
+    assert dist["bomb"]["share"] == 0.25
+
+    by_winner = store.distribution("win_condition", by=("winner",), filters={"map": "Ascent"})
+    assert sum(r["share"] for r in by_winner if r["winner"] == "prx") == pytest.approx(1.0)
+
+    assert store.win_rates(filters={"map": "Lotus"}) == []
+
+
+def test_rewriting_a_match_replaces_its_rows_and_persists(tmp_path):
+    path = str(tmp_path / "rounds")
+    store = RoundStore(path)
+    store.write_series("champions", [make_round(1, n, "prx") for n in range(1, 13)])
+    store.write_series("champions", [make_round(2, n, "sen") for n in range(1, 5)])
+    # Re-scrape of match 1 with fewer, corrected rounds
+    store.write_series("champions", [make_round(1, n, "sen") for n in range(1, 11)])
+
+    reloaded = RoundStore(path)
+    assert reloaded.stats()["rounds"] == 14
+    (sen,) = reloaded.win_rates(filters={"team": "sen"})
+    assert (sen["wins"], sen["rounds"]) == (14, 14)
+    assert reloaded.team_names["prx"] == "Paper Rex"
+
+
+@patch("app.services.ingestion.get_tendency_store", return_value=None)
+@patch("app.services.ingestion.get_vector_index", return_value=None)
+@patch("app.services.ingestion.get_ingest_manifest", return_value=None)
+@patch("app.services.ingestion.get_supabase", return_value=None)
+@patch("app.services.ingestion.get_chroma_service")
+def test_every_ingest_path_writes_the_round_store(_chroma, _supabase, _manifest, _index, _tendencies, tmp_path):
+    store = RoundStore(str(tmp_path / "rounds"))
+    with patch("app.services.ingestion.get_round_store", return_value=store):
+        service = IngestionService()
+
+    # Single series (/ingest/url, JIT discovery): no event, so the shared partition
+    service.ingest_batch([make_round(1, n, "prx") for n in range(1, 13)])
+    # Tournament pipeline: only round 12 changed, but the whole series is passed along
+    series = [make_round(2, n, "sen") for n in range(1, 13)]
+    batch = service.prepare_batch(series[-1:])
+    batch["series_rounds"] = series
+    service.write_batches([batch], {"event_id": None, "event_key": "champions"})
+
+    assert store.stats()["partitions"] == {UNASSIGNED_EVENT: 12, "champions": 12}
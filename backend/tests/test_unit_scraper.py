@@ -0,0 +1,293 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services.page_cache import PageCache, PageNotCachedError
+from app.services.scraper import ScraperService
+
+
+@pytest.fixture
+def scraper():
+    service = ScraperService()
+    limiter = service.limiter
+    service.limiter = service._new_limiter()
+    page_cache = service.page_cache
+    service.page_cache = None
+    yield service
+    service.page_cache = page_cache
+    service._client = None
+    service._client_loop = None
+    service.limiter = limiter
+
+
+def _install_transport(service, handler):
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), headers=service.headers)
+    service._client_loop = asyncio.get_running_loop()
+
+
+@pytest.mark.asyncio
+async def test_fetch_page_reuses_pooled_client(scraper):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, text=f"<html>{request.url.path}</html>")
+
+    _install_transport(scraper, handler)
+    client = scraper._client
+
+    pages = await asyncio.gather(*[scraper.fetch_page(f"https://rib.gg/series/{i}") for i in range(5)])
+
+    assert pages[3] == "<html>/series/3</html>"
+    assert scraper._get_client() is client
+    assert all(r.headers["User-Agent"] == scraper.headers["User-Agent"] for r in seen)
+    await scraper.shutdown()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_fetch_page_revalidates_stale_cache_entry(scraper, tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text="<html>series</html>", headers={"ETag": '"v1"'})
+
+    _install_transport(scraper, handler)
+    # Zero TTLs: every lookup is stale and must be revalidated
+    scraper.page_cache = PageCache(str(tmp_path), long_ttl=0, short_ttl=0, default_ttl=0)
+
+    first = await scraper.fetch_page("https://rib.gg/series/1")
+    second = await scraper.fetch_page("https://rib.gg/series/1")
+
+    assert first == second == "<html>series</html>"
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == '"v1"'
+    assert scraper.page_cache.revalidated == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_page_serves_fresh_and_offline_from_cache(scraper, tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, text="<html>fresh</html>")
+
+    _install_transport(scraper, handler)
+    scraper.page_cache = PageCache(str(tmp_path), long_ttl=3600, short_ttl=60, default_ttl=60)
+    await scraper.fetch_page("https://rib.gg/series/2")
+    assert await scraper.fetch_page("https://rib.gg/series/2") == "<html>fresh</html>"
+    assert len(calls) == 1
+
+    scraper.page_cache = PageCache(str(tmp_path), long_ttl=0, short_ttl=0, default_ttl=0, offline=True)
+    assert await scraper.fetch_page("https://rib.gg/series/2") == "<html>fresh</html>"
+    with pytest.raises(PageNotCachedError):
+        await scraper.fetch_page("https://rib.gg/series/3")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_page_backs_off_and_retries_on_429(scraper):
+    statuses = iter([429, 200])
+
+    def handler(request):
+        return httpx.Response(next(statuses), text="<html>ok</html>", headers={"Retry-After": "0"})
+
+    _install_transport(scraper, handler)
+
+    assert await scraper.fetch_page("https://rib.gg/series/4") == "<html>ok</html>"
+    (host,) = scraper.rate_stats()
+    assert host["host"] == "rib.gg" and host["throttled"] == 1
+    # Halved from the initial rate, then one success added back
+    assert host["rate_per_sec"] == scraper.settings.SCRAPER_RATE_INITIAL / 2 + 0.5
+
+
+@pytest.mark.asyncio
+async def test_403_sends_only_that_host_to_the_browser(scraper, monkeypatch):
+    browser_fetches = []
+
+    async def fake_playwright(url):
+        browser_fetches.append(url)
+        return "<html>browser</html>"
+
+    def handler(request):
+        if request.url.host == "www.vlr.gg":
+            return httpx.Response(403)
+        return httpx.Response(200, text="<html>plain</html>")
+
+    _install_transport(scraper, handler)
+    monkeypatch.setattr(scraper.browser_pool, "fetch", fake_playwright)
+
+    assert await scraper.fetch_page("https://www.vlr.gg/1") == "<html>browser</html>"
+    assert await scraper.fetch_page("https://www.vlr.gg/2") == "<html>browser</html>"
+    assert await scraper.fetch_page("https://rib.gg/series/5") == "<html>plain</html>"
+    assert browser_fetches == ["https://www.vlr.gg/1", "https://www.vlr.gg/2"]
+
+    # Once the cool-down lapses, plain HTTP is tried again
+    vlr = scraper.limiter.host("https://www.vlr.gg/3")
+    vlr.browser_until = 1.0
+    assert not vlr.use_browser()
+
+
+def test_limiter_aimd_window():
+    from app.services.rate_limiter import HostLimiter
+
+    host = HostLimiter("rib.gg", rate=4.0, concurrency=2, max_concurrency=3, increase=1.0, decrease_interval=0)
+    for _ in range(4):
+        host.record(200, 0.1)
+    assert (host.rate, host.concurrency) == (8.0, 3)
+    host.record(200, 10.0)  # slow response
+    assert (host.rate, host.concurrency) == (4.0, 1)
+    host.record(503, 0.1, retry_after=30)
+    assert host.rate == 2.0 and host.snapshot()["paused_for"] > 29
+
+    host.browser_required()
+    first = host.browser_until
+    host.browser_required()
+    assert host.browser_cooldown == 2 * host.base_browser_cooldown and host.browser_until > first
+
+
+def test_page_cache_ttl_policies(tmp_path):
+    cache = PageCache(str(tmp_path), long_ttl=1000, short_ttl=10, default_ttl=100)
+    live = {"props": {"pageProps": {"series": {"matches": [{"completed": True}, {"completed": False}]}}}}
+
+    assert cache.ttl_for("https://www.rib.gg/series/93764") == 1000
+    assert cache.ttl_for("https://www.rib.gg/series/93764", live) == 10
+    assert cache.ttl_for("https://www.vlr.gg/event/matches/2095") == 10
+    assert cache.ttl_for("https://example.com/") == 100
+
+
+def test_page_cache_evicts_least_recently_used_pages(tmp_path):
+    cache = PageCache(str(tmp_path), long_ttl=1000, short_ttl=10, default_ttl=100, max_bytes=5000)
+    urls = [f"https://www.rib.gg/series/{n}" for n in range(4)]
+    for url in urls[:3]:
+        cache.store(url, "x" * 1200)
+    # Reading series/0 makes series/1 the least recently used
+    assert cache.lookup(urls[0])["fresh"]
+    cache.store(urls[3], "x" * 1200)
+
+    assert cache.lookup(urls[1]) is None
+    assert all(cache.lookup(url) is not None for url in (urls[0], urls[2], urls[3]))
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 3 and stats["bytes"] <= 5000
+
+    # A new process sees the same entries and sizes
+    reopened = PageCache(str(tmp_path), long_ttl=1000, short_ttl=10, default_ttl=100, max_bytes=5000)
+    assert (reopened.stats()["entries"], reopened.stats()["bytes"]) == (3, stats["bytes"])
+
+
+class _FakePage:
+    def __init__(self):
+        self.url = None
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.url = url
+
+    async def wait_for_selector(self, selector, state=None, timeout=None):
+        return None
+
+    async def wait_for_load_state(self, state, timeout=None):
+        return None
+
+    async def content(self):
+        return f"<html>{self.url}</html>"
+
+
+class _FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def new_page(self):
+        return _FakePage()
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self, user_agent=None):
+        context = _FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        pass
+
+
+class _FakePlaywright:
+    def __init__(self):
+        self.launches = 0
+        self.chromium = self
+
+    async def launch(self, headless=True):
+        self.launches += 1
+        return _FakeBrowser()
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_browser_pool_reuses_and_recycles_contexts(monkeypatch):
+    from app.services import browser_pool
+
+    fake = _FakePlaywright()
+    monkeypatch.setattr(browser_pool, "async_playwright", lambda: fake)
+    pool = browser_pool.BrowserPool("ua", size=2, max_uses_per_context=3)
+
+    pages = await asyncio.gather(*[pool.fetch(f"https://rib.gg/series/{i}") for i in range(6)])
+
+    assert pages[5] == "<html>https://rib.gg/series/5</html>"
+    assert fake.launches == 1
+    # 6 fetches over 2 slots at 3 uses each -> 2 contexts, both retired
+    assert pool.contexts_created == 2
+    assert all(c.closed for c in pool._browsers[0].contexts)
+    await pool.close()
+
+
+def test_ready_selector_per_site():
+    from app.services.browser_pool import ready_selector_for
+
+    assert ready_selector_for("https://www.rib.gg/series/1") == "#__NEXT_DATA__"
+    assert ready_selector_for("https://www.vlr.gg/123/a-vs-b") == ".wf-card"
+    assert ready_selector_for("https://example.com") is None
+
+
+def test_fast_next_data_matches_full_parse():
+    from app.services.html_parsing import find_series_ids, parse_next_data, parse_next_data_slow
+
+    payload = {"props": {"pageProps": {"series": {"id": 1, "note": "a </b> tag"}}}}
+    html = (
+        '<html><body><a href="/series/prx-vs-sen-93764">x</a><a href="/events/1">e</a>'
+        "<script>var x = '__NEXT_DATA__';</script>"
+        f"<script id=\"__NEXT_DATA__\" type=\"application/json\">{json.dumps(payload)}</script></body></html>"
+    )
+
+    assert parse_next_data(html) == parse_next_data_slow(html) == payload
+    assert parse_next_data("<html>no data</html>") == {}
+    assert find_series_ids(html) == ["93764"]
+
+
+def test_extract_next_data_parses_each_page_once(scraper):
+    from app.services.html_parsing import get_parsed_documents
+
+    html = '<script id="__NEXT_DATA__">{"props": {}}</script>'
+    documents = get_parsed_documents()
+    misses = documents.misses
+
+    assert scraper.extract_next_data(html) is scraper.extract_next_data(html)
+    assert documents.misses == misses + 1
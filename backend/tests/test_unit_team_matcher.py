@@ -0,0 +1,59 @@
+from datetime import date
+
+from app.services.discovery import DiscoveryService
+from app.services.team_matcher import TeamMatcher, team_key
+from app.services.vlr_scraper import VodLookup, parse_vlr_date
+
+
+def test_team_matcher_exact_alias_and_fuzzy():
+    matcher = TeamMatcher(["NRG Esports", "LEVIATÁN", "Paper Rex", "Paper Rex Academy", "Sentinels", "Karmine Corp"])
+
+    assert team_key("NRG Esports") == team_key("nrg") == "nrg"
+    assert matcher.resolve("NRG") == "nrg"
+    assert matcher.resolve("Leviatán") == "leviatan"
+    assert matcher.resolve("PRX") == "paperrex"
+    assert matcher.resolve("Paper Rex") == "paperrex"
+    assert matcher.match("Sentinals")[0] == "sentinels"
+    assert matcher.resolve("Karmine") == "karminecorp"
+    assert matcher.resolve("Team Liquid") is None
+
+
+def _lookup():
+    lookup = VodLookup()
+    lookup.set_schedule([
+        {"team_a": "NRG Esports", "team_b": "LEVIATÁN", "date": "Fri, August 2, 2024"},
+        {"team_a": "Sentinels", "team_b": "FNATIC", "date": "Sat, August 3, 2024"},
+    ])
+    lookup.add({"team_a": "NRG Esports", "team_b": "LEVIATÁN",
+                "maps": [{"map_name": "Lotus", "youtube_video_id": "nrg", "start_seconds": 100}]})
+    lookup.add({"team_a": "Sentinels", "team_b": "FNATIC",
+                "maps": [{"map_name": "Bind", "youtube_video_id": "sen", "start_seconds": 50}]})
+    return lookup
+
+
+def test_enrichment_matches_spelling_variants_and_falls_back_to_date():
+    lookup = _lookup()
+    first = {"team_a": ["Leviatán"], "team_b": ["NRG"], "map_name": ["lotus"], "vod_url": [None], "vod_timestamp": [10]}
+    # "Fnatic Academy" never resolves; Sentinels + match date pick the right VLR match
+    second = {
+        "team_a": ["Sentinels"], "team_b": ["Fnatic Academy Rising"], "map_name": ["Bind"],
+        "vod_url": [None], "vod_timestamp": [5],
+    }
+    DiscoveryService._enrich_rounds_with_vods(first, lookup)
+    DiscoveryService._enrich_rounds_with_vods(second, lookup, date(2024, 8, 3))
+
+    assert first["vod_url"] == ["https://www.youtube.com/watch?v=nrg&t=110s"]
+    assert first["vod_timestamp"] == [110]
+    assert second["vod_url"] == ["https://www.youtube.com/watch?v=sen&t=55s"]
+    # Outside the date tolerance nothing is guessed
+    assert lookup.resolve_pair("Unknown", "Other", date(2024, 9, 1)) is None
+    assert parse_vlr_date("Yesterday") is None
+
+
+def test_date_fallback_needs_one_resolved_team():
+    lookup = _lookup()
+
+    # Both VLR matches fall inside the date window, but neither involves these teams
+    assert lookup.resolve_pair("Team Liquid", "Gen.G", date(2024, 8, 2)) is None
+    assert lookup.resolve_pair("Team Liquid", "Gen.G", date(2024, 8, 3)) is None
+    assert lookup.resolve_pair("Team Liquid", "Sentinels", date(2024, 8, 2)) == ("fnatic", "sentinels")
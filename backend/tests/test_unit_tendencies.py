@@ -0,0 +1,60 @@
+from unittest.mock import patch
+
+from app.services.ingestion import IngestionService
+from app.services.tendencies import TendencyStore
+
+
+def make_round(round_num, winner, round_type="default", map_name="Bind"):
+    return {
+        "match_id": 7, "round_id": 700 + round_num, "round_num": round_num, "map_name": map_name,
+        "is_pistol": round_num in (1, 13), "winner_slug": winner, "winning_team": winner,
+        "team_a_slug": "sentinels", "team_b_slug": "loud", "team_a": "Sentinels", "team_b": "LOUD",
+        "round_type": round_type,
+    }
+
+
+def row(store, team, map_name, bucket):
+    (found,) = store.get(team, map_name, bucket)
+    return found
+
+
+def test_reapplying_rounds_is_idempotent_and_applies_deltas(tmp_path):
+    store = TendencyStore(str(tmp_path / "tendencies.sqlite3"))
+    rounds = [make_round(1, "sentinels"), make_round(2, "loud", "thrifty"), make_round(13, "loud")]
+    ids = ["d1", "d2", "d13"]
+    assert store.apply(rounds, ids) == 3
+
+    pistol = row(store, "Sentinels", "bind", "pistol")
+    assert (pistol["rounds"], pistol["wins"], pistol["win_rate"]) == (2, 1, 0.5)
+    assert row(store, "loud", "all", "all")["thrifty"] == 1
+
+    # Same rounds again: nothing moves
+    assert store.apply(rounds, ids) == 0
+    assert row(store, "sentinels", "bind", "pistol")["rounds"] == 2
+
+    # Round 13 corrected to a Sentinels win under a new document id
+    assert store.apply([make_round(13, "sentinels")], ["d13b"]) == 1
+    assert row(store, "sentinels", "bind", "pistol")["wins"] == 2
+    assert row(store, "loud", "bind", "second_half")["wins"] == 0
+    # Deleting the superseded document changes nothing; deleting a live one subtracts it
+    assert store.remove(["d13"]) == 0
+    assert store.remove(["d2"]) == 1
+    assert row(store, "loud", "all", "all")["thrifty"] == 0
+    assert store.get("loud", bucket="conversion") == []
+
+
+@patch("app.services.ingestion.get_vector_index", return_value=None)
+@patch("app.services.ingestion.get_ingest_manifest", return_value=None)
+@patch("app.services.ingestion.get_supabase", return_value=None)
+@patch("app.services.ingestion.get_chroma_service")
+def test_ingest_batch_twice_does_not_double_count(_chroma, _supabase, _manifest, _index, tmp_path):
+    store = TendencyStore(str(tmp_path / "tendencies.sqlite3"))
+    with patch("app.services.ingestion.get_tendency_store", return_value=store):
+        service = IngestionService()
+    rounds = [make_round(n, "sentinels" if n % 2 else "loud") for n in range(1, 25)]
+
+    service.ingest_batch(rounds)
+    service.ingest_batch(rounds)
+
+    overall = row(store, "sentinels", "all", "all")
+    assert (overall["rounds"], overall["wins"]) == (24, 12)
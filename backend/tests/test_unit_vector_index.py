@@ -0,0 +1,269 @@
+import numpy as np
+import pytest
+
+from app.core.embeddings import truncate_embedding
+from app.core.vector_index import VectorIndex
+
+
+def _record(i, team_a, team_b, map_name, round_type="default", is_pistol=False):
+    return {
+        "summary": f"round {i}",
+        "team_a": team_a.upper(),
+        "team_b": team_b.upper(),
+        "team_a_slug": team_a,
+        "team_b_slug": team_b,
+        "winner_slug": team_a,
+        "score_a": 0,
+        "score_b": 0,
+        "map_name": map_name,
+        "round_num": i,
+        "winning_team": team_a.upper(),
+        "round_type": round_type,
+        "is_pistol": is_pistol,
+        "vod_url": None,
+        "vod_timestamp": None,
+    }
+
+
+def _build(dims=8, n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dims)).astype(np.float32)
+    teams = ["paperrex", "fnatic", "sentinels", "drx"]
+    maps = ["Lotus", "Bind", "Ascent"]
+    records = [
+        _record(i, teams[i % 4], teams[(i + 1) % 4], maps[i % 3], is_pistol=i % 12 == 0)
+        for i in range(n)
+    ]
+    ids = [f"r{i}" for i in range(n)]
+    index = VectorIndex(dims, initial_capacity=16)
+    index.upsert(ids, vectors, records)
+    return index, ids, vectors, records
+
+
+def _brute_force(vectors, query, rows, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = unit[rows] @ (query / np.linalg.norm(query))
+    return [rows[i] for i in np.argsort(-scores)[:k]]
+
+
+def test_filtered_search_matches_brute_force():
+    index, ids, vectors, records = _build()
+    query = np.random.default_rng(1).normal(size=8).astype(np.float32)
+
+    hits = index.search(query, k=5, filters={"team_slug": "fnatic", "map_name": "Lotus"})
+    rows = [
+        i for i, r in enumerate(records)
+        if "fnatic" in (r["team_a_slug"], r["team_b_slug"]) and r["map_name"] == "Lotus"
+    ]
+    expected = _brute_force(vectors, query, rows, 5)
+    assert [h["external_id"] for h in hits] == [ids[i] for i in expected]
+    assert all(h["map_name"] == "Lotus" for h in hits)
+
+
+def test_unknown_filter_value_returns_nothing():
+    index, _, _, _ = _build()
+    assert index.search(np.ones(8), k=5, filters={"team_slug": "nobody"}) == []
+
+
+def test_pistol_bitmap_and_upsert_replaces_row():
+    index, ids, vectors, records = _build()
+    hits = index.search(np.ones(8), k=50, filters={"is_pistol": True})
+    assert {h["external_id"] for h in hits} == {ids[i] for i in range(0, 200, 12)}
+
+    # Re-ingesting a round with new metadata moves it between bitmaps
+    index.upsert(["r0"], [vectors[0]], [_record(0, "loud", "nrg", "Bind")])
+    assert len(index) == 200
+    hits = index.search(np.ones(8), k=50, filters={"is_pistol": True})
+    assert "r0" not in {h["external_id"] for h in hits}
+    hits = index.search(vectors[0], k=1, filters={"team_slug": "loud"})
+    assert hits[0]["external_id"] == "r0"
+
+
+def test_snapshot_round_trip(tmp_path):
+    index, ids, vectors, _ = _build(n=50)
+    index.delete(["r3"])
+    path = str(tmp_path / "vector_index")
+    index.save(path)
+
+    loaded = VectorIndex.load(path, 8)
+    assert len(loaded) == 49
+    query = vectors[7]
+    assert loaded.search(query, k=3) == index.search(query, k=3)
+    assert "r3" not in {h["external_id"] for h in loaded.search(vectors[3], k=49)}
+
+
+def test_snapshot_filters_survive_repeated_saves(tmp_path):
+    index, ids, vectors, records = _build(n=120)
+    path = str(tmp_path / "vector_index")
+    index.save(path)
+    loaded = VectorIndex.load(path, 8)
+    # A team the base dictionaries haven't seen, written to the delta and then snapshotted again
+    loaded.upsert(["new"], [vectors[5]], [_record(999, "kru", "fnatic", "Sunset", round_type="eco", is_pistol=True)])
+    loaded.save(path)
+    reloaded = VectorIndex.load(path, 8)
+
+    assert reloaded.memory_stats()["delta_rows"] == 0
+    assert not (tmp_path / "vector_index" / "records.json").exists()
+    hits = reloaded.search(vectors[5], k=5, filters={"team_slug": "kru"})
+    assert [h["external_id"] for h in hits] == ["new"]
+    assert hits[0]["map_name"] == "Sunset" and hits[0]["round_num"] == 999
+    for filters in ({"team_slug": "fnatic", "map_name": "Lotus"}, {"is_pistol": True}, {"round_type": "eco"}):
+        query = vectors[11]
+        assert reloaded.search(query, k=10, filters=filters) == loaded.search(query, k=10, filters=filters)
+
+
+def test_save_prunes_only_older_snapshots(tmp_path):
+    index, ids, vectors, _ = _build(n=20)
+    path = tmp_path / "vector_index"
+    index.save(str(path))
+    first = (path / "CURRENT").read_text()
+    # A snapshot named after the one being written (another saver) must survive the prune
+    (path / "snapshot-99999999999999999999").mkdir()
+    index.upsert(["r0"], [vectors[1]], [_record(0, "drx", "fnatic", "Bind")])
+    index.save(str(path))
+
+    assert not (path / first).exists()
+    assert (path / "snapshot-99999999999999999999").exists()
+    assert (path / (path / "CURRENT").read_text()).exists()
+
+
+def test_failed_save_leaves_the_index_dirty(tmp_path, monkeypatch):
+    index, ids, vectors, _ = _build(n=20)
+    path = str(tmp_path / "vector_index")
+    index.save(path)
+    assert not index.dirty
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    index.upsert(["r1"], [vectors[2]], [_record(1, "drx", "fnatic", "Bind")])
+    monkeypatch.setattr(index, "_write_records", fail)
+    with pytest.raises(OSError):
+        index.save_if_stale(path, min_interval=0)
+    assert index.dirty
+
+    monkeypatch.undo()
+    index.save_if_stale(path, min_interval=0)
+    assert not index.dirty
+    assert {h["external_id"] for h in VectorIndex.load(path, 8).search(vectors[2], k=2)} == {"r1", "r2"}
+
+
+def test_two_stage_search_reranks_on_full_vectors():
+    rng = np.random.default_rng(3)
+    scale = 1.0 / np.sqrt(1.0 + np.arange(64) / 8.0)
+    vectors = (rng.normal(size=(500, 64)) * scale).astype(np.float32)
+    ids = [f"r{i}" for i in range(500)]
+    records = [_record(i, "paperrex", "fnatic", "Lotus") for i in range(500)]
+    index = VectorIndex(64, prefix_dims=16, coarse_candidates=100)
+    index.upsert(ids, vectors, records)
+
+    query = vectors[42]
+    exact = index.search(query, k=5, two_stage=False)
+    coarse = index.search(query, k=5, two_stage=True)
+    assert coarse[0]["external_id"] == "r42"
+    # Reranked similarities are exact full-vector scores
+    assert coarse[0]["similarity"] == exact[0]["similarity"]
+    assert len({h["external_id"] for h in coarse} & {h["external_id"] for h in exact}) >= 4
+
+
+def test_truncate_embedding_renormalizes_prefix():
+    prefix = truncate_embedding([3.0, 4.0, 12.0], 2)
+    assert prefix == [0.6, 0.8]
+
+
+def test_quantized_snapshot_is_memory_mapped_and_reranked(tmp_path):
+    for mode, code_size in (("int8", 16), ("pq", 4)):
+        rng = np.random.default_rng(5)
+        vectors = rng.normal(size=(600, 16)).astype(np.float32)
+        ids = [f"r{i}" for i in range(600)]
+        records = [_record(i, "paperrex", "fnatic", "Lotus") for i in range(600)]
+        index = VectorIndex(16, quantization=mode, pq_subspaces=4, coarse_candidates=50)
+        index.upsert(ids, vectors, records)
+        path = str(tmp_path / mode)
+        index.save(path)
+
+        loaded = VectorIndex.load(path, 16, quantization=mode, pq_subspaces=4, coarse_candidates=50)
+        stats = loaded.memory_stats()
+        assert stats["base_rows"] == 600 and stats["delta_rows"] == 0
+        assert stats["code_bytes"] == 600 * code_size
+        assert isinstance(loaded._segment.full, np.memmap)
+
+        exact = loaded.search(vectors[9], k=5, two_stage=False)
+        reranked = loaded.search(vectors[9], k=5, two_stage=True)
+        assert reranked[0]["external_id"] == "r9"
+        assert reranked[0]["similarity"] == exact[0]["similarity"]
+
+
+def test_replacing_a_snapshot_row_moves_it_to_the_delta(tmp_path):
+    index, ids, vectors, _ = _build(n=40)
+    path = str(tmp_path / "vector_index")
+    index.save(path)
+    loaded = VectorIndex.load(path, 8)
+
+    loaded.upsert(["r1"], [vectors[2]], [_record(1, "loud", "nrg", "Bind")])
+    stats = loaded.memory_stats()
+    assert (stats["rows"], stats["base_rows"], stats["delta_rows"]) == (40, 40, 1)
+    hits = loaded.search(vectors[2], k=2, filters={"team_slug": "loud"})
+    assert [h["external_id"] for h in hits] == ["r1"]
+    assert hits[0]["similarity"] > 0.999
+
+    # The next snapshot folds the delta back into the base
+    loaded.save(path)
+    assert loaded.memory_stats()["delta_rows"] == 0
+    assert len(VectorIndex.load(path, 8)) == 40
+
+
+class _FakeRoundsTable:
+    """Keyset-paginated round_embeddings: select().order().limit()[.gt()].execute()."""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda r: r["external_id"])
+        self.requests = 0
+
+    def table(self, name):
+        assert name == "round_embeddings"
+        self._after, self._limit = None, None
+        return self
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def gt(self, column, value):
+        self._after = value
+        return self
+
+    def execute(self):
+        self.requests += 1
+        rows = [r for r in self.rows if self._after is None or r["external_id"] > self._after]
+        return type("Result", (), {"data": rows[:self._limit]})()
+
+
+def test_bootstrap_loads_existing_rows_and_marks_complete(tmp_path):
+    from app.core.vector_index import bootstrap_from_supabase
+
+    _, ids, vectors, records = _build(n=25)
+    rows = [
+        {**record, "external_id": doc_id, "embedding": "[" + ",".join(str(float(x)) for x in vec) + "]"}
+        for doc_id, vec, record in zip(ids, vectors, records)
+    ]
+    supabase = _FakeRoundsTable(rows)
+    index = VectorIndex(8)
+    # A round ingested after the index was enabled is newer than its Supabase copy
+    index.upsert(["r0"], [vectors[1]], [_record(0, "loud", "nrg", "Bind")])
+    assert not index.complete
+
+    assert bootstrap_from_supabase(index, supabase, page_size=10) == 24
+    assert supabase.requests == 3
+    assert index.complete and len(index) == 25
+    assert index.search(vectors[1], k=1, filters={"team_slug": "loud"})[0]["external_id"] == "r0"
+
+    path = str(tmp_path / "vector_index")
+    index.save(path)
+    assert VectorIndex.load(path, 8).complete
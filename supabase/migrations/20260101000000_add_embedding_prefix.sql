@@ -0,0 +1,94 @@
+-- Matryoshka two-stage retrieval
+-- embedding_prefix holds the first 256 dimensions of `embedding`, renormalized.
+-- The candidate pass uses the small HNSW index on the prefix; the final ordering
+-- is the exact cosine distance on the full 768-d vector.
+-- Enabled from the backend with SUPABASE_PREFIX_SEARCH=true (EMBEDDING_PREFIX_DIMENSIONS must be 256).
+
+ALTER TABLE round_embeddings ADD COLUMN IF NOT EXISTS embedding_prefix vector(256);
+
+CREATE INDEX IF NOT EXISTS round_embeddings_embedding_prefix_idx
+  ON round_embeddings USING hnsw (embedding_prefix vector_cosine_ops);
+
+DROP FUNCTION IF EXISTS match_rounds_two_stage(float[], float[], float, int, int, text, text, text, boolean);
+
+CREATE FUNCTION match_rounds_two_stage (
+  query_embedding float[],
+  query_prefix float[],
+  match_threshold float,
+  match_count int,
+  candidate_count int default 200,
+  filter_team_slug text default null,
+  filter_map_name text default null,
+  filter_round_type text default null,
+  filter_is_pistol boolean default null
+) RETURNS TABLE (
+  id uuid,
+  external_id text,
+  match_id_rib text,
+  round_num int,
+  summary text,
+  vod_url text,
+  winning_team text,
+  winner_slug text,
+  round_type text,
+  is_pistol boolean,
+  score_a int,
+  score_b int,
+  map_name text,
+  team_a text,
+  team_b text,
+  vod_timestamp int,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  query_vec vector(768);
+  prefix_vec vector(256);
+BEGIN
+  query_vec := query_embedding::vector(768);
+  prefix_vec := query_prefix::vector(256);
+
+  RETURN QUERY
+  WITH candidates AS (
+    -- Coarse pass: same hard pre-filters as match_rounds, ranked on the prefix
+    SELECT re.*
+    FROM round_embeddings re
+    WHERE re.embedding_prefix IS NOT NULL
+      AND (filter_team_slug IS NULL OR re.winner_slug = filter_team_slug OR re.team_a_slug = filter_team_slug OR re.team_b_slug = filter_team_slug)
+      AND (filter_map_name IS NULL OR re.map_name = filter_map_name)
+      AND (filter_round_type IS NULL OR re.round_type = filter_round_type)
+      AND (filter_is_pistol IS NULL OR re.is_pistol = filter_is_pistol)
+    ORDER BY re.embedding_prefix <=> prefix_vec
+    LIMIT GREATEST(candidate_count, match_count)
+  )
+  SELECT
+    c.id,
+    c.external_id,
+    c.match_id_rib,
+    c.round_num,
+    c.summary,
+    c.vod_url,
+    c.winning_team,
+    c.winner_slug,
+    c.round_type,
+    c.is_pistol,
+    c.score_a,
+    c.score_b,
+    c.map_name,
+    c.team_a,
+    c.team_b,
+    c.vod_timestamp,
+    1 - (c.embedding <=> query_vec) as similarity
+  FROM candidates c
+  WHERE
+    -- Threshold only for pure semantic queries, as in match_rounds
+    (
+      (filter_team_slug IS NOT NULL OR filter_map_name IS NOT NULL OR filter_round_type IS NOT NULL OR filter_is_pistol IS NOT NULL)
+      OR
+      (1 - (c.embedding <=> query_vec) > match_threshold)
+    )
+  ORDER BY c.embedding <=> query_vec
+  LIMIT match_count;
+END;
+$$;
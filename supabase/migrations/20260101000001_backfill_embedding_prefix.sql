@@ -0,0 +1,107 @@
+-- Backfill embedding_prefix and keep filtered two-stage searches from starving.
+--
+-- 1. Rows written before the prefix column existed (or while the backend only
+--    wrote it with SUPABASE_PREFIX_SEARCH on) have embedding_prefix = NULL and
+--    are invisible to match_rounds_two_stage. Derive it from `embedding` the
+--    same way the backend does: first 256 dimensions, renormalized.
+-- 2. The coarse pass filters rows after the HNSW scan. With the default
+--    hnsw.ef_search of 40, a selective team/map filter leaves almost no
+--    candidates, so the RPC widens the scan to candidate_count and, on
+--    pgvector >= 0.8, keeps scanning until enough filtered rows are found.
+
+UPDATE round_embeddings
+SET embedding_prefix = l2_normalize(subvector(embedding, 1, 256))::vector(256)
+WHERE embedding_prefix IS NULL AND embedding IS NOT NULL;
+
+DROP FUNCTION IF EXISTS match_rounds_two_stage(float[], float[], float, int, int, text, text, text, boolean);
+
+CREATE FUNCTION match_rounds_two_stage (
+  query_embedding float[],
+  query_prefix float[],
+  match_threshold float,
+  match_count int,
+  candidate_count int default 200,
+  filter_team_slug text default null,
+  filter_map_name text default null,
+  filter_round_type text default null,
+  filter_is_pistol boolean default null
+) RETURNS TABLE (
+  id uuid,
+  external_id text,
+  match_id_rib text,
+  round_num int,
+  summary text,
+  vod_url text,
+  winning_team text,
+  winner_slug text,
+  round_type text,
+  is_pistol boolean,
+  score_a int,
+  score_b int,
+  map_name text,
+  team_a text,
+  team_b text,
+  vod_timestamp int,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  query_vec vector(768);
+  prefix_vec vector(256);
+BEGIN
+  query_vec := query_embedding::vector(768);
+  prefix_vec := query_prefix::vector(256);
+
+  -- Transaction-local: the HNSW scan visits at least as many rows as candidates requested
+  PERFORM set_config('hnsw.ef_search', LEAST(1000, GREATEST(40, candidate_count, match_count))::text, true);
+  -- Iterative index scans (pgvector >= 0.8) continue past ef_search when filters reject rows
+  BEGIN
+    PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  EXCEPTION WHEN OTHERS THEN
+    NULL;
+  END;
+
+  RETURN QUERY
+  WITH candidates AS MATERIALIZED (
+    -- Coarse pass: same hard pre-filters as match_rounds, ranked on the prefix
+    SELECT re.*
+    FROM round_embeddings re
+    WHERE re.embedding_prefix IS NOT NULL
+      AND (filter_team_slug IS NULL OR re.winner_slug = filter_team_slug OR re.team_a_slug = filter_team_slug OR re.team_b_slug = filter_team_slug)
+      AND (filter_map_name IS NULL OR re.map_name = filter_map_name)
+      AND (filter_round_type IS NULL OR re.round_type = filter_round_type)
+      AND (filter_is_pistol IS NULL OR re.is_pistol = filter_is_pistol)
+    ORDER BY re.embedding_prefix <=> prefix_vec
+    LIMIT GREATEST(candidate_count, match_count)
+  )
+  SELECT
+    c.id,
+    c.external_id,
+    c.match_id_rib,
+    c.round_num,
+    c.summary,
+    c.vod_url,
+    c.winning_team,
+    c.winner_slug,
+    c.round_type,
+    c.is_pistol,
+    c.score_a,
+    c.score_b,
+    c.map_name,
+    c.team_a,
+    c.team_b,
+    c.vod_timestamp,
+    1 - (c.embedding <=> query_vec) as similarity
+  FROM candidates c
+  WHERE
+    -- Threshold only for pure semantic queries, as in match_rounds
+    (
+      (filter_team_slug IS NOT NULL OR filter_map_name IS NOT NULL OR filter_round_type IS NOT NULL OR filter_is_pistol IS NOT NULL)
+      OR
+      (1 - (c.embedding <=> query_vec) > match_threshold)
+    )
+  ORDER BY c.embedding <=> query_vec
+  LIMIT match_count;
+END;
+$$;